@@ -43,10 +43,23 @@ INSTALLED_APPS = [
     'crispy_bootstrap5',
 ]
 
+# 실행 프로필: web(기본) / headless / command
+# 화면을 그리지 않는 프로세스(백그라운드 작업, 관리 명령)는 admin과 crispy를 읽지 않아 기동이 빠르다.
+# serve의 prefork 워커는 화면을 그리므로 항상 web 프로필로 실행한다
+SETTINGS_PROFILE = os.environ.get('SETTINGS_PROFILE', 'web')
+LEAN_PROFILES = ('headless', 'command')
+LEAN_PROFILE_SKIPPED_APPS = ('django.contrib.admin', 'crispy_forms', 'crispy_bootstrap5')
+if SETTINGS_PROFILE in LEAN_PROFILES:
+    INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in LEAN_PROFILE_SKIPPED_APPS]
+
 MIDDLEWARE = [
+    # 다른 미들웨어 시간까지 재도록 맨 앞에 둔다
+    'memos.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
+    # CSRF 검사가 본문을 읽기 전에 너무 큰 메모 저장 요청을 413으로 거절한다
+    'memos.limits.RequestSizeLimitMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
@@ -79,10 +92,27 @@ WSGI_APPLICATION = 'memoapp.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': os.environ.get('DATABASE_PATH', BASE_DIR / 'db.sqlite3'),
+        # 워커 스레드가 요청마다 새로 연결하지 않도록 연결 유지 시간(초)을 설정할 수 있다
+        'CONN_MAX_AGE': int(os.environ.get('CONN_MAX_AGE', 0)),
     }
 }
 
+# 사용자별 메모 샤딩: MEMO_SHARDS개의 SQLite 파일(db.shard0.sqlite3 ...)에 사용자 단위로 나눠 저장한다
+# 0이면 default DB 하나만 사용한다. 사용자/세션/관리자 데이터는 항상 default에 있다
+MEMO_SHARDS = int(os.environ.get('MEMO_SHARDS', 0))
+MEMO_SHARD_DATABASES = [f'shard{index}' for index in range(MEMO_SHARDS)]
+for index, alias in enumerate(MEMO_SHARD_DATABASES):
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'NAME': Path(DATABASES['default']['NAME']).with_suffix(f'.shard{index}.sqlite3'),
+    }
+if MEMO_SHARD_DATABASES:
+    DATABASE_ROUTERS = ['memos.sharding.ShardRouter']
+# 일관 해시 링의 샤드당 가상 노드 수, 기본 키를 한 번에 예약하는 개수
+MEMO_SHARD_REPLICAS = 160
+MEMO_SHARD_ID_BLOCK = 100
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -124,6 +154,56 @@ STATIC_URL = 'static/'
 CRISPY_ALLOWED_TEMPLATE_PACKS = "bootstrap5"
 CRISPY_TEMPLATE_PACK = "bootstrap5"
 
+# 메모 내용 조각 크기(문자 수)
+MEMO_CHUNK_SIZE = int(os.environ.get('MEMO_CHUNK_SIZE', 64 * 1024))
+
+# 메모 목록 한 페이지의 메모 수 (다음 페이지는 ?cursor=<마지막 메모 id>)
+MEMO_LIST_PAGE_SIZE = 50
+
+# 사용자별 메모 할당량 (0이면 제한 없음)
+MEMO_QUOTA_MAX_COUNT = int(os.environ.get('MEMO_QUOTA_MAX_COUNT', 0))
+MEMO_QUOTA_MAX_BYTES = int(os.environ.get('MEMO_QUOTA_MAX_BYTES', 0))
+
+# 메모 내용 최대 크기(UTF-8 바이트, 기본 1 MiB)
+MEMO_MAX_CONTENT_SIZE = int(os.environ.get('MEMO_MAX_CONTENT_SIZE', 1024 * 1024))
+# 폼 인코딩하면 한글/키릴 문자는 바이트마다 %XX 세 글자가 되므로 3배에 다른 필드 몫을 더한다.
+# 이보다 큰 메모 저장 요청은 본문을 읽기 전에 413으로 거절한다.
+MEMO_MAX_REQUEST_SIZE = MEMO_MAX_CONTENT_SIZE * 3 + 64 * 1024
+DATA_UPLOAD_MAX_MEMORY_SIZE = MEMO_MAX_REQUEST_SIZE
+
+# 메모 변경 이벤트(SSE) 전달 백엔드
+# 워커가 여러 개면 memos.events.DatabaseBackend로 프로세스 간에 전달한다
+MEMO_EVENTS_BACKEND = os.environ.get('MEMO_EVENTS_BACKEND', 'memos.events.LocalBackend')
+MEMO_EVENTS_POLL_INTERVAL = float(os.environ.get('MEMO_EVENTS_POLL_INTERVAL', 1.0))
+MEMO_EVENTS_HEARTBEAT = 15
+
+# 관리자 메모 목록 성능 모드 (추정 개수, 키셋 페이지, 인덱스 검색)
+# 켜 두어도 추정 행 수가 MEMO_ADMIN_ESTIMATE_THRESHOLD 이상인 테이블에만 적용된다
+MEMO_ADMIN_PERFORMANCE_MODE = os.environ.get('MEMO_ADMIN_PERFORMANCE_MODE', 'True').lower() == 'true'
+MEMO_ADMIN_ESTIMATE_THRESHOLD = 100_000
+MEMO_ADMIN_COUNT_CAP = 10_000
+
+# 유사 메모 패널에 보여줄 최소 유사도 (MinHash로 추정한 자카드 유사도)
+MEMO_SIMILAR_THRESHOLD = 0.5
+
+# 메모 일괄 작업에서 IN 목록 하나에 넣는 id 수 (SQLite 바인드 변수 한도 안)
+MEMO_BULK_BATCH_SIZE = 900
+
+# 메트릭 엔드포인트(/metrics) 접근 토큰 (비우면 스태프 세션만 허용)
+MEMO_METRICS_TOKEN = os.environ.get('MEMO_METRICS_TOKEN', '')
+# prefork 워커들의 메트릭을 합치는 디렉터리 (비우면 응답한 프로세스의 값만 보인다)
+MEMO_METRICS_DIR = os.environ.get('MEMO_METRICS_DIR', '')
+MEMO_METRICS_FLUSH_INTERVAL = 1.0
+# 활성 세션 수처럼 DB를 읽는 게이지 값을 다시 쓰는 시간(초)
+MEMO_METRICS_GAUGE_TTL = 15.0
+
+# 캐시 적중/실패를 메트릭으로 센다
+CACHES = {
+    'default': {
+        'BACKEND': 'memos.metrics.InstrumentedLocMemCache',
+    },
+}
+
 # 로그인/로그아웃 후 리다이렉트 경로
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/accounts/login/'
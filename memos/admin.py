@@ -1,7 +1,387 @@
+from contextvars import ContextVar
+from datetime import timedelta
+from django.conf import settings
 from django.contrib import admin
-from .models import Memo
+from django.contrib.admin.views.main import PAGE_VAR, SEARCH_VAR, ChangeList
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections, router
+from django.db.models import F, Max, Min, Q, QuerySet, Subquery
+from django.utils import timezone
+from django.utils.functional import cached_property
+from . import sharding
+from .models import Memo, MemoStats, ShardAssignment
+
+
+CURSOR_VAR = 'cursor'
+LARGE_TABLE_SEARCH_HELP = (
+    "Таблица заметок слишком большая для поиска по содержимому: "
+    "ищутся только начало заголовка, номер заметки и точное имя пользователя."
+)
+
+
+def estimate_row_count(model, using):
+    """테이블 전체를 세지 않고 행 수를 추정한다. 추정할 수 없으면 None"""
+    connection = connections[using]
+    table = model._meta.db_table
+    try:
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [table])
+                row = cursor.fetchone()
+                if row and row[0] > 0:
+                    return row[0]
+                return None
+            if connection.vendor == 'sqlite':
+                # ANALYZE 통계가 있으면 그것을 쓰고, 없으면 기본 키 범위로 추정한다
+                try:
+                    cursor.execute("SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1", [table])
+                    row = cursor.fetchone()
+                    if row:
+                        return int(row[0].split()[0])
+                except DatabaseError:
+                    pass
+            if sharding.is_enabled() and sharding.is_sharded(model):
+                # 샤드들이 공통 시퀀스의 id를 나눠 쓰므로 기본 키 범위는 행 수와 무관하다
+                return None
+            pk_column = connection.ops.quote_name(model._meta.pk.column)
+            cursor.execute(f"SELECT MAX({pk_column}) - MIN({pk_column}) + 1 FROM {connection.ops.quote_name(table)}")
+            row = cursor.fetchone()
+            return row[0] if row else None
+    except DatabaseError:
+        return None
+
+
+def is_pk_descending(queryset):
+    # ModelAdmin.get_queryset과 ChangeList가 모두 정렬을 붙이므로 ('-id', '-id')도 같은 정렬이다
+    order_by = set(queryset.query.order_by)
+    return bool(order_by) and order_by <= {'-pk', '-id'}
+
+
+def next_period(start, kind, current_tz):
+    naive = start.astimezone(current_tz).replace(tzinfo=None)
+    if kind == 'year':
+        naive = naive.replace(year=naive.year + 1)
+    elif kind == 'month':
+        naive = naive.replace(year=naive.year + naive.month // 12, month=naive.month % 12 + 1)
+    else:
+        naive += timedelta(days=1)
+    return timezone.make_aware(naive, current_tz)
+
+
+class IndexedDateQuerySet(QuerySet):
+    """date_hierarchy의 datetimes()를 DISTINCT 전체 스캔 대신 인덱스 탐색으로 구하는 QuerySet
+
+    기간마다 "다음 기간 시작 이후의 첫 값"을 인덱스로 한 번씩 찾으므로, 행 수가 아니라
+    서로 다른 연/월/일 수만큼만 쿼리가 나간다.
+    """
+
+    def aggregate(self, *args, **kwargs):
+        # SQLite는 MIN()과 MAX()를 한 쿼리에 같이 쓰면 인덱스 최적화를 못 하므로 따로 탐색한다
+        if args or not kwargs or not all(self._is_plain_min_max(value) for value in kwargs.values()):
+            return super().aggregate(*args, **kwargs)
+        result = {}
+        for alias, aggregate in kwargs.items():
+            field_name = aggregate.source_expressions[0].name
+            ordering = field_name if isinstance(aggregate, Min) else f'-{field_name}'
+            result[alias] = self.exclude(**{f'{field_name}__isnull': True}).order_by(ordering).values_list(
+                field_name, flat=True
+            ).first()
+        return result
+
+    @staticmethod
+    def _is_plain_min_max(aggregate):
+        return (
+            type(aggregate) in (Min, Max)
+            and aggregate.filter is None
+            and aggregate.default is None
+            and len(aggregate.source_expressions) == 1
+            and isinstance(aggregate.source_expressions[0], F)
+        )
+
+    def datetimes(self, field_name, kind, order='ASC', tzinfo=None):
+        if kind not in ('year', 'month', 'day') or order != 'ASC' or tzinfo is not None:
+            return super().datetimes(field_name, kind, order, tzinfo)
+        current_tz = timezone.get_current_timezone()
+        values = self.order_by(field_name).values_list(field_name, flat=True)
+        results = []
+        lower = None
+        while True:
+            candidates = values.filter(**{f'{field_name}__gte': lower}) if lower is not None else values
+            first = candidates.exclude(**{f'{field_name}__isnull': True}).first()
+            if first is None:
+                return results
+            local = timezone.localtime(first, current_tz)
+            start = local.replace(hour=0, minute=0, second=0, microsecond=0)
+            if kind in ('year', 'month'):
+                start = start.replace(day=1)
+            if kind == 'year':
+                start = start.replace(month=1)
+            start = timezone.make_aware(start.replace(tzinfo=None), current_tz)
+            results.append(start)
+            lower = next_period(start, kind, current_tz)
+
+
+class EstimatedCountPaginator(Paginator):
+    """큰 테이블에서 COUNT(*) 대신 추정치나 상한이 있는 개수를 쓰는 페이지네이터"""
+
+    estimated = False
+    capped = False
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        threshold = getattr(settings, 'MEMO_ADMIN_ESTIMATE_THRESHOLD', 100_000)
+        if not queryset.query.where:
+            estimate = estimate_row_count(queryset.model, queryset.db)
+            if estimate is not None and estimate >= threshold:
+                self.estimated = True
+                return estimate
+            return queryset.count()
+        # 필터/검색 결과는 상한까지만 센다 (SELECT COUNT(*) FROM (... LIMIT n))
+        cap = getattr(settings, 'MEMO_ADMIN_COUNT_CAP', 10_000)
+        count = queryset.order_by()[:cap + 1].count()
+        if count > cap:
+            self.capped = True
+            return cap
+        return count
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        queryset = self.object_list
+        if bottom and is_pk_descending(queryset):
+            # 깊은 페이지는 기본 키 인덱스만 훑어서 경계를 찾은 뒤 그 아래 행만 읽는다
+            boundary = queryset.values_list('pk', flat=True)[bottom:bottom + 1]
+            return self._get_page(list(queryset.filter(pk__lte=Subquery(boundary))[:self.per_page]), number, self)
+        return super().page(number)
+
+
+class KeysetChangeList(ChangeList):
+    """?cursor=<id> 로 id 내림차순 다음 페이지를 OFFSET 없이 가져오는 ChangeList"""
+
+    def __init__(self, request, *args, **kwargs):
+        cursor = request.GET.get(CURSOR_VAR, '')
+        self.cursor = int(cursor) if cursor.isdigit() else None
+        self.next_cursor_url = None
+        super().__init__(request, *args, **kwargs)
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(CURSOR_VAR, None)
+        return lookup_params
+
+    def get_results(self, request):
+        super().get_results(request)
+        self.result_count_estimated = self.paginator.estimated or self.paginator.capped
+        if not is_pk_descending(self.queryset):
+            return
+        if self.cursor is not None:
+            self.result_list = self.queryset.filter(pk__lt=self.cursor)[:self.list_per_page]
+        self.result_list = list(self.result_list)
+        if len(self.result_list) == self.list_per_page:
+            self.next_cursor_url = self.get_query_string(
+                {CURSOR_VAR: self.result_list[-1].pk}, [PAGE_VAR]
+            )
+
+
+class ShardListFilter(admin.SimpleListFilter):
+    """샤드 선택 필터. 샤드마다 (검색 결과) 행 수를 병렬로 세어 옆에 보여준다"""
+
+    title = 'shard'
+    parameter_name = 'shard'
+
+    def lookups(self, request, model_admin):
+        queryset = model_admin.get_queryset(request)
+        term = request.GET.get(SEARCH_VAR, '')
+        cap = getattr(settings, 'MEMO_ADMIN_COUNT_CAP', 10_000)
+
+        def count(alias):
+            shard_queryset = queryset.using(alias)
+            if term:
+                shard_queryset, _ = model_admin.get_search_results(request, shard_queryset, term)
+            return shard_queryset.order_by()[:cap + 1].count()
+
+        counts = sharding.run_on_shards(count)
+        return [
+            (alias, f'{alias} ({cap}+)' if found > cap else f'{alias} ({found})')
+            for alias, found in counts.items()
+        ]
+
+    def value(self):
+        # 선택하지 않았거나 모르는 별칭이면 첫 샤드를 보여준다
+        aliases = [alias for alias, _ in self.lookup_choices]
+        value = super().value()
+        return value if value in aliases else aliases[0]
+
+    def choices(self, changelist):
+        # 여러 DB를 한 목록으로 합칠 수 없으므로 "전체" 항목은 없다
+        for alias, title in self.lookup_choices:
+            yield {
+                'selected': self.value() == alias,
+                'query_string': changelist.get_query_string({self.parameter_name: alias}),
+                'display': title,
+            }
+
+    def queryset(self, request, queryset):
+        return queryset.using(self.value())
+
+
+class ShardedAdminMixin:
+    """샤드에 있는 모델의 관리자 화면. 목록은 샤드 하나씩, 객체는 모든 샤드에서 병렬로 찾는다"""
+
+    def get_list_filter(self, request):
+        list_filter = super().get_list_filter(request)
+        if sharding.is_enabled():
+            return (ShardListFilter, *list_filter)
+        return list_filter
+
+    def get_list_select_related(self, request):
+        # 사용자 테이블은 default DB에 있어서 샤드 쿼리와 조인할 수 없다
+        if sharding.is_enabled():
+            return ()
+        return super().get_list_select_related(request)
+
+    def with_users(self, queryset):
+        if sharding.is_enabled():
+            # 조인 대신 페이지의 사용자를 default에서 한 번에 읽는다
+            return queryset.prefetch_related('user')
+        return queryset
+
+    def get_readonly_fields(self, request, obj=None):
+        readonly_fields = super().get_readonly_fields(request, obj)
+        if sharding.is_enabled() and 'user' not in readonly_fields:
+            # 소유자를 바꾸면 다른 샤드로 옮겨야 하므로 rebalance_shards로만 한다
+            return (*readonly_fields, 'user')
+        return readonly_fields
+
+    def has_add_permission(self, request):
+        return not sharding.is_enabled() and super().has_add_permission(request)
+
+    def get_object(self, request, object_id, from_field=None):
+        if not sharding.is_enabled():
+            return super().get_object(request, object_id, from_field)
+        queryset = self.get_queryset(request)
+        field = self.opts.pk if from_field is None else self.opts.get_field(from_field)
+        try:
+            object_id = field.to_python(object_id)
+        except ValidationError:
+            return None
+        found = sharding.run_on_shards(lambda alias: queryset.using(alias).filter(**{field.name: object_id}).first())
+        return next((obj for obj in found.values() if obj is not None), None)
+
 
 @admin.register(Memo)
-class MemoAdmin(admin.ModelAdmin):
+class MemoAdmin(ShardedAdminMixin, admin.ModelAdmin):
     list_display = ('id', 'user', 'title', 'created_at', 'updated_at')
+    list_select_related = ('user',)
+    ordering = ('-id',)
+    date_hierarchy = 'created_at'
     search_fields = ('title', 'content', 'user__username')
+
+    # ChangeList가 요청 없이 읽는 속성(show_full_result_count, search_help_text)용.
+    # ModelAdmin 인스턴스는 모든 요청이 같이 쓰므로 목록을 만드는 동안만 값을 둔다
+    _large_table = ContextVar('memo_admin_large_table', default=False)
+
+    def performance_mode(self, request):
+        """아주 큰 Memo 테이블용 모드(추정 개수, 키셋 페이지, 인덱스를 쓰는 검색만)를 쓸지
+
+        MEMO_ADMIN_PERFORMANCE_MODE가 켜져 있고 목록 DB의 추정 행 수가
+        MEMO_ADMIN_ESTIMATE_THRESHOLD 이상일 때만 켠다. 요청마다 한 번만 추정한다.
+        """
+        if not getattr(settings, 'MEMO_ADMIN_PERFORMANCE_MODE', True):
+            return False
+        if not hasattr(request, '_memo_admin_performance_mode'):
+            estimate = estimate_row_count(Memo, self.get_list_database(request))
+            threshold = getattr(settings, 'MEMO_ADMIN_ESTIMATE_THRESHOLD', 100_000)
+            request._memo_admin_performance_mode = estimate is not None and estimate >= threshold
+        return request._memo_admin_performance_mode
+
+    def get_list_database(self, request):
+        # ShardListFilter와 같은 규칙: 고른 샤드, 없거나 모르는 별칭이면 첫 샤드
+        aliases = sharding.get_shard_aliases()
+        if aliases:
+            shard = request.GET.get(ShardListFilter.parameter_name)
+            return shard if shard in aliases else aliases[0]
+        return router.db_for_read(Memo)
+
+    def get_changelist_instance(self, request):
+        token = self._large_table.set(self.performance_mode(request))
+        try:
+            return super().get_changelist_instance(request)
+        finally:
+            self._large_table.reset(token)
+
+    @property
+    def show_full_result_count(self):
+        return not self._large_table.get()
+
+    @property
+    def search_help_text(self):
+        # 내용 검색이 꺼졌음을 검색창 아래에 알린다
+        return LARGE_TABLE_SEARCH_HELP if self._large_table.get() else None
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        if self.performance_mode(request):
+            queryset = IndexedDateQuerySet(model=queryset.model, query=queryset.query, using=queryset.db)
+        return self.with_users(queryset)
+
+    def get_search_fields(self, request):
+        if sharding.is_enabled():
+            return ('title', 'content')
+        return super().get_search_fields(request)
+
+    def get_search_results(self, request, queryset, search_term):
+        if not self.performance_mode(request):
+            return super().get_search_results(request, queryset, search_term)
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        # content LIKE 검색 대신 인덱스를 탈 수 있는 조건만 OR로 묶는다:
+        # id 일치, 사용자 이름 일치(사용자를 먼저 찾아 user_id로), 제목 접두사(범위 조건)
+        condition = Q(title__gte=term, title__lt=term + '\U0010ffff')
+        if term.isdigit():
+            condition |= Q(pk=int(term))
+        user_id = get_user_model().objects.filter(username=term).values_list('pk', flat=True).first()
+        if user_id is not None:
+            condition |= Q(user_id=user_id)
+        return queryset.filter(condition), False
+
+    def get_paginator(self, request, queryset, per_page, orphans=0, allow_empty_first_page=True):
+        if self.performance_mode(request):
+            return EstimatedCountPaginator(queryset, per_page, orphans, allow_empty_first_page)
+        return super().get_paginator(request, queryset, per_page, orphans, allow_empty_first_page)
+
+    def get_changelist(self, request, **kwargs):
+        if self.performance_mode(request):
+            return KeysetChangeList
+        return super().get_changelist(request, **kwargs)
+
+
+@admin.register(MemoStats)
+class MemoStatsAdmin(ShardedAdminMixin, admin.ModelAdmin):
+    # 통계는 시그널과 recompute_memo_stats 명령으로만 갱신한다
+    list_display = ('user', 'memo_count', 'content_bytes', 'last_created_at', 'last_updated_at')
+    list_select_related = ('user',)
+    readonly_fields = list_display
+
+    def get_queryset(self, request):
+        return self.with_users(super().get_queryset(request))
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(ShardAssignment)
+class ShardAssignmentAdmin(admin.ModelAdmin):
+    # 배정은 shard_for_user와 rebalance_shards 명령으로만 바꾼다
+    list_display = ('user', 'shard', 'moving_to', 'updated_at')
+    list_filter = ('shard',)
+    list_select_related = ('user',)
+    search_fields = ('user__username',)
+    readonly_fields = list_display
+
+    def has_add_permission(self, request):
+        return False
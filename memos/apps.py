@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class MemosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'memos'
+
+    def ready(self):
+        # 시그널 수신기 등록
+        from . import signals  # noqa: F401
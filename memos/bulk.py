@@ -0,0 +1,109 @@
+import logging
+from functools import partial
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Exists, F, Max, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from . import stats
+from .events import get_broker, memo_ids_event, reload_event
+from .expressions import ByteLength
+from .models import Folder, Memo, MemoBucket, MemoChunk, MemoSignature, MemoTag, Tag
+from .sharding import batched
+
+
+logger = logging.getLogger(__name__)
+
+
+def get_batch_size():
+    # SQLite 바인드 변수 한도(오래된 버전 999) 안에서 한 IN 목록에 넣을 id 수
+    return getattr(settings, 'MEMO_BULK_BATCH_SIZE', 900)
+
+
+def select_memos(user, memo_ids, using):
+    """id 배치마다 소유자 조건이 들어간 메모 선택 쿼리셋을 만든다"""
+    memos = Memo.objects.using(using).filter(user=user).order_by()
+    for batch in batched(memo_ids, get_batch_size()):
+        yield memos.filter(pk__in=batch)
+
+
+def filter_selection(user, using):
+    """전체 선택용 사용자 메모 쿼리셋. 목록 필터를 더해 그대로 DELETE/UPDATE 조건으로 쓴다"""
+    return Memo.objects.using(using).filter(user=user).order_by()
+
+
+def subtract_counts(model, rows, field, using):
+    """rows(선택한 메모나 태그 연결)를 field로 묶은 개수만큼 memo_count를 UPDATE 한 번으로 줄인다"""
+    counts = rows.filter(**{field: OuterRef('pk')}).order_by().values(field).annotate(count=Count('*'))
+    model.objects.using(using).filter(pk__in=rows.order_by().values(field)).update(
+        memo_count=Greatest(F('memo_count') - Subquery(counts.values('count')), Value(0))
+    )
+
+
+def publish_result(user_id, kind, memo_ids, using):
+    # id로 고른 작업은 그 id 목록을, 목록 필터로 고른 작업은 다시 읽기를 알린다
+    event = memo_ids_event(kind, memo_ids) if memo_ids is not None else reload_event()
+    transaction.on_commit(partial(get_broker().publish, user_id, event), using=using)
+
+
+def delete_memos(user, selections, using, memo_ids=None):
+    """선택한 메모를 집합 단위 문장으로 지우고 폴더/태그 수와 통계를 한 번에 맞춘다
+
+    메모마다 시그널을 보내지 않고, id를 파이썬으로 읽어 오지도 않는다. 카운터는 지우기 전에
+    선택 조건으로 묶은 부분 쿼리로 줄인다. 같은 트랜잭션 안에서 불러야 한다.
+    memo_ids는 이벤트로 알릴 요청 id 목록이다 (전체 선택이면 None). 지운 메모 수를 돌려준다.
+    """
+    deleted = 0
+    size = 0
+    last_created_at = last_updated_at = None
+    for memos in selections:
+        summary = memos.aggregate(
+            count=Count('pk'), size=Sum(ByteLength('content')),
+            last_created_at=Max('created_at'), last_updated_at=Max('updated_at'),
+        )
+        if not summary['count']:
+            continue
+        subtract_counts(Folder, memos, 'folder', using)
+        subtract_counts(Tag, MemoTag.objects.using(using).filter(memo__in=memos), 'tag', using)
+        MemoChunk.objects.using(using).filter(memo__in=memos).delete()
+        MemoBucket.objects.using(using).filter(memo__in=memos).delete()
+        MemoSignature.objects.using(using).filter(memo__in=memos).delete()
+        # Memo.delete()는 메모마다 시그널을 보내므로 바로 지운다.
+        # 태그 필터는 태그 연결로 메모를 고르므로 연결은 메모를 지운 뒤에 한 번에 지운다
+        memos._raw_delete(using)
+        deleted += summary['count']
+        size += summary['size'] or 0
+        last_created_at = max(filter(None, [last_created_at, summary['last_created_at']]), default=None)
+        last_updated_at = max(filter(None, [last_updated_at, summary['last_updated_at']]), default=None)
+    if not deleted:
+        return deleted
+    MemoTag.objects.using(using).filter(tag__user=user).filter(
+        ~Exists(Memo.objects.using(using).filter(pk=OuterRef('memo_id')))
+    ).delete()
+    stats.apply_delta(user.pk, -deleted, -size, using=using)
+    stats.refresh_timestamps(user.pk, last_created_at, last_updated_at, using=using)
+    publish_result(user.pk, 'deleted', memo_ids, using)
+    return deleted
+
+
+def move_memos(user, selections, folder, using, memo_ids=None):
+    """선택한 메모를 폴더로 옮긴다 (folder가 None이면 폴더에서 뺀다). 옮긴 메모 수를 돌려준다"""
+    moved = 0
+    now = timezone.now()
+    for memos in selections:
+        # 이미 대상 폴더에 있는 메모는 건드리지 않는다
+        memos = memos.exclude(folder=folder) if folder is not None else memos.filter(folder__isnull=False)
+        # 옮기면 선택 조건에서 빠지므로 원래 폴더 수를 먼저 줄인다
+        subtract_counts(Folder, memos, 'folder', using)
+        moved += memos.update(folder=folder, updated_at=now)
+    if not moved:
+        return moved
+    if folder is not None:
+        Folder.objects.using(using).filter(pk=folder.pk).update(memo_count=F('memo_count') + moved)
+    stats.apply_delta(user.pk, updated_at=now, using=using)
+    publish_result(user.pk, 'moved', memo_ids, using)
+    return moved
+
+
+def log_result(action, user, requested, affected):
+    logger.info("Bulk %s by user %s: %d requested, %d affected", action, user.pk, requested, affected)
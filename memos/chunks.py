@@ -0,0 +1,101 @@
+"""
+메모 내용 조각
+
+조각은 읽기용 사본이다: 원본은 Memo.content이고, 저장할 때 시그널이 조각을 맞춘다.
+목록과 상세 화면은 content를 읽지 않고 조각만 읽는다 (수정 폼은 원본을 읽는다).
+
+내용을 두 번 저장하는 것은 일부러 고른 절충이다. 통계/할당량(ByteLength), 유사도 색인,
+관리자 내용 검색이 content 열 하나를 바로 쓰므로 원본을 조각으로 옮기지 않았다.
+그래서 요청당 메모리가 메모 크기와 상관없는 것은 읽기 화면뿐이고, 저장과 수정 폼은 전체 내용을 다룬다.
+"""
+
+import hashlib
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.models import Case, F, Value, When
+
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+
+def get_chunk_size():
+    # 조각 크기(문자 수)는 설정으로 조정할 수 있다
+    return getattr(settings, 'MEMO_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+
+
+def split_content(content, chunk_size=None):
+    """메모 내용을 chunk_size 문자 이하의 조각으로 나눈다
+
+    경계는 고정 위치가 아니라 내용으로 정한다: 조각 뒤쪽 절반에서 마지막 줄바꿈(없으면 공백) 뒤를 자른다.
+    글자를 넣거나 지워도 경계가 그 줄에 붙어 움직이므로 보통 고친 조각만 바뀐다.
+    줄바꿈도 공백도 없는 구간만 chunk_size 위치에서 자른다.
+    """
+    size = chunk_size or get_chunk_size()
+    start = 0
+    while start < len(content):
+        end = start + size
+        if end < len(content):
+            lower = start + size // 2
+            cut = content.rfind('\n', lower, end)
+            if cut < 0:
+                cut = content.rfind(' ', lower, end)
+            if cut >= 0:
+                end = cut + 1
+        yield content[start:end]
+        start = end
+
+
+def digest_chunk(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def sync_chunks(memo, using='default'):
+    """메모 내용을 조각 테이블과 동기화한다.
+
+    해시가 같은 조각은 내용을 다시 쓰지 않는다. 앞에서 조각이 늘거나 줄어 순번만 밀린 조각은
+    position만 바꾸고, 내용이 바뀐 조각만 다시 쓴다.
+    """
+    chunks = memo.chunks.db_manager(using)
+    chunk_model = chunks.model
+    existing = {position: digest for position, digest in chunks.values_list('position', 'digest')}
+    # 조각 내용은 들고 있지 않고 해시만 모은다. 다시 써야 하는 조각의 내용은 아래에서 다시 잘라 얻는다
+    new = [digest_chunk(text) for text in split_content(memo.content)]
+    kept = {position for position, digest in enumerate(new) if existing.get(position) == digest}
+    # 제자리가 아닌 같은 해시의 기존 조각 {해시: [기존 순번...]}
+    movable = defaultdict(list)
+    for position, digest in existing.items():
+        if position not in kept:
+            movable[digest].append(position)
+    moves = {}
+    writes = set()
+    for position, digest in enumerate(new):
+        if position in kept:
+            continue
+        if movable[digest]:
+            moves[movable[digest].pop()] = position
+        else:
+            writes.add(position)
+    sources = set(moves)
+    # 제자리에서 내용만 바꿀 수 있는 기존 조각 (다른 곳으로 옮기지 않는 것)
+    updatable = {position for position in writes if position in existing and position not in sources}
+    unused = set(existing) - kept - sources - updatable
+    if unused:
+        chunks.filter(position__in=unused).delete()
+    if moves:
+        # (memo, position) 유일 제약에 걸리지 않도록 기존 순번 밖으로 뺐다가 제자리로 옮긴다
+        offset = max(len(existing), len(new))
+        chunks.filter(position__in=sources).update(position=F('position') + offset)
+        chunks.filter(position__gte=offset).update(position=Case(
+            *[When(position=source + offset, then=Value(target)) for source, target in moves.items()]
+        ))
+    new_chunks = []
+    for position, text in enumerate(split_content(memo.content)):
+        if position not in writes:
+            continue
+        if position in updatable:
+            chunks.filter(position=position).update(content=text, digest=new[position])
+        else:
+            new_chunks.append(chunk_model(memo=memo, position=position, content=text, digest=new[position]))
+    if new_chunks:
+        chunk_model.objects.using(using).bulk_create(new_chunks)
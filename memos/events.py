@@ -0,0 +1,196 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+from datetime import timedelta
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """한 SSE 연결이 받는 이벤트 큐"""
+
+    def __init__(self, user_id, loop, max_pending):
+        self.user_id = user_id
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=max_pending)
+
+    def deliver(self, event):
+        # 이벤트 루프 스레드에서 실행된다. 너무 밀린 연결은 reload 이벤트로 대신한다.
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(reload_event())
+
+
+class EventBroker:
+    """사용자별 구독자에게 메모 이벤트를 나눠 주는 프로세스 내 pub/sub"""
+
+    def __init__(self, backend, max_pending=100):
+        self.backend = backend
+        self.max_pending = max_pending
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    async def asubscribe(self, user_id):
+        """구독한다. 백엔드가 먼저 구독 시점의 위치를 잡으므로 그 뒤에 발행된 이벤트는 빠짐없이 받는다"""
+        await self.backend.prepare(asyncio.get_running_loop())
+        return self.subscribe(user_id)
+
+    def subscribe(self, user_id):
+        subscription = Subscription(user_id, asyncio.get_running_loop(), self.max_pending)
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(subscription)
+        self.backend.start(self, subscription.loop)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.user_id, set())
+            subscribers.discard(subscription)
+            if not subscribers:
+                self._subscribers.pop(subscription.user_id, None)
+
+    def has_subscribers(self):
+        return bool(self._subscribers)
+
+    def publish(self, user_id, event):
+        self.backend.publish(self, user_id, event)
+
+    def dispatch(self, user_id, event):
+        """어느 스레드에서 불러도 되며, 구독자의 이벤트 루프로 넘긴다"""
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+            except RuntimeError:
+                # 이미 닫힌 루프
+                self.unsubscribe(subscription)
+
+
+class LocalBackend:
+    """같은 프로세스 안에서만 전달하는 백엔드 (단일 워커, 개발용)"""
+
+    async def prepare(self, loop):
+        pass
+
+    def start(self, broker, loop):
+        pass
+
+    def publish(self, broker, user_id, event):
+        broker.dispatch(user_id, event)
+
+
+class DatabaseBackend:
+    """memos_memoevent 테이블을 폴링해서 다른 프로세스의 이벤트도 전달하는 백엔드
+
+    연결 수와 상관없이 이벤트 루프마다 폴러 하나만 돈다.
+    """
+
+    def __init__(self):
+        self.poll_interval = getattr(settings, 'MEMO_EVENTS_POLL_INTERVAL', 1.0)
+        self.retention = getattr(settings, 'MEMO_EVENTS_RETENTION', 300)
+        self._last_id = None
+        self._last_prune = 0.0
+        self._tasks = {}
+
+    async def prepare(self, loop):
+        # 폴러가 멈춰 있으면 첫 폴링이 아니라 지금(구독 시점)의 마지막 id부터 읽는다.
+        # 첫 폴링 때 잡으면 구독과 첫 폴링 사이에 발행된 이벤트를 잃는다
+        if not any(not task.done() for task in self._tasks.values()):
+            self._last_id = await sync_to_async(self.latest_id)()
+
+    def latest_id(self):
+        from .models import MemoEvent
+        return MemoEvent.objects.order_by('pk').values_list('pk', flat=True).last() or 0
+
+    def start(self, broker, loop):
+        task = self._tasks.get(loop)
+        if task is None or task.done():
+            self._tasks[loop] = loop.create_task(self.run(broker))
+
+    def publish(self, broker, user_id, event):
+        from .models import MemoEvent
+        MemoEvent.objects.create(user_id=user_id, payload=event)
+        # 구독자가 없어 폴러가 돌지 않는 프로세스(serve, runserver)에서도 테이블이 계속 커지지 않게 한다
+        self.prune()
+
+    def prune(self):
+        """보존 시간이 지난 이벤트를 지운다 (프로세스마다 보존 시간에 한 번만)"""
+        from .models import MemoEvent
+        if time.monotonic() - self._last_prune <= self.retention:
+            return
+        self._last_prune = time.monotonic()
+        MemoEvent.objects.filter(created_at__lt=timezone.now() - timedelta(seconds=self.retention)).delete()
+
+    async def run(self, broker):
+        while broker.has_subscribers():
+            try:
+                await sync_to_async(self.poll_once)(broker)
+            except Exception:
+                logger.exception("Memo event polling failed")
+            await asyncio.sleep(self.poll_interval)
+
+    def poll_once(self, broker):
+        from .models import MemoEvent
+        events = MemoEvent.objects.order_by('pk')
+        if self._last_id is None:
+            # prepare 없이 구독했으면 처음 폴링할 때는 지난 이벤트를 다시 보내지 않는다
+            self._last_id = self.latest_id()
+            return
+        for pk, user_id, payload in events.filter(pk__gt=self._last_id).values_list('pk', 'user_id', 'payload'):
+            self._last_id = pk
+            broker.dispatch(user_id, payload)
+        self.prune()
+
+
+_broker = None
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        backend = import_string(getattr(settings, 'MEMO_EVENTS_BACKEND', 'memos.events.LocalBackend'))()
+        _broker = EventBroker(backend, max_pending=getattr(settings, 'MEMO_EVENTS_MAX_PENDING', 100))
+    return _broker
+
+
+@receiver(setting_changed)
+def reset_broker(setting, **kwargs):
+    global _broker
+    if setting.startswith('MEMO_EVENTS_'):
+        _broker = None
+
+
+def format_event(event):
+    """SSE 형식으로 직렬화한다"""
+    return f"event: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+
+def memo_event(kind, memo):
+    event = {'type': kind, 'id': memo.pk}
+    if kind != 'deleted':
+        event['title'] = memo.title
+        event['created_at'] = timezone.localtime(memo.created_at).strftime('%Y-%m-%d %H:%M')
+    return event
+
+
+def reload_event():
+    """목록 전체를 다시 읽으라는 이벤트 (바뀐 메모를 하나씩 알릴 수 없을 때)"""
+    return {'type': 'reload'}
+
+
+def memo_ids_event(kind, ids):
+    """일괄 작업 이벤트 (메모 하나씩 보내지 않고 id 목록으로 한 번에 보낸다)"""
+    return {'type': kind, 'ids': list(ids)}
@@ -0,0 +1,14 @@
+from django.db.models import BigIntegerField, Func
+
+
+class ByteLength(Func):
+    """문자열 컬럼의 UTF-8 바이트 길이"""
+    function = 'LENGTH'
+    output_field = BigIntegerField()
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        # SQLite의 LENGTH()는 문자 수를 세므로 BLOB으로 바꿔 바이트를 센다
+        return self.as_sql(compiler, connection, template='%(function)s(CAST(%(expressions)s AS BLOB))', **extra_context)
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, function='OCTET_LENGTH', **extra_context)
@@ -1,7 +1,10 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
-from .models import Memo
+from django.template.defaultfilters import filesizeformat
+from .limits import get_max_content_size, normalize_content
+from .models import Folder, Memo, Tag
+from .sharding import shard_for_user
 
 class SignUpForm(UserCreationForm):
     email = forms.EmailField(required=True)
@@ -11,6 +14,92 @@ class SignUpForm(UserCreationForm):
         fields = ("username", "email", "password1", "password2")
 
 class MemoForm(forms.ModelForm):
+    folder_name = forms.CharField(label="Папка", required=False, max_length=100)
+    tag_names = forms.CharField(label="Теги (через запятую)", required=False, max_length=500)
+
     class Meta:
         model = Memo
         fields = ["title", "content"]
+
+    def __init__(self, *args, user=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._user = user
+        # clean_content에서 구한 내용 크기(UTF-8 바이트), 할당량 검사에 다시 쓴다
+        self.content_size = None
+        if self.instance.pk:
+            if self.instance.folder_id:
+                self.fields["folder_name"].initial = self.instance.folder.name
+            self.fields["tag_names"].initial = ", ".join(self.instance.tags.values_list("name", flat=True))
+
+    def clean_content(self):
+        content = self.cleaned_data["content"]
+        limit = get_max_content_size()
+        message = f"Заметка слишком большая (максимум {filesizeformat(limit)})."
+        # 문자 수가 한도를 넘으면 바이트 수는 볼 필요도 없다
+        if len(content) > limit:
+            raise forms.ValidationError(message, code="content_too_large")
+        content = normalize_content(content)
+        self.content_size = len(content.encode("utf-8"))
+        if self.content_size > limit:
+            raise forms.ValidationError(message, code="content_too_large")
+        return content
+
+    def clean_tag_names(self):
+        # 공백과 중복을 정리한 태그 이름 목록
+        names = []
+        for name in self.cleaned_data["tag_names"].split(","):
+            name = name.strip()
+            if name and name not in names:
+                names.append(name)
+        return names
+
+    def _get_user(self):
+        return self._user or self.instance.user
+
+    def save(self, commit=True):
+        folder_name = self.cleaned_data.get("folder_name")
+        if folder_name:
+            user = self._get_user()
+            folders = Folder.objects.using(shard_for_user(user))
+            self.instance.folder, _ = folders.get_or_create(user=user, name=folder_name)
+        else:
+            self.instance.folder = None
+        return super().save(commit=commit)
+
+    def _save_m2m(self):
+        super()._save_m2m()
+        user = self._get_user()
+        user_tags = Tag.objects.using(shard_for_user(user))
+        tags = [user_tags.get_or_create(user=user, name=name)[0] for name in self.cleaned_data.get("tag_names", [])]
+        self.instance.tags.set(tags)
+
+
+class MemoBulkForm(forms.Form):
+    ACTION_CHOICES = [("delete", "Удалить"), ("move", "Переместить в папку")]
+
+    action = forms.ChoiceField(label="Действие", choices=ACTION_CHOICES)
+    # 체크한 메모 id (스크립트가 쉼표로 이어 붙인 값 하나로 보낼 수도 있다)
+    memo_ids = forms.Field(required=False, widget=forms.MultipleHiddenInput)
+    # 목록 필터에 맞는 메모 전체에 적용
+    select_all = forms.BooleanField(required=False)
+    folder_name = forms.CharField(label="Папка", required=False, max_length=100)
+    folder = forms.CharField(required=False)
+    tag = forms.CharField(required=False)
+
+    def clean_memo_ids(self):
+        memo_ids = []
+        for value in self.cleaned_data["memo_ids"] or []:
+            for item in str(value).split(","):
+                item = item.strip()
+                if not item:
+                    continue
+                if not item.isdigit():
+                    raise forms.ValidationError("Некорректный список заметок.")
+                memo_ids.append(int(item))
+        return list(dict.fromkeys(memo_ids))
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if not cleaned_data.get("select_all") and not cleaned_data.get("memo_ids"):
+            raise forms.ValidationError("Выберите заметки.")
+        return cleaned_data
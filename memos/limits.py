@@ -0,0 +1,83 @@
+import re
+from django.conf import settings
+from django.core.exceptions import RequestDataTooBig
+from django.http import HttpResponse
+from django.urls import Resolver404, resolve
+from django.utils.deprecation import MiddlewareMixin
+
+
+DEFAULT_MAX_CONTENT_SIZE = 1024 * 1024
+
+CONTROL_CHARACTERS = r'\x00-\x08\x0b\x0c\x0e-\x1f\x7f'
+
+# 줄 끝 공백, CR/CRLF, 제어 문자를 한 번의 검색으로 찾는다.
+# 줄 끝 덩어리에는 지워질 제어 문자도 넣어서 'a \x00\n'의 공백도 같은 번에 지운다 (두 번 정리해도 같다).
+# 덩어리는 시작 위치에서만 잡아서(뒤돌아보기) 긴 공백 입력에도 선형 시간이 걸린다.
+CONTENT_CLEANUP = re.compile(
+    rf'(?<![ \t{CONTROL_CHARACTERS}])[ \t{CONTROL_CHARACTERS}]+(?=[\r\n]|\Z)|\r\n?|[{CONTROL_CHARACTERS}]'
+)
+
+
+def get_max_content_size():
+    # 메모 내용 최대 크기(UTF-8 바이트)
+    return getattr(settings, 'MEMO_MAX_CONTENT_SIZE', DEFAULT_MAX_CONTENT_SIZE)
+
+
+def get_max_request_size():
+    # 메모 저장 요청 본문 최대 크기 (폼 인코딩과 나머지 필드 포함)
+    return getattr(settings, 'MEMO_MAX_REQUEST_SIZE', settings.DATA_UPLOAD_MAX_MEMORY_SIZE)
+
+
+def _replace(match):
+    return '\n' if match.group()[0] == '\r' else ''
+
+
+def normalize_content(content):
+    """줄바꿈을 LF로 맞추고 줄 끝 공백과 제어 문자를 지운다"""
+    return CONTENT_CLEANUP.sub(_replace, content)
+
+
+def too_large_response():
+    return HttpResponse(
+        "Слишком большой запрос.", status=413, content_type='text/plain; charset=utf-8'
+    )
+
+
+# 크기 제한을 거는 메모 저장 URL 이름
+LIMITED_URL_NAMES = frozenset({'memo_create', 'memo_update'})
+
+
+def get_content_length(request):
+    try:
+        return int(request.META.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        return 0
+
+
+def is_limited_url(request):
+    try:
+        match = resolve(request.path_info, getattr(request, 'urlconf', None))
+    except Resolver404:
+        return False
+    return match.url_name in LIMITED_URL_NAMES
+
+
+class RequestSizeLimitMiddleware(MiddlewareMixin):
+    """메모 저장 요청이 너무 크면 본문을 읽기 전에 413으로 돌려보낸다
+
+    CsrfViewMiddleware가 토큰을 찾으려고 request.POST를 읽기 전에 검사해야 하므로
+    MIDDLEWARE에서 CsrfViewMiddleware보다 앞에 둔다.
+    Content-Length가 한도 안이어도 폼 필드가 DATA_UPLOAD_MAX_MEMORY_SIZE를 넘으면
+    (RequestDataTooBig) CSRF 검사의 400 대신 413으로 응답한다.
+    """
+
+    def process_request(self, request):
+        if request.method != "POST" or not is_limited_url(request):
+            return None
+        if get_content_length(request) > get_max_request_size():
+            return too_large_response()
+        try:
+            request.POST
+        except RequestDataTooBig:
+            return too_large_response()
+        return None
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from memos import similarity
+from memos.models import Memo
+from memos.sharding import get_data_aliases
+
+
+class Command(BaseCommand):
+    help = "유사 메모 찾기용 MinHash 서명과 LSH 버킷이 없는 메모를 배치로 채웁니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', help="처리할 데이터베이스 별칭 (생략하면 모든 샤드)")
+        parser.add_argument('--batch-size', type=int, default=500, help="한 트랜잭션에서 처리할 메모 수")
+        parser.add_argument('--rebuild', action='store_true', help="이미 서명이 있는 메모도 다시 계산합니다.")
+
+    def handle(self, *args, **options):
+        aliases = [options['database']] if options['database'] else get_data_aliases()
+        total = sum(self.backfill(using, options['batch_size'], options['rebuild']) for using in aliases)
+        self.stdout.write(self.style.SUCCESS(f"{total} memo(s) indexed."))
+
+    def backfill(self, using, batch_size, rebuild):
+        memos = Memo.objects.using(using).only('pk', 'user_id', 'title', 'content').order_by('pk')
+        if not rebuild:
+            memos = memos.filter(signature__isnull=True)
+        last_pk = 0
+        indexed = 0
+        while batch := list(memos.filter(pk__gt=last_pk)[:batch_size]):
+            # 배치 전체의 서명을 한 번에 계산한다
+            signatures = similarity.compute_signatures([similarity.memo_text(memo) for memo in batch])
+            with transaction.atomic(using=using):
+                similarity.write_index(list(zip(batch, signatures)), using)
+            last_pk = batch[-1].pk
+            indexed += len(batch)
+        if indexed:
+            self.stdout.write(f"{using}: {indexed} memo(s)")
+        return indexed
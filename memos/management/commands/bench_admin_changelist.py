@@ -0,0 +1,86 @@
+import random
+import time
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = "임시 테스트 DB에 메모를 채우고 관리자 메모 목록 로딩 시간을 성능 모드 켜고/끄고 비교합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000, help="채울 메모 수")
+        parser.add_argument('--users', type=int, default=1_000, help="메모를 나눠 가질 사용자 수")
+        parser.add_argument('--repeat', type=int, default=3, help="요청마다 반복 측정 횟수 (가장 빠른 값을 사용)")
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            self.populate(options['rows'], options['users'])
+            client = Client()
+            client.force_login(User.objects.create_superuser('bench-admin', 'bench@example.com', 'bench-password'))
+            url = reverse('admin:memos_memo_changelist')
+            cases = [
+                ("first page", {}),
+                ("page 500", {'p': 500}),
+                ("cursor page", {'cursor': options['rows'] // 2}),
+                ("search username", {'q': 'bench-user-7'}),
+                ("search title prefix", {'q': 'memo 12345'}),
+                ("date drill-down", {'created_at__year': timezone.now().year}),
+            ]
+            self.stdout.write(f"{'case':<22}{'default (ms)':>14}{'performance (ms)':>18}")
+            for label, params in cases:
+                timings = []
+                for mode in (False, True):
+                    with override_settings(MEMO_ADMIN_PERFORMANCE_MODE=mode):
+                        if not mode and 'cursor' in params:
+                            timings.append(None)
+                            continue
+                        timings.append(self.measure(client, url, params, options['repeat']))
+                default, performance = (f"{t * 1000:.1f}" if t is not None else "-" for t in timings)
+                self.stdout.write(f"{label:<22}{default:>14}{performance:>18}")
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+    def measure(self, client, url, params, repeat):
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            response = client.get(url, params)
+            elapsed = time.perf_counter() - started
+            if response.status_code != 200:
+                raise RuntimeError(f"{url} {params} returned {response.status_code}")
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    def populate(self, rows, users):
+        # 시그널(조각/통계/이벤트)을 거치지 않도록 SQL로 직접 넣는다
+        self.stdout.write(f"Populating {rows} memos for {users} users...")
+        started = time.perf_counter()
+        user_ids = [
+            user.pk for user in User.objects.bulk_create(
+                User(username=f'bench-user-{index}', password='!') for index in range(users)
+            )
+        ]
+        now = timezone.now()
+        batch = 10_000
+        with connection.cursor() as cursor:
+            for start in range(0, rows, batch):
+                values = []
+                for index in range(start, min(start + batch, rows)):
+                    created = now - timedelta(minutes=rows - index)
+                    values.append((random.choice(user_ids), f'memo {index}', 'x' * 200, created, created))
+                cursor.executemany(
+                    "INSERT INTO memos_memo (user_id, title, content, created_at, updated_at) VALUES (%s, %s, %s, %s, %s)",
+                    values,
+                )
+            if connection.vendor == 'sqlite':
+                cursor.execute("ANALYZE")
+        self.stdout.write(f"Populated in {time.perf_counter() - started:.1f}s")
@@ -0,0 +1,78 @@
+from itertools import groupby
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from memos import similarity
+from memos.models import Memo, MemoBucket, MemoSignature
+from memos.sharding import batched, get_data_aliases
+
+
+class Command(BaseCommand):
+    help = "사용자별로 거의 같은 메모 묶음을 보고합니다. 같은 LSH 버킷에 있는 메모만 비교합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', action='append', default=[], help="검사할 사용자 이름 (여러 번 지정 가능)")
+        parser.add_argument('--threshold', type=float, default=0.8, help="같은 묶음으로 볼 최소 유사도 (0~1)")
+        parser.add_argument('--database', help="검사할 데이터베이스 별칭 (생략하면 모든 샤드)")
+
+    def handle(self, *args, **options):
+        if not 0 < options['threshold'] <= 1:
+            raise CommandError("--threshold must be between 0 and 1.")
+        user_ids = None
+        if options['user']:
+            user_ids = list(get_user_model().objects.filter(username__in=options['user']).values_list('pk', flat=True))
+            if len(user_ids) != len(set(options['user'])):
+                raise CommandError("Unknown user in --user.")
+        aliases = [options['database']] if options['database'] else get_data_aliases()
+        groups = duplicates = 0
+        for using in aliases:
+            for user_id, clusters in self.find_clusters(using, user_ids, options['threshold']):
+                titles = dict(Memo.objects.using(using).filter(
+                    pk__in=[pk for cluster in clusters for pk in cluster]
+                ).values_list('pk', 'title'))
+                self.stdout.write(f"user {user_id} ({using}): {len(clusters)} group(s)")
+                for cluster in clusters:
+                    self.stdout.write(f"  {', '.join(map(str, cluster))}: {titles.get(cluster[0], '')}")
+                groups += len(clusters)
+                duplicates += sum(len(cluster) - 1 for cluster in clusters)
+        self.stdout.write(self.style.SUCCESS(
+            f"{groups} group(s) of near-duplicate memos, {duplicates} memo(s) could be removed."
+        ))
+
+    def find_clusters(self, using, user_ids, threshold):
+        """(사용자, 묶음 목록)을 사용자 순서대로 돌려준다. 묶음은 메모 id 목록"""
+        buckets = MemoBucket.objects.using(using).order_by('user_id', 'band', 'bucket', 'memo_id')
+        if user_ids is not None:
+            buckets = buckets.filter(user_id__in=user_ids)
+        rows = buckets.values_list('user_id', 'band', 'bucket', 'memo_id').iterator(chunk_size=2000)
+        for user_id, user_rows in groupby(rows, key=lambda row: row[0]):
+            # 같은 버킷의 메모는 첫 메모와만 비교한다 (다른 밴드에서 나머지 쌍이 이어진다)
+            pairs = set()
+            for _, members in groupby(user_rows, key=lambda row: row[1:3]):
+                memo_ids = [row[3] for row in members]
+                pairs.update((memo_ids[0], memo_id) for memo_id in memo_ids[1:])
+            clusters = self.cluster(using, pairs, threshold)
+            if clusters:
+                yield user_id, clusters
+
+    def cluster(self, using, pairs, threshold):
+        memo_ids = sorted({memo_id for pair in pairs for memo_id in pair})
+        signatures = {}
+        for batch in batched(memo_ids, 900):
+            rows = MemoSignature.objects.using(using).filter(memo_id__in=batch).values_list('memo_id', 'signature')
+            signatures.update((memo_id, similarity.decode_signature(data)) for memo_id, data in rows)
+        parents = {}
+
+        def find(memo_id):
+            while parents.get(memo_id, memo_id) != memo_id:
+                memo_id = parents[memo_id]
+            return memo_id
+
+        for first, second in sorted(pairs):
+            if first not in signatures or second not in signatures:
+                continue
+            if similarity.estimate_similarity(signatures[first], signatures[second]) >= threshold:
+                parents[find(second)] = find(first)
+        clusters = {}
+        for memo_id in parents:
+            clusters.setdefault(find(memo_id), set()).add(memo_id)
+        return sorted(sorted(members | {root}) for root, members in clusters.items())
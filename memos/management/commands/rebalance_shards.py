@@ -0,0 +1,62 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+from memos import sharding
+from memos.models import Folder, Memo, MemoStats, ShardAssignment, Tag
+
+
+class Command(BaseCommand):
+    help = "사용자 메모를 해시 링이 가리키는 샤드로 옮깁니다. 옮기는 동안에도 원래 샤드에서 읽을 수 있습니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', action='append', default=[], help="옮길 사용자 이름 (여러 번 지정 가능)")
+        parser.add_argument('--to', help="대상 샤드 (생략하면 해시 링이 정한 샤드)")
+        parser.add_argument('--batch-size', type=int, default=500, help="한 트랜잭션에서 복사/삭제할 메모 수")
+        parser.add_argument('--grace', type=float, default=5.0,
+                            help="쓰기를 막은 뒤와 샤드를 바꾼 뒤 진행 중인 요청을 기다리는 시간(초)")
+        parser.add_argument('--dry-run', action='store_true', help="옮길 사용자만 보여주고 옮기지 않습니다.")
+
+    def handle(self, *args, **options):
+        if not sharding.is_enabled():
+            raise CommandError("Sharding is disabled (set MEMO_SHARDS).")
+        target = options['to']
+        if target is not None and target not in sharding.get_shard_aliases():
+            raise CommandError(f"Unknown shard: {target}")
+        self.adopt_default_users()
+        moves = self.plan_moves(options['user'], target)
+        for user_id, source, destination in moves:
+            self.stdout.write(f"user {user_id}: {source} -> {destination}")
+            if options['dry_run']:
+                continue
+            copied = sharding.move_user(user_id, destination, batch_size=options['batch_size'], grace=options['grace'])
+            self.stdout.write(f"  {copied} memo(s) moved")
+        verb = "to move" if options['dry_run'] else "moved"
+        self.stdout.write(self.style.SUCCESS(f"{len(moves)} user(s) {verb}."))
+
+    def adopt_default_users(self):
+        # 샤딩을 켜기 전부터 default에 데이터가 있던 사용자는 default 배정으로 기록해 둔다
+        user_ids = set()
+        for model in (Memo, MemoStats, Folder, Tag):
+            user_ids.update(model.objects.using(DEFAULT_DB_ALIAS).values_list('user_id', flat=True).distinct())
+        assigned = set(ShardAssignment.objects.filter(user_id__in=user_ids).values_list('user_id', flat=True))
+        ShardAssignment.objects.bulk_create(
+            [ShardAssignment(user_id=user_id, shard=DEFAULT_DB_ALIAS) for user_id in sorted(user_ids - assigned)],
+            ignore_conflicts=True,
+        )
+
+    def plan_moves(self, usernames, target):
+        assignments = ShardAssignment.objects.order_by('user_id')
+        if usernames:
+            user_ids = list(get_user_model().objects.filter(username__in=usernames).values_list('pk', flat=True))
+            if len(user_ids) != len(set(usernames)):
+                raise CommandError("Unknown user in --user.")
+            for user_id in user_ids:
+                sharding.get_assignment(user_id)
+            assignments = assignments.filter(user_id__in=user_ids)
+        ring = sharding.get_ring()
+        moves = []
+        for assignment in assignments:
+            destination = target or ring.get(assignment.user_id)
+            if assignment.shard != destination:
+                moves.append((assignment.user_id, assignment.shard, destination))
+        return moves
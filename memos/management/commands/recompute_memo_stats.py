@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from memos.models import MemoStats
+from memos.sharding import get_data_aliases
+from memos.stats import compute_stats
+
+
+FIELDS = ('memo_count', 'content_bytes', 'last_created_at', 'last_updated_at')
+
+
+class Command(BaseCommand):
+    help = "사용자별 메모 통계를 메모 테이블과 비교하고 어긋난 행을 복구합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="어긋난 행만 보고하고 고치지 않습니다.")
+        parser.add_argument('--database', help="검사할 데이터베이스 별칭 (생략하면 모든 샤드)")
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        aliases = [options['database']] if options['database'] else get_data_aliases()
+        drifted = sum(self.check_database(using, dry_run) for using in aliases)
+        if dry_run:
+            self.stdout.write(f"{drifted} drifted row(s) found.")
+        else:
+            self.stdout.write(self.style.SUCCESS(f"{drifted} drifted row(s) repaired."))
+
+    def check_database(self, using, dry_run):
+        empty = {'memo_count': 0, 'content_bytes': 0, 'last_created_at': None, 'last_updated_at': None}
+        with transaction.atomic(using=using):
+            actual = compute_stats(using=using)
+            stored = {row.user_id: row for row in MemoStats.objects.using(using).select_for_update()}
+            drifted = 0
+            for user_id in sorted(set(actual) | set(stored)):
+                expected = {**empty, **actual.get(user_id, {})}
+                expected['content_bytes'] = expected['content_bytes'] or 0
+                row = stored.get(user_id)
+                current = {field: getattr(row, field) for field in FIELDS} if row else empty
+                if current == expected:
+                    continue
+                drifted += 1
+                self.stdout.write(f"user {user_id}: {current} -> {expected}")
+                if dry_run:
+                    continue
+                if row is None:
+                    MemoStats.objects.using(using).create(user_id=user_id, **expected)
+                else:
+                    MemoStats.objects.using(using).filter(pk=row.pk).update(**expected)
+        return drifted
@@ -0,0 +1,52 @@
+import os
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import get_internal_wsgi_application
+from memos import metrics
+from memos.server import PreforkServer
+
+
+class Command(BaseCommand):
+    help = "prefork 방식으로 여러 워커 프로세스를 띄워 애플리케이션을 서비스합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bind', default=os.environ.get('SERVE_BIND', '127.0.0.1:8000'),
+                            help="수신 주소 (host:port)")
+        parser.add_argument('--workers', type=int, default=int(os.environ.get('WEB_CONCURRENCY', 2)),
+                            help="워커 프로세스 수")
+        parser.add_argument('--threads', type=int, default=int(os.environ.get('SERVE_THREADS', 4)),
+                            help="워커당 요청 처리 스레드 수")
+        parser.add_argument('--no-preload', action='store_false', dest='preload',
+                            help="fork 전에 애플리케이션을 미리 읽지 않습니다. SIGHUP 시 URLconf, 뷰, 폼, 템플릿만 "
+                                 "새로 읽고, 설정과 모델 등 마스터가 읽은 모듈은 재시작해야 반영됩니다.")
+        parser.add_argument('--graceful-timeout', type=float, default=30,
+                            help="워커 정상 종료를 기다리는 시간(초)")
+
+    def handle(self, *args, **options):
+        profile = getattr(settings, 'SETTINGS_PROFILE', 'web')
+        if profile in getattr(settings, 'LEAN_PROFILES', ()):
+            # 가벼운 프로필에는 admin과 crispy가 없어서 화면을 그릴 수 없다
+            raise CommandError(f"serve renders pages and cannot run with SETTINGS_PROFILE={profile}; use web.")
+        host, _, port = options['bind'].rpartition(':')
+        if not host or not port.isdigit():
+            raise CommandError("--bind must be in host:port form.")
+        if options['workers'] < 1 or options['threads'] < 1:
+            raise CommandError("--workers and --threads must be at least 1.")
+        server = PreforkServer(
+            get_internal_wsgi_application,
+            bind=(host.strip('[]'), int(port)),
+            workers=options['workers'],
+            threads=options['threads'],
+            preload=options['preload'],
+            graceful_timeout=options['graceful_timeout'],
+        )
+        address = server.listen()
+        # 이전 실행의 워커 메트릭 파일은 새 워커 값과 합치지 않는다
+        metrics.clear_directory()
+        self.stdout.write(
+            f"Listening on http://{address[0]}:{address[1]}/ "
+            f"(workers={options['workers']}, threads={options['threads']}, preload={options['preload']}, "
+            f"master pid={os.getpid()})"
+        )
+        self.stdout.flush()
+        server.run()
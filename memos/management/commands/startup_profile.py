@@ -0,0 +1,41 @@
+import json
+from django.core.management.base import BaseCommand
+from memos.startup import measure_startup, summarize_packages
+
+
+class Command(BaseCommand):
+    help = "새 프로세스의 import 시간(-X importtime)과 Django 앱 레지스트리 구성 시간을 보고합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profile', choices=['web', 'headless', 'command'], default='web',
+                            help="측정할 SETTINGS_PROFILE")
+        parser.add_argument('--limit', type=int, default=15, help="보여줄 모듈/패키지 수")
+        parser.add_argument('--json', action='store_true', help="JSON으로 출력합니다.")
+
+    def handle(self, *args, **options):
+        report = measure_startup(options['profile'])
+        limit = options['limit']
+        packages = summarize_packages(report['imports'])[:limit]
+        slowest = sorted(report['imports'], key=lambda row: row[2], reverse=True)[:limit]
+        if options['json']:
+            self.stdout.write(json.dumps({
+                'profile': options['profile'],
+                'settings_seconds': report['settings'],
+                'setup_seconds': report['setup'],
+                'import_seconds': report['import_total'],
+                'installed_apps': report['installed_apps'],
+                'packages': packages,
+                'modules': [{'module': m, 'self': own, 'cumulative': cum} for m, own, cum, depth in slowest],
+            }, indent=2))
+            return
+        self.stdout.write(f"Profile: {options['profile']} ({len(report['installed_apps'])} apps, "
+                          f"{len(report['modules'])} modules loaded)")
+        self.stdout.write(f"  settings import      {report['settings'] * 1000:8.1f} ms")
+        self.stdout.write(f"  django.setup()       {report['setup'] * 1000:8.1f} ms")
+        self.stdout.write(f"  total import time    {report['import_total'] * 1000:8.1f} ms")
+        self.stdout.write("\nSelf import time by top-level package:")
+        for package, seconds in packages:
+            self.stdout.write(f"  {seconds * 1000:8.1f} ms  {package}")
+        self.stdout.write("\nSlowest imports (cumulative):")
+        for module, own, cumulative, depth in slowest:
+            self.stdout.write(f"  {cumulative * 1000:8.1f} ms  {module}")
@@ -0,0 +1,432 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from contextlib import ExitStack
+from pathlib import Path
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import connections
+
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+# 레이블 값이 끝없이 늘지 않도록 나머지 메서드는 other로 센다
+METHODS = frozenset({'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'})
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value))
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(names, values, extra=''):
+    pairs = [f'{name}="{escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    """늘어나기만 하는 값. 레이블 값 튜플마다 따로 센다"""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues, amount=1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._values)
+
+    def reset(self):
+        with self._lock:
+            self._values = {}
+
+    @staticmethod
+    def merge(total, value):
+        return value if total is None else total + value
+
+    def render(self, values):
+        for labelvalues, value in sorted(values.items()):
+            yield f'{self.name}{format_labels(self.labelnames, labelvalues)} {format_value(value)}'
+
+
+class Histogram(Counter):
+    """구간별 관측 수와 합계. 값은 [구간별 수..., +Inf 구간 수, 합계] 목록으로 둔다"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labelvalues):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            row = self._values.get(labelvalues)
+            if row is None:
+                row = self._values[labelvalues] = [0] * (len(self.buckets) + 2)
+            row[index] += 1
+            row[-1] += value
+
+    def snapshot(self):
+        with self._lock:
+            return {labelvalues: list(row) for labelvalues, row in self._values.items()}
+
+    @staticmethod
+    def merge(total, value):
+        return list(value) if total is None else [a + b for a, b in zip(total, value)]
+
+    def render(self, values):
+        for labelvalues, row in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), row):
+                cumulative += count
+                labels = format_labels(self.labelnames, labelvalues, f'le="{format_value(bound)}"')
+                yield f'{self.name}_bucket{labels} {format_value(cumulative)}'
+            labels = format_labels(self.labelnames, labelvalues)
+            yield f'{self.name}_sum{labels} {format_value(row[-1])}'
+            yield f'{self.name}_count{labels} {format_value(cumulative)}'
+
+
+class Gauge:
+    """수집할 때 함수로 구하는 현재 값 (프로세스 사이에서 합치지 않는다)
+
+    함수가 DB를 읽으므로 MEMO_METRICS_GAUGE_TTL초 동안은 마지막 값을 다시 쓴다.
+    """
+
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, function):
+        self.name = name
+        self.documentation = documentation
+        self.function = function
+        self._cached = None
+        self._lock = threading.Lock()
+
+    def reset(self):
+        self._cached = None
+
+    def value(self):
+        ttl = getattr(settings, 'MEMO_METRICS_GAUGE_TTL', 15.0)
+        now = time.monotonic()
+        with self._lock:
+            if self._cached is not None and now - self._cached[0] < ttl:
+                return self._cached[1]
+        value = self.function()
+        with self._lock:
+            self._cached = (now, value)
+        return value
+
+    def render(self, values):
+        yield f'{self.name} {format_value(self.value())}'
+
+
+def process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class Registry:
+    """메트릭 모음
+
+    MEMO_METRICS_DIR를 설정하면 프로세스마다 값을 그 디렉터리의 파일에 주기적으로 써 두고,
+    수집할 때 모든 파일을 합친다 (prefork 워커 여러 개).
+    끝난 프로세스(재시작된 워커)의 파일은 수집하는 프로세스가 값을 넘겨받고 지운다.
+    """
+
+    def __init__(self):
+        self.metrics = []
+        self._token = uuid.uuid4().hex
+        self._last_flush = 0.0
+        self._flush_lock = threading.Lock()
+        # 끝난 프로세스에서 넘겨받은 값 {메트릭 이름: {레이블 값: 값}}
+        self._adopted = {}
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def reset(self):
+        # fork한 자식은 부모의 값을 물려받지 않고 자기 파일에 따로 쓴다
+        for metric in self.metrics:
+            if hasattr(metric, 'reset'):
+                metric.reset()
+        self._token = uuid.uuid4().hex
+        self._last_flush = 0.0
+        self._flush_lock = threading.Lock()
+        self._adopted = {}
+
+    def get_directory(self):
+        directory = getattr(settings, 'MEMO_METRICS_DIR', '')
+        return Path(directory) if directory else None
+
+    def snapshot(self):
+        data = {}
+        for metric in self.metrics:
+            if not hasattr(metric, 'snapshot'):
+                continue
+            values = metric.snapshot()
+            for key, value in self._adopted.get(metric.name, {}).items():
+                values[key] = metric.merge(values.get(key), value)
+            data[metric.name] = values
+        return data
+
+    def flush(self, force=True):
+        """이 프로세스의 값을 파일에 쓴다 (force가 아니면 MEMO_METRICS_FLUSH_INTERVAL마다 한 번)
+
+        메트릭 때문에 요청이 실패하지 않도록 쓰기 오류는 로그만 남긴다.
+        """
+        directory = self.get_directory()
+        if directory is None:
+            return
+        # 요청 스레드는 다른 스레드가 쓰는 중이면 기다리지 않고 넘어간다
+        if not self._flush_lock.acquire(blocking=force):
+            return
+        try:
+            now = time.monotonic()
+            if not force and now - self._last_flush < getattr(settings, 'MEMO_METRICS_FLUSH_INTERVAL', 1.0):
+                return
+            self._last_flush = now
+            self._write(directory)
+        except OSError:
+            logger.warning("Could not write metrics to %s", directory, exc_info=True)
+        finally:
+            self._flush_lock.release()
+
+    def _write(self, directory):
+        directory.mkdir(parents=True, exist_ok=True)
+        data = {name: [[list(key), value] for key, value in values.items()] for name, values in self.snapshot().items()}
+        prefix = f'{os.getpid()}-{self._token}'
+        descriptor, temporary = tempfile.mkstemp(dir=directory, prefix=f'{prefix}-', suffix='.tmp')
+        try:
+            with os.fdopen(descriptor, 'w') as file:
+                json.dump(data, file)
+            os.replace(temporary, directory / f'{prefix}.json')
+        except BaseException:
+            Path(temporary).unlink(missing_ok=True)
+            raise
+
+    def adopt_dead_processes(self, directory):
+        """끝난 프로세스의 파일을 지우고 그 값을 이 프로세스의 값에 더한다
+
+        카운터가 줄어들지 않도록 값은 버리지 않고 넘겨받는다. 파일 이름을 먼저 바꿔서
+        여러 프로세스가 동시에 수집해도 한 프로세스만 넘겨받는다.
+        """
+        kinds = {metric.name: metric for metric in self.metrics}
+        adopted = False
+        for path in directory.glob('*.json'):
+            pid = path.name.split('-', 1)[0]
+            if not pid.isdigit() or process_alive(int(pid)):
+                continue
+            claimed = path.with_name(f'{path.name}.{self._token}.adopt')
+            try:
+                os.rename(path, claimed)
+                data = json.loads(claimed.read_text())
+            except FileNotFoundError:
+                # 다른 프로세스가 먼저 넘겨받았다
+                continue
+            except (OSError, ValueError):
+                logger.warning("Could not read metrics file %s", path, exc_info=True)
+                claimed.unlink(missing_ok=True)
+                continue
+            with self._flush_lock:
+                for name, rows in data.items():
+                    metric = kinds.get(name)
+                    if metric is None:
+                        continue
+                    values = self._adopted.setdefault(name, {})
+                    for key, value in rows:
+                        key = tuple(key)
+                        values[key] = metric.merge(values.get(key), value)
+            adopted = True
+            claimed.unlink(missing_ok=True)
+        return adopted
+
+    def collect(self):
+        """모든 프로세스의 값을 합친 {메트릭 이름: {레이블 값: 값}}"""
+        directory = self.get_directory()
+        if directory is None:
+            return self.snapshot()
+        if os.name == 'posix':
+            self.adopt_dead_processes(directory)
+        self.flush()
+        merged = {}
+        kinds = {metric.name: metric for metric in self.metrics}
+        for path in directory.glob('*.json'):
+            try:
+                data = json.loads(path.read_text())
+            except (OSError, ValueError):
+                # 다른 프로세스가 바꾸는 중인 파일
+                continue
+            for name, rows in data.items():
+                metric = kinds.get(name)
+                if metric is None:
+                    continue
+                values = merged.setdefault(name, {})
+                for key, value in rows:
+                    key = tuple(key)
+                    values[key] = metric.merge(values.get(key), value)
+        return merged
+
+    def render(self):
+        values = self.collect()
+        lines = []
+        for metric in self.metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.render(values.get(metric.name, {})))
+        return '\n'.join(lines) + '\n'
+
+
+def clear_directory():
+    """이전 실행의 프로세스 파일을 지운다 (serve 마스터가 워커를 띄우기 전에 부른다)"""
+    directory = registry.get_directory()
+    if directory is None:
+        return
+    directory.mkdir(parents=True, exist_ok=True)
+    for pattern in ('*.json', '*.tmp', '*.adopt'):
+        for path in directory.glob(pattern):
+            path.unlink(missing_ok=True)
+
+
+def count_active_sessions():
+    from django.contrib.sessions.models import Session
+    from django.utils import timezone
+    return Session.objects.filter(expire_date__gt=timezone.now()).count()
+
+
+registry = Registry()
+
+requests_total = registry.register(Counter(
+    'memo_http_requests_total', "HTTP requests by URL name, method and status.", ('view', 'method', 'status'),
+))
+request_duration = registry.register(Histogram(
+    'memo_http_request_duration_seconds', "HTTP request latency by URL name.", ('view',),
+))
+db_queries = registry.register(Histogram(
+    'memo_db_queries_per_request', "DB queries per request by URL name.", ('view',), buckets=QUERY_COUNT_BUCKETS,
+))
+db_query_seconds = registry.register(Counter(
+    'memo_db_query_seconds_total', "Time spent in DB queries by URL name.", ('view',),
+))
+cache_requests = registry.register(Counter(
+    'memo_cache_requests_total', "Cache lookups by result (hit/miss).", ('result',),
+))
+active_sessions = registry.register(Gauge(
+    'memo_active_sessions', "Unexpired sessions in the session table.", count_active_sessions,
+))
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=registry.reset)
+
+
+class QueryTracker:
+    """execute_wrapper로 요청 하나의 쿼리 수와 시간을 잰다"""
+
+    __slots__ = ('count', 'duration')
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - started
+
+
+def get_view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return '<unresolved>'
+    return match.view_name or '<unnamed>'
+
+
+def record_request(request, response, duration, tracker=None):
+    view = get_view_name(request)
+    method = request.method if request.method in METHODS else 'other'
+    requests_total.inc(view, method, str(response.status_code))
+    request_duration.observe(duration, view)
+    if tracker is not None:
+        db_queries.observe(tracker.count, view)
+        db_query_seconds.inc(view, amount=tracker.duration)
+    registry.flush(force=False)
+
+
+class MetricsMiddleware:
+    """요청 지연 시간과 DB 쿼리 수/시간을 URL 이름별로 기록한다
+
+    비동기 뷰(SSE)는 쿼리가 다른 스레드에서 실행되므로 지연 시간만 기록한다.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        started = time.perf_counter()
+        tracker = QueryTracker()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(tracker))
+            response = self.get_response(request)
+        record_request(request, response, time.perf_counter() - started, tracker)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        record_request(request, response, time.perf_counter() - started)
+        return response
+
+
+class InstrumentedLocMemCache(LocMemCache):
+    """조회마다 적중/실패를 세는 로컬 메모리 캐시 (get_many, get_or_set도 get을 거친다)"""
+
+    _missing = object()
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, self._missing, version)
+        if value is self._missing:
+            cache_requests.inc('miss')
+            return default
+        cache_requests.inc('hit')
+        return value
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from memos.chunks import digest_chunk
+from memos.chunks import split_content
+
+
+def backfill_chunks(apps, schema_editor):
+    # 기존 메모를 조각 테이블로 나눠 저장
+    Memo = apps.get_model('memos', 'Memo')
+    MemoChunk = apps.get_model('memos', 'MemoChunk')
+    db_alias = schema_editor.connection.alias
+    memos = Memo.objects.using(db_alias).only('pk', 'content').iterator(chunk_size=100)
+    for memo in memos:
+        MemoChunk.objects.using(db_alias).bulk_create([
+            MemoChunk(memo_id=memo.pk, position=position, content=text, digest=digest_chunk(text))
+            for position, text in enumerate(split_content(memo.content))
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('memos', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MemoChunk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField()),
+                ('content', models.TextField()),
+                ('digest', models.TextField()),
+                ('memo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chunks', to='memos.memo')),
+            ],
+            options={
+                'ordering': ['position'],
+                'constraints': [models.UniqueConstraint(fields=('memo', 'position'), name='memos_memochunk_memo_position_uniq')],
+            },
+        ),
+        migrations.RunPython(backfill_chunks, migrations.RunPython.noop),
+    ]
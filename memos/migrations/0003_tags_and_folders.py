@@ -0,0 +1,78 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:43
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('memos', '0002_memochunk'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Folder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.TextField()),
+                ('memo_count', models.PositiveIntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='memo_folders', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='memo',
+            name='folder',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='memos', to='memos.folder'),
+        ),
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.TextField()),
+                ('memo_count', models.PositiveIntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='memo_tags', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='MemoTag',
+            fields=[
+                ('pk', models.CompositePrimaryKey('memo', 'tag', blank=True, editable=False, primary_key=True, serialize=False)),
+                ('memo', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='memos.memo')),
+                ('tag', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='memos.tag')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='memo',
+            name='tags',
+            field=models.ManyToManyField(blank=True, related_name='memos', through='memos.MemoTag', to='memos.tag'),
+        ),
+        migrations.AddIndex(
+            model_name='memo',
+            index=models.Index(fields=['user', '-created_at'], name='memos_memo_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='memo',
+            index=models.Index(fields=['folder', '-created_at'], name='memos_memo_folder_created_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='folder',
+            constraint=models.UniqueConstraint(fields=('user', 'name'), name='memos_folder_user_name_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='tag',
+            constraint=models.UniqueConstraint(fields=('user', 'name'), name='memos_tag_user_name_uniq'),
+        ),
+        migrations.AddIndex(
+            model_name='memotag',
+            index=models.Index(fields=['tag', 'memo'], name='memos_memotag_tag_memo_idx'),
+        ),
+    ]
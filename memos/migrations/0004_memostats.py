@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:46
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max, Sum
+
+from memos.expressions import ByteLength
+
+
+def backfill_stats(apps, schema_editor):
+    # 기존 메모로 사용자별 통계 행을 만든다
+    Memo = apps.get_model('memos', 'Memo')
+    MemoStats = apps.get_model('memos', 'MemoStats')
+    db_alias = schema_editor.connection.alias
+    rows = Memo.objects.using(db_alias).values('user_id').annotate(
+        memo_count=Count('pk'),
+        content_bytes=Sum(ByteLength('content')),
+        last_created_at=Max('created_at'),
+        last_updated_at=Max('updated_at'),
+    ).order_by()
+    MemoStats.objects.using(db_alias).bulk_create([MemoStats(**row) for row in rows])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('memos', '0003_tags_and_folders'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MemoStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('memo_count', models.PositiveIntegerField(default=0)),
+                ('content_bytes', models.PositiveBigIntegerField(default=0)),
+                ('last_created_at', models.DateTimeField(blank=True, null=True)),
+                ('last_updated_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='memo_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'memo stats',
+            },
+        ),
+        migrations.RunPython(backfill_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:59
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('memos', '0005_memoevent'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='memo',
+            index=models.Index(fields=['created_at'], name='memos_memo_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='memo',
+            index=models.Index(fields=['title'], name='memos_memo_title_idx'),
+        ),
+    ]
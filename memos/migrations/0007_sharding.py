@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:15
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('memos', '0006_admin_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShardAssignment',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='shard_assignment', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('shard', models.TextField()),
+                ('moving_to', models.TextField(blank=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ShardSequence',
+            fields=[
+                ('name', models.TextField(primary_key=True, serialize=False)),
+                ('value', models.BigIntegerField()),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='folder',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='memo_folders', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='memo',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='memos', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='memostats',
+            name='user',
+            field=models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='memo_stats', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='tag',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='memo_tags', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
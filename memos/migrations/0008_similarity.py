@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:33
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('memos', '0007_sharding'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MemoSignature',
+            fields=[
+                ('memo', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='signature', serialize=False, to='memos.memo')),
+                ('signature', models.BinaryField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='MemoBucket',
+            fields=[
+                ('pk', models.CompositePrimaryKey('memo', 'band', blank=True, editable=False, primary_key=True, serialize=False)),
+                ('band', models.PositiveSmallIntegerField()),
+                ('bucket', models.BigIntegerField()),
+                ('memo', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='memos.memo')),
+                ('user', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'band', 'bucket'], name='memos_memobucket_lookup_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 20:03
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('memos', '0008_similarity'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='memo',
+            name='memos_memo_user_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='memo',
+            name='memos_memo_folder_created_idx',
+        ),
+        migrations.AddIndex(
+            model_name='memo',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='memos_memo_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='memo',
+            index=models.Index(fields=['folder', '-created_at', '-id'], name='memos_memo_folder_created_idx'),
+        ),
+    ]
@@ -1,13 +1,179 @@
 
 from django.db import models
 from django.contrib.auth import get_user_model
+from .sharding import shard_for_user
 
+
+class UserShardQuerySet(models.QuerySet):
+    def for_user(self, user):
+        """사용자의 샤드에서 그 사용자의 행만 고른다"""
+        return self.using(shard_for_user(user)).filter(user=user)
+
+    def create(self, **kwargs):
+        # using()으로 DB를 정하지 않았으면 소유자의 샤드에 저장한다
+        user = kwargs.get('user', kwargs.get('user_id'))
+        if self._db is None and user is not None:
+            return self.using(shard_for_user(user)).create(**kwargs)
+        return super().create(**kwargs)
+
+
+# 샤드 모델의 사용자 외래 키는 DB 제약을 두지 않는다 (사용자 테이블은 default DB에만 있음)
 class Memo(models.Model):
-    user = models.ForeignKey(get_user_model(), on_delete=models.CASCADE, related_name='memos')
+    user = models.ForeignKey(get_user_model(), on_delete=models.CASCADE, related_name='memos', db_constraint=False)
     title = models.CharField(max_length=100)
     content = models.TextField()
+    folder = models.ForeignKey('Folder', on_delete=models.SET_NULL, null=True, blank=True, related_name='memos')
+    tags = models.ManyToManyField('Tag', through='MemoTag', blank=True, related_name='memos')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = UserShardQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id'], name='memos_memo_user_created_idx'),
+            models.Index(fields=['folder', '-created_at', '-id'], name='memos_memo_folder_created_idx'),
+            # 관리자 화면 date_hierarchy와 제목 접두사 검색용
+            models.Index(fields=['created_at'], name='memos_memo_created_idx'),
+            models.Index(fields=['title'], name='memos_memo_title_idx'),
+        ]
+
     def __str__(self):
         return self.title
+
+
+class MemoChunk(models.Model):
+    """메모 내용을 고정 크기로 나눈 조각"""
+    memo = models.ForeignKey(Memo, on_delete=models.CASCADE, related_name='chunks')
+    position = models.PositiveIntegerField()
+    content = models.TextField()
+    digest = models.TextField()
+
+    class Meta:
+        ordering = ['position']
+        constraints = [
+            models.UniqueConstraint(fields=['memo', 'position'], name='memos_memochunk_memo_position_uniq'),
+        ]
+
+    def __str__(self):
+        return f'{self.memo_id}#{self.position}'
+
+
+class Folder(models.Model):
+    """사용자별 메모 폴더"""
+    user = models.ForeignKey(get_user_model(), on_delete=models.CASCADE, related_name='memo_folders', db_constraint=False)
+    name = models.TextField()
+    memo_count = models.PositiveIntegerField(default=0)
+
+    objects = UserShardQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['name']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'name'], name='memos_folder_user_name_uniq'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class Tag(models.Model):
+    """사용자별 메모 태그"""
+    user = models.ForeignKey(get_user_model(), on_delete=models.CASCADE, related_name='memo_tags', db_constraint=False)
+    name = models.TextField()
+    memo_count = models.PositiveIntegerField(default=0)
+
+    objects = UserShardQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['name']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'name'], name='memos_tag_user_name_uniq'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class MemoTag(models.Model):
+    """메모-태그 다대다 연결 (복합 기본 키)"""
+    pk = models.CompositePrimaryKey('memo', 'tag')
+    # 단일 컬럼 인덱스는 기본 키와 아래 복합 인덱스가 대신한다
+    memo = models.ForeignKey(Memo, on_delete=models.CASCADE, db_index=False)
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, db_index=False)
+
+    class Meta:
+        indexes = [
+            # 태그로 메모를 거꾸로 찾을 때 사용
+            models.Index(fields=['tag', 'memo'], name='memos_memotag_tag_memo_idx'),
+        ]
+
+
+class MemoSignature(models.Model):
+    """유사 메모 찾기용 MinHash 서명 (uint32 64개, 256바이트)"""
+    memo = models.OneToOneField(Memo, on_delete=models.CASCADE, primary_key=True, related_name='signature')
+    signature = models.BinaryField()
+
+    def __str__(self):
+        return str(self.memo_id)
+
+
+class MemoBucket(models.Model):
+    """MinHash 서명의 LSH 밴드 버킷. 같은 버킷의 메모만 유사 후보로 비교한다"""
+    pk = models.CompositePrimaryKey('memo', 'band')
+    memo = models.ForeignKey(Memo, on_delete=models.CASCADE, db_index=False)
+    band = models.PositiveSmallIntegerField()
+    user = models.ForeignKey(get_user_model(), on_delete=models.CASCADE, related_name='+', db_constraint=False)
+    bucket = models.BigIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'band', 'bucket'], name='memos_memobucket_lookup_idx'),
+        ]
+
+
+class MemoStats(models.Model):
+    """사용자별 메모 통계 (메모 저장/삭제와 같은 트랜잭션에서 증분 갱신)"""
+    user = models.OneToOneField(get_user_model(), on_delete=models.CASCADE, related_name='memo_stats',
+                                db_constraint=False)
+    memo_count = models.PositiveIntegerField(default=0)
+    content_bytes = models.PositiveBigIntegerField(default=0)
+    last_created_at = models.DateTimeField(null=True, blank=True)
+    last_updated_at = models.DateTimeField(null=True, blank=True)
+
+    objects = UserShardQuerySet.as_manager()
+
+    class Meta:
+        verbose_name_plural = 'memo stats'
+
+    def __str__(self):
+        return f'{self.user_id}: {self.memo_count}'
+
+
+class MemoEvent(models.Model):
+    """프로세스 간 메모 변경 이벤트 전달용 테이블 (DatabaseBackend가 폴링한다)"""
+    user = models.ForeignKey(get_user_model(), on_delete=models.CASCADE, related_name='+')
+    payload = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+
+class ShardAssignment(models.Model):
+    """사용자 데이터가 있는 샤드 (default DB에만 있다)"""
+    user = models.OneToOneField(get_user_model(), on_delete=models.CASCADE, primary_key=True,
+                                related_name='shard_assignment')
+    shard = models.TextField()
+    # 다른 샤드로 옮기는 중이면 대상 샤드 (그동안 쓰기를 막는다)
+    moving_to = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.user_id}: {self.shard}'
+
+
+class ShardSequence(models.Model):
+    """샤드 모델의 기본 키 시퀀스 (모든 샤드에서 id가 겹치지 않게 블록 단위로 나눠 준다)"""
+    name = models.TextField(primary_key=True)
+    value = models.BigIntegerField()
+
+    def __str__(self):
+        return f'{self.name}: {self.value}'
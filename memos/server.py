@@ -0,0 +1,333 @@
+import gc
+import logging
+import os
+import re
+import signal
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from django.core.servers.basehttp import WSGIRequestHandler, WSGIServer
+from django.db import connections
+from django.template import engines
+from django.urls import get_resolver
+from . import metrics
+
+
+logger = logging.getLogger(__name__)
+
+# 빈 스레드를 기다리는 시간(초). 이 사이에 연결은 backlog에 남아 다른 워커가 받을 수 있다
+ACCEPT_WAIT = 0.1
+# 이 시간(초) 안에 비정상 종료한 워커는 기동 실패로 보고 재시작 간격을 두 배씩 늘린다
+MIN_WORKER_LIFETIME = 5.0
+RESTART_BACKOFF_BASE = 0.5
+RESTART_BACKOFF_MAX = 30.0
+
+LOAD_TAG = re.compile(r'{%\s*load\s+(.+?)\s*%}')
+
+
+def template_libraries(source):
+    """템플릿이 {% load %}로 읽는 태그 라이브러리 이름"""
+    names = set()
+    for arguments in LOAD_TAG.findall(source):
+        bits = arguments.split()
+        # {% load tag from library %}
+        names.update(bits[bits.index('from') + 1:] if 'from' in bits else bits)
+    return names
+
+
+def warm_up(connect=True):
+    """첫 요청 전에 뷰 import, URL 해석, 템플릿 컴파일, DB 연결을 미리 해 둔다"""
+    timings = {}
+    started = time.perf_counter()
+    resolver = get_resolver()
+    # reverse_dict 접근 시 URLconf(와 뷰 모듈) import 및 역참조 테이블이 만들어진다
+    resolver.reverse_dict
+    for pattern in resolver.url_patterns:
+        getattr(pattern, 'reverse_dict', None)
+    timings['urls'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for engine in engines.all():
+        libraries = getattr(getattr(engine, 'engine', None), 'libraries', None)
+        for directory in getattr(engine, 'dirs', []):
+            for path in sorted(Path(directory).rglob('*.html')):
+                name = path.relative_to(directory).as_posix()
+                # 설치되지 않은 앱(가벼운 프로필의 admin, crispy)의 태그를 쓰는 템플릿은 건너뛴다
+                if libraries is not None and not template_libraries(path.read_text(encoding='utf-8')) <= libraries.keys():
+                    logger.debug("Skipped template %s: tag library not installed", name)
+                    continue
+                # 캐시 로더에 컴파일된 템플릿이 남는다
+                engine.get_template(name)
+    timings['templates'] = time.perf_counter() - started
+
+    if connect:
+        started = time.perf_counter()
+        open_connections()
+        timings['db'] = time.perf_counter() - started
+    return timings
+
+
+def open_connections():
+    for connection in connections.all():
+        connection.ensure_connection()
+
+
+class PooledWSGIServer(WSGIServer):
+    """마스터가 열어 둔 소켓을 받아 고정 크기 스레드 풀로 요청을 처리하는 WSGI 서버
+
+    빈 스레드가 있을 때만 연결을 accept한다. 바쁜 워커가 연결을 받아 큐에 쌓아 두지 않으므로
+    요청은 여유 있는 다른 워커로 간다.
+    """
+
+    def __init__(self, sock, application, threads):
+        super().__init__(sock.getsockname()[:2], WSGIRequestHandler, bind_and_activate=False)
+        self.socket.close()
+        self.socket = sock
+        self.server_name = socket.getfqdn(self.server_address[0])
+        self.server_port = self.server_address[1]
+        self.setup_environ()
+        self.set_app(application)
+        self._pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='memoapp-worker')
+        self._free_threads = threading.BoundedSemaphore(threads)
+        self._submitted = False
+
+    def _handle_request_noblock(self):
+        # serve_forever를 도는 스레드 하나만 부른다
+        if not self._free_threads.acquire(timeout=ACCEPT_WAIT):
+            return
+        self._submitted = False
+        try:
+            super()._handle_request_noblock()
+        finally:
+            # accept 실패나 verify_request 거부로 스레드에 넘기지 않았으면 자리를 돌려준다
+            if not self._submitted:
+                self._free_threads.release()
+
+    def process_request(self, request, client_address):
+        self._pool.submit(self._process_request_in_thread, request, client_address)
+        self._submitted = True
+
+    def _process_request_in_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self._free_threads.release()
+
+    def warm_threads(self, func):
+        """풀의 모든 스레드를 미리 띄우고 스레드마다 func를 한 번씩 실행한다"""
+        threads = self._pool._max_workers
+        barrier = threading.Barrier(threads)
+
+        def run():
+            func()
+            # 같은 스레드가 두 번 일을 받지 않도록 모두 모일 때까지 기다린다
+            barrier.wait()
+
+        for future in [self._pool.submit(run) for _ in range(threads)]:
+            future.result()
+
+    def server_close(self):
+        # 처리 중인 요청은 끝까지 마친다
+        self._pool.shutdown(wait=True)
+        super().server_close()
+
+
+class PreforkServer:
+    """소켓을 열고 워커 프로세스를 fork하는 마스터 프로세스
+
+    - SIGHUP: 새 워커를 띄운 뒤 기존 워커를 정상 종료. preload가 꺼져 있으면 새 워커가 URLconf와 뷰, 폼,
+      템플릿을 새로 읽는다. 마스터가 fork 전에 이미 import한 설정, 모델, 시그널, admin 등은 그대로이므로
+      이런 모듈을 바꾸면 serve를 다시 시작해야 한다.
+    - SIGTERM/SIGINT: 모든 워커를 정상 종료
+    - SIGTTIN/SIGTTOU: 워커 수를 하나 늘리거나 줄인다
+    """
+
+    def __init__(self, load_application, bind=('127.0.0.1', 8000), workers=2, threads=4,
+                 preload=True, graceful_timeout=30, backlog=128):
+        self.load_application = load_application
+        self.bind = bind
+        self.worker_count = workers
+        self.threads = threads
+        self.preload = preload
+        self.graceful_timeout = graceful_timeout
+        self.backlog = backlog
+        self.application = None
+        self.socket = None
+        self.workers = {}
+        self.started = {}
+        self.generation = 0
+        self._failures = 0
+        self._next_spawn = 0.0
+        self._stopping = False
+        self._reload_requested = False
+
+    def listen(self):
+        host, port = self.bind
+        family = socket.AF_INET6 if ':' in host else socket.AF_INET
+        self.socket = socket.socket(family, socket.SOCK_STREAM)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.socket.bind((host, port))
+        self.socket.listen(self.backlog)
+        # 워커들이 같은 소켓을 기다리다 연결 하나에 함께 깨어날 수 있다. 경쟁에서 진 워커가
+        # accept()에 묶여 종료 신호를 놓치지 않도록 논블로킹으로 둔다 (BlockingIOError는 socketserver가 무시)
+        self.socket.setblocking(False)
+        self.socket.set_inheritable(True)
+        return self.socket.getsockname()[:2]
+
+    def run(self):
+        if self.socket is None:
+            self.listen()
+        if self.preload:
+            self.application = self.load_application()
+            timings = warm_up(connect=False)
+            logger.info("Preloaded application: %s", timings)
+            # fork 전에 부모의 연결을 닫고 객체를 고정해서 copy-on-write 페이지를 덜 건드린다
+            connections.close_all()
+            gc.collect()
+            gc.freeze()
+        signal.signal(signal.SIGHUP, self._handle_reload)
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+        signal.signal(signal.SIGTTIN, self._handle_more)
+        signal.signal(signal.SIGTTOU, self._handle_fewer)
+        self.spawn_workers()
+        try:
+            while not self._stopping:
+                if self._reload_requested:
+                    self._reload_requested = False
+                    self.reload()
+                self.reap_workers()
+                self.spawn_workers()
+                time.sleep(0.2)
+        finally:
+            self.stop_workers(list(self.workers))
+            self.socket.close()
+
+    def spawn_workers(self, force=False):
+        current = [pid for pid, generation in self.workers.items() if generation == self.generation]
+        missing = self.worker_count - len(current)
+        if missing > 0 and not force and time.monotonic() < self._next_spawn:
+            # 기동하자마자 죽는 워커를 쉬지 않고 다시 fork하지 않는다
+            missing = 0
+        for _ in range(missing):
+            self.spawn_worker()
+        for pid in current[self.worker_count:]:
+            self.stop_workers([pid], wait=False)
+
+    def spawn_worker(self):
+        pid = os.fork()
+        if pid:
+            self.workers[pid] = self.generation
+            self.started[pid] = time.monotonic()
+            return pid
+        # 자식 프로세스
+        exit_code = 0
+        try:
+            self.run_worker()
+        except BaseException:
+            logger.exception("Worker %s crashed", os.getpid())
+            exit_code = 1
+        finally:
+            os._exit(exit_code)
+
+    def run_worker(self):
+        for signum in (signal.SIGHUP, signal.SIGTTIN, signal.SIGTTOU):
+            signal.signal(signum, signal.SIG_IGN)
+        application = self.application
+        timings = {}
+        if application is None:
+            application = self.load_application()
+            timings = warm_up(connect=False)
+        server = PooledWSGIServer(self.socket, application, self.threads)
+        # DB 연결은 스레드별이므로 요청을 받을 스레드마다 미리 연다
+        started = time.perf_counter()
+        server.warm_threads(open_connections)
+        timings['db'] = time.perf_counter() - started
+
+        def stop(signum, frame):
+            # serve_forever를 도는 스레드에서는 shutdown()을 부를 수 없다
+            threading.Thread(target=server.shutdown, daemon=True).start()
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        logger.info("Worker %s ready: %s", os.getpid(), timings)
+        server.serve_forever(poll_interval=0.5)
+        server.server_close()
+        # os._exit로 끝나므로 atexit 대신 여기서 마지막 메트릭 값을 남긴다
+        metrics.registry.flush()
+
+    def reap_workers(self):
+        while self.workers:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self.workers.clear()
+                return
+            if not pid:
+                return
+            self.worker_exited(pid, status)
+
+    def worker_exited(self, pid, status):
+        """종료된 워커를 목록에서 빼고, 기동 직후 비정상 종료했으면 재시작을 늦춘다"""
+        started = self.started.pop(pid, None)
+        if self.workers.pop(pid, None) is None or not status:
+            return
+        logger.warning("Worker %s exited with status %s", pid, status)
+        if started is not None and time.monotonic() - started < MIN_WORKER_LIFETIME:
+            self._failures += 1
+            delay = min(RESTART_BACKOFF_MAX, RESTART_BACKOFF_BASE * 2 ** (self._failures - 1))
+            self._next_spawn = time.monotonic() + delay
+            logger.warning("Restarting workers in %.1fs after %d failed starts", delay, self._failures)
+        else:
+            self._failures = 0
+
+    def reload(self):
+        old = list(self.workers)
+        self.generation += 1
+        self.spawn_workers(force=True)
+        self.stop_workers(old)
+
+    def stop_workers(self, pids, wait=True):
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        if not wait:
+            return
+        deadline = time.monotonic() + self.graceful_timeout
+        remaining = set(pids)
+        while remaining and time.monotonic() < deadline:
+            for pid in list(remaining):
+                try:
+                    done, _ = os.waitpid(pid, os.WNOHANG)
+                except ChildProcessError:
+                    done = pid
+                if done:
+                    remaining.discard(pid)
+                    self.workers.pop(pid, None)
+                    self.started.pop(pid, None)
+            time.sleep(0.05)
+        for pid in remaining:
+            # 유예 시간 안에 끝나지 않은 워커는 강제 종료
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+            self.workers.pop(pid, None)
+            self.started.pop(pid, None)
+
+    def _handle_reload(self, signum, frame):
+        self._reload_requested = True
+
+    def _handle_stop(self, signum, frame):
+        self._stopping = True
+
+    def _handle_more(self, signum, frame):
+        self.worker_count += 1
+
+    def _handle_fewer(self, signum, frame):
+        self.worker_count = max(1, self.worker_count - 1)
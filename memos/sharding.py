@@ -0,0 +1,318 @@
+import bisect
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.signals import setting_changed
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, connections, transaction
+from django.db.models import F, Max
+from django.dispatch import receiver
+
+
+# 사용자별로 나뉘어 샤드에 저장되는 memos 모델 (나머지는 모두 default DB)
+SHARDED_MODELS = frozenset({
+    'memo', 'memochunk', 'folder', 'tag', 'memotag', 'memostats', 'memosignature', 'memobucket',
+})
+
+
+def get_shard_aliases():
+    return list(getattr(settings, 'MEMO_SHARD_DATABASES', []))
+
+
+def is_enabled():
+    return bool(get_shard_aliases())
+
+
+def is_sharded(model):
+    return model._meta.app_label == 'memos' and model._meta.model_name in SHARDED_MODELS
+
+
+class HashRing:
+    """일관 해시 링. 샤드를 더하거나 빼도 약 1/N 사용자만 자리가 바뀐다"""
+
+    def __init__(self, nodes, replicas=160):
+        points = sorted(
+            (self.hash(f'{node}#{replica}'), node)
+            for node in nodes
+            for replica in range(replicas)
+        )
+        self._keys = [key for key, _ in points]
+        self._nodes = [node for _, node in points]
+
+    @staticmethod
+    def hash(value):
+        return int.from_bytes(hashlib.sha1(str(value).encode('utf-8')).digest()[:8], 'big')
+
+    def get(self, key):
+        if not self._keys:
+            raise ValueError("Hash ring has no nodes.")
+        index = bisect.bisect(self._keys, self.hash(key)) % len(self._keys)
+        return self._nodes[index]
+
+
+_ring = None
+
+
+def get_ring():
+    global _ring
+    if _ring is None:
+        _ring = HashRing(get_shard_aliases(), getattr(settings, 'MEMO_SHARD_REPLICAS', 160))
+    return _ring
+
+
+@receiver(setting_changed)
+def reset_ring(setting, **kwargs):
+    global _ring
+    if setting in ('MEMO_SHARD_DATABASES', 'MEMO_SHARD_REPLICAS'):
+        _ring = None
+
+
+def has_user_data(user_id, using):
+    from .models import Folder, Memo, MemoStats, Tag
+    return any(
+        model.objects.using(using).filter(user_id=user_id).exists()
+        for model in (Memo, MemoStats, Folder, Tag)
+    )
+
+
+def get_assignment(user, refresh=False):
+    """사용자의 샤드 배정 행. 없으면 해시 링으로 정해서 만든다 (요청 동안 사용자 객체에 기억)"""
+    from .models import ShardAssignment
+    user_id = getattr(user, 'pk', user)
+    if not refresh and hasattr(user, 'pk'):
+        cached = getattr(user, '_shard_assignment', None)
+        if cached is not None:
+            return cached
+    assignment = ShardAssignment.objects.using(DEFAULT_DB_ALIAS).filter(user_id=user_id).first()
+    if assignment is None:
+        # 샤딩을 켜기 전에 만든 데이터는 재배치 전까지 default에서 계속 읽고 쓴다
+        shard = DEFAULT_DB_ALIAS if has_user_data(user_id, DEFAULT_DB_ALIAS) else get_ring().get(user_id)
+        assignment, _ = ShardAssignment.objects.using(DEFAULT_DB_ALIAS).get_or_create(
+            user_id=user_id, defaults={'shard': shard},
+        )
+    if hasattr(user, 'pk'):
+        user._shard_assignment = assignment
+    return assignment
+
+
+def shard_for_user(user):
+    """사용자 데이터가 있는 DB 별칭 (샤딩을 쓰지 않으면 default)"""
+    if not is_enabled():
+        return DEFAULT_DB_ALIAS
+    return get_assignment(user).shard
+
+
+def get_data_aliases():
+    """사용자 데이터가 있을 수 있는 모든 DB 별칭"""
+    from .models import ShardAssignment
+    aliases = get_shard_aliases()
+    if not aliases:
+        return [DEFAULT_DB_ALIAS]
+    if ShardAssignment.objects.using(DEFAULT_DB_ALIAS).filter(shard=DEFAULT_DB_ALIAS).exists():
+        aliases.append(DEFAULT_DB_ALIAS)
+    return aliases
+
+
+def check_writable(user):
+    """다른 샤드로 옮기는 중인 사용자의 쓰기를 막는다 (읽기는 원래 샤드에서 계속 된다)"""
+    if is_enabled() and get_assignment(user).moving_to:
+        raise ValidationError("Заметки переносятся на другой сервер, попробуйте через минуту.", code='shard_moving')
+
+
+class ShardRouter:
+    """memos의 사용자 데이터 모델은 사용자 샤드로, 나머지 모델은 default로 보내는 DB 라우터
+
+    힌트로 받은 인스턴스(관련 객체, 저장할 객체)에서 샤드를 정한다. 힌트가 없는 조회는
+    정할 수 없으므로 Memo.objects.for_user()나 .using()으로 샤드를 지정해야 한다.
+    """
+
+    def _db_for_model(self, model, instance=None, **hints):
+        if not is_enabled():
+            return None
+        if not is_sharded(model):
+            return DEFAULT_DB_ALIAS
+        if instance is None:
+            return None
+        if isinstance(instance, get_user_model()):
+            return shard_for_user(instance)
+        if instance._state.db:
+            return instance._state.db
+        user_id = getattr(instance, 'user_id', None)
+        if user_id is not None:
+            return shard_for_user(user_id)
+        return None
+
+    def db_for_read(self, model, **hints):
+        return self._db_for_model(model, **hints)
+
+    def db_for_write(self, model, **hints):
+        return self._db_for_model(model, **hints)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if not is_enabled():
+            return None
+        if is_sharded(obj1) and is_sharded(obj2):
+            return None
+        # 샤드의 메모와 default의 사용자 사이 관계 (외래 키 제약 없이 저장한다)
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db not in get_shard_aliases():
+            return None
+        return app_label == 'memos' and (model_name is None or model_name in SHARDED_MODELS)
+
+
+class IdAllocator:
+    """샤드 사이에서 겹치지 않는 기본 키를 블록 단위로 나눠 주는 할당기
+
+    재배치할 때 기본 키를 그대로 복사하므로 모든 샤드에서 id가 유일해야 한다.
+    default DB의 시퀀스 행은 블록마다 한 번만 갱신한다.
+    """
+
+    def __init__(self):
+        self._blocks = {}
+        self._lock = threading.Lock()
+
+    def reset(self):
+        self._blocks = {}
+        self._lock = threading.Lock()
+
+    def allocate(self, model):
+        name = model._meta.label_lower
+        with self._lock:
+            next_id, last_id = self._blocks.get(name, (1, 0))
+            if next_id > last_id:
+                block_size = getattr(settings, 'MEMO_SHARD_ID_BLOCK', 100)
+                last_id = self._reserve(model, name, block_size)
+                next_id = last_id - block_size + 1
+            self._blocks[name] = (next_id + 1, last_id)
+            return next_id
+
+    def _reserve(self, model, name, block_size):
+        from .models import ShardSequence
+        sequences = ShardSequence.objects.using(DEFAULT_DB_ALIAS)
+        try:
+            with transaction.atomic(using=DEFAULT_DB_ALIAS):
+                if not sequences.filter(name=name).update(value=F('value') + block_size):
+                    # 처음에는 기존 데이터(default와 모든 샤드)의 최대 id에서 시작한다
+                    start = max(
+                        model._base_manager.using(alias).aggregate(last=Max('pk'))['last'] or 0
+                        for alias in [DEFAULT_DB_ALIAS, *get_shard_aliases()]
+                    )
+                    sequences.create(name=name, value=start + block_size)
+                return sequences.get(name=name).value
+        except IntegrityError:
+            # 다른 프로세스가 시퀀스 행을 먼저 만들었다
+            return self._reserve(model, name, block_size)
+
+
+id_allocator = IdAllocator()
+if hasattr(os, 'register_at_fork'):
+    # prefork 워커가 마스터의 블록을 물려받아 같은 id를 나눠 주지 않도록 한다
+    os.register_at_fork(after_in_child=id_allocator.reset)
+
+
+def run_on_shards(func, aliases=None):
+    """func(alias)를 DB마다 별도 스레드에서 동시에 실행하고 {별칭: 결과}를 돌려준다"""
+    aliases = list(aliases) if aliases is not None else get_data_aliases()
+    # 트랜잭션 안에서는 다른 스레드가 커밋되지 않은 행을 볼 수 없으므로 현재 스레드에서 차례로 실행한다
+    if len(aliases) <= 1 or any(connections[alias].in_atomic_block for alias in aliases):
+        return {alias: func(alias) for alias in aliases}
+
+    def call(alias):
+        try:
+            return func(alias)
+        finally:
+            # 스레드마다 열린 연결을 닫는다 (다른 스레드의 연결에는 영향이 없다)
+            connections.close_all()
+
+    with ThreadPoolExecutor(max_workers=len(aliases)) as executor:
+        return dict(zip(aliases, executor.map(call, aliases)))
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def copy_rows(queryset, target, batch_size, keep_pk=True):
+    for rows in batched(queryset.iterator(chunk_size=batch_size), batch_size):
+        if not keep_pk:
+            for row in rows:
+                row.pk = None
+        queryset.model.objects.using(target).bulk_create(rows)
+
+
+def copy_user_data(user_id, source, target, batch_size=500):
+    """사용자 데이터를 기본 키 그대로 다른 DB로 복사한다 (메모는 배치마다 조각/태그와 함께)"""
+    from .models import Folder, Memo, MemoBucket, MemoChunk, MemoSignature, MemoStats, MemoTag, Tag
+    with transaction.atomic(using=target):
+        copy_rows(Folder.objects.using(source).filter(user_id=user_id).order_by('pk'), target, batch_size)
+        copy_rows(Tag.objects.using(source).filter(user_id=user_id).order_by('pk'), target, batch_size)
+        copy_rows(MemoStats.objects.using(source).filter(user_id=user_id), target, batch_size, keep_pk=False)
+    memos = Memo.objects.using(source).filter(user_id=user_id).order_by('pk')
+    last_pk = 0
+    copied = 0
+    while batch := list(memos.filter(pk__gt=last_pk)[:batch_size]):
+        memo_ids = [memo.pk for memo in batch]
+        with transaction.atomic(using=target):
+            Memo.objects.using(target).bulk_create(batch)
+            copy_rows(MemoChunk.objects.using(source).filter(memo_id__in=memo_ids).order_by('pk'),
+                      target, batch_size, keep_pk=False)
+            copy_rows(MemoTag.objects.using(source).filter(memo_id__in=memo_ids), target, batch_size)
+            copy_rows(MemoSignature.objects.using(source).filter(memo_id__in=memo_ids), target, batch_size)
+            copy_rows(MemoBucket.objects.using(source).filter(memo_id__in=memo_ids), target, batch_size)
+        last_pk = memo_ids[-1]
+        copied += len(batch)
+    return copied
+
+
+def purge_user_data(user_id, using, batch_size=500):
+    """한 DB에서 사용자 데이터를 시그널 없이 배치로 지운다 (통계/이벤트를 건드리지 않는다)"""
+    from .models import Folder, Memo, MemoBucket, MemoChunk, MemoSignature, MemoStats, MemoTag, Tag
+    memo_ids = Memo.objects.using(using).filter(user_id=user_id).values_list('pk', flat=True).order_by('pk')
+    while ids := list(memo_ids[:batch_size]):
+        with transaction.atomic(using=using):
+            MemoTag.objects.using(using).filter(memo_id__in=ids).delete()
+            MemoChunk.objects.using(using).filter(memo_id__in=ids).delete()
+            MemoBucket.objects.using(using).filter(memo_id__in=ids).delete()
+            MemoSignature.objects.using(using).filter(memo_id__in=ids).delete()
+            # Memo.delete()는 메모별 시그널(통계, 삭제 이벤트)을 보내므로 바로 지운다
+            Memo.objects.using(using).filter(pk__in=ids)._raw_delete(using)
+    with transaction.atomic(using=using):
+        for model in (MemoStats, Folder, Tag):
+            model.objects.using(using).filter(user_id=user_id).delete()
+
+
+def move_user(user_id, target, batch_size=500, grace=0.0):
+    """사용자 데이터를 다른 샤드로 옮긴다. 옮기는 동안에도 원래 샤드에서 읽을 수 있다
+
+    1. 쓰기를 막고(moving_to) 진행 중인 요청이 끝나도록 grace초 기다린다
+    2. 배치로 복사한 뒤 배정을 대상 샤드로 바꾼다
+    3. 이전 배정으로 읽던 요청이 끝나도록 다시 기다린 뒤 원래 샤드에서 지운다
+    """
+    from .models import ShardAssignment
+    assignments = ShardAssignment.objects.using(DEFAULT_DB_ALIAS).filter(user_id=user_id)
+    source = get_assignment(user_id).shard
+    if source == target:
+        return 0
+    assignments.update(moving_to=target)
+    try:
+        time.sleep(grace)
+        # 이전에 중단된 복사가 남긴 행부터 지운다
+        purge_user_data(user_id, target, batch_size)
+        copied = copy_user_data(user_id, source, target, batch_size)
+    except BaseException:
+        assignments.update(moving_to='')
+        purge_user_data(user_id, target, batch_size)
+        raise
+    assignments.update(shard=target, moving_to='')
+    time.sleep(grace)
+    purge_user_data(user_id, source, batch_size)
+    return copied
@@ -0,0 +1,188 @@
+from functools import partial
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from . import sharding, similarity, stats
+from .chunks import sync_chunks
+from .events import get_broker, memo_event
+from .expressions import ByteLength
+from .models import Folder, Memo, MemoTag, ShardAssignment, Tag
+
+
+@receiver(pre_save, sender=Memo)
+@receiver(pre_save, sender=Folder)
+@receiver(pre_save, sender=Tag)
+def assign_global_id(sender, instance, raw, **kwargs):
+    # 재배치 때 기본 키를 그대로 옮길 수 있도록 샤드마다 따로 증가하는 id 대신 공통 시퀀스를 쓴다
+    if raw or instance.pk is not None or not sharding.is_enabled():
+        return
+    instance.pk = sharding.id_allocator.allocate(sender)
+
+
+@receiver(pre_delete, sender=settings.AUTH_USER_MODEL)
+def purge_sharded_user_data(sender, instance, **kwargs):
+    # 샤드의 데이터는 default의 cascade 삭제에 걸리지 않으므로 직접 지운다 (default는 cascade가 지운다)
+    if not sharding.is_enabled():
+        return
+    assignment = ShardAssignment.objects.using(DEFAULT_DB_ALIAS).filter(user_id=instance.pk).first()
+    if assignment is None:
+        return
+    for alias in {assignment.shard, assignment.moving_to} - {'', DEFAULT_DB_ALIAS}:
+        sharding.purge_user_data(instance.pk, alias)
+
+
+@receiver(post_save, sender=Memo)
+def sync_memo_chunks(sender, instance, raw, using, update_fields, **kwargs):
+    # 내용이 바뀌지 않은 저장(update_fields 지정)은 조각을 건드리지 않는다
+    if raw:
+        return
+    if update_fields is not None and 'content' not in update_fields:
+        return
+    sync_chunks(instance, using=using)
+
+
+@receiver(post_save, sender=Memo)
+def update_similarity_index(sender, instance, raw, using, update_fields, **kwargs):
+    # 제목/내용이 바뀌지 않은 저장은 서명을 다시 구하지 않는다
+    if raw:
+        return
+    if update_fields is not None and not {'title', 'content'} & set(update_fields):
+        return
+    previous = get_previous_state(instance)
+    # 소유자가 바뀌면 버킷의 사용자도 바꿔야 하므로 서명이 같아도 다시 쓴다
+    similarity.update_index(instance, using, force=bool(previous) and previous['user_id'] != instance.user_id)
+
+
+def adjust_folder_count(folder_id, delta, using):
+    if folder_id is not None:
+        Folder.objects.using(using).filter(pk=folder_id).update(memo_count=Greatest(F('memo_count') + delta, Value(0)))
+
+
+def adjust_tag_counts(tag_ids, delta, using):
+    if tag_ids:
+        Tag.objects.using(using).filter(pk__in=tag_ids).update(memo_count=Greatest(F('memo_count') + delta, Value(0)))
+
+
+@receiver(pre_save, sender=Memo)
+def remember_previous_memo_state(sender, instance, raw, using, **kwargs):
+    # 수정 전 상태를 기억해 두었다가 post_save에서 카운트/통계 차이를 반영한다
+    instance._previous_state = None
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    instance._previous_state = Memo.objects.using(using).filter(pk=instance.pk).values(
+        'folder_id', 'user_id', size=ByteLength('content'),
+    ).first()
+
+
+def get_previous_state(instance):
+    return getattr(instance, '_previous_state', None) or {}
+
+
+@receiver(post_save, sender=Memo)
+def update_folder_counts_on_save(sender, instance, created, raw, using, **kwargs):
+    if raw:
+        return
+    previous_folder_id = None if created else get_previous_state(instance).get('folder_id')
+    if previous_folder_id != instance.folder_id:
+        adjust_folder_count(previous_folder_id, -1, using)
+        adjust_folder_count(instance.folder_id, 1, using)
+
+
+@receiver(post_save, sender=Memo)
+def update_stats_on_save(sender, instance, created, raw, using, update_fields, **kwargs):
+    if raw:
+        return
+    previous = get_previous_state(instance)
+    # 뷰가 check_quota로 개수/용량을 미리 더해 두었으면 최근 시각만 갱신한다
+    reserved = getattr(instance, '_quota_reserved', False)
+    instance._quota_reserved = False
+    if created or not previous:
+        stats.apply_delta(instance.user_id, 0 if reserved else 1,
+                          0 if reserved else stats.content_bytes(instance.content),
+                          instance.created_at, instance.updated_at, using=using)
+        return
+    if update_fields is not None and 'content' not in update_fields:
+        size = previous['size'] or 0
+    else:
+        size = stats.content_bytes(instance.content)
+    if previous['user_id'] != instance.user_id:
+        # 관리자 화면에서 메모 소유자를 바꾼 경우
+        stats.apply_delta(previous['user_id'], -1, -(previous['size'] or 0), using=using)
+        stats.refresh_timestamps(previous['user_id'], instance.created_at, instance.updated_at, using=using)
+        stats.apply_delta(instance.user_id, 1, size, instance.created_at, instance.updated_at, using=using)
+    else:
+        stats.apply_delta(instance.user_id, 0, 0 if reserved else size - (previous['size'] or 0),
+                          updated_at=instance.updated_at, using=using)
+
+
+@receiver(pre_delete, sender=Memo)
+def remember_deleted_memo_size(sender, instance, using, **kwargs):
+    instance._deleted_size = stats.stored_content_bytes(instance.pk, using=using)
+
+
+@receiver(post_delete, sender=Memo)
+def update_stats_on_delete(sender, instance, using, **kwargs):
+    stats.apply_delta(instance.user_id, -1, -getattr(instance, '_deleted_size', 0), using=using)
+    stats.refresh_timestamps(instance.user_id, instance.created_at, instance.updated_at, using=using)
+
+
+@receiver(pre_delete, sender=Memo)
+def update_tag_counts_on_delete(sender, instance, using, **kwargs):
+    # 연결 행은 cascade로 지워지면서 m2m_changed를 보내지 않으므로 여기서 줄인다
+    tag_ids = list(MemoTag.objects.using(using).filter(memo_id=instance.pk).values_list('tag_id', flat=True))
+    adjust_tag_counts(tag_ids, -1, using)
+
+
+@receiver(post_delete, sender=Memo)
+def update_folder_counts_on_delete(sender, instance, using, **kwargs):
+    adjust_folder_count(instance.folder_id, -1, using)
+
+
+@receiver(m2m_changed, sender=MemoTag)
+def update_tag_counts_on_change(sender, instance, action, reverse, pk_set, using, **kwargs):
+    """메모-태그 연결 변경을 태그별 메모 수에 반영한다"""
+    links = MemoTag.objects.using(using)
+    if action in ('pre_remove', 'pre_clear'):
+        # 실제로 연결되어 있던 대상만 세기 위해 지우기 전에 확인한다
+        if reverse:
+            links = links.filter(tag_id=instance.pk)
+            target = 'memo_id'
+        else:
+            links = links.filter(memo_id=instance.pk)
+            target = 'tag_id'
+        if pk_set is not None:
+            links = links.filter(**{f'{target}__in': pk_set})
+        instance._removed_tag_links = list(links.values_list(target, flat=True))
+        return
+    if action == 'post_add':
+        changed, delta = pk_set, 1
+    elif action in ('post_remove', 'post_clear'):
+        changed, delta = getattr(instance, '_removed_tag_links', []), -1
+    else:
+        return
+    if not changed:
+        return
+    if reverse:
+        Tag.objects.using(using).filter(pk=instance.pk).update(memo_count=F('memo_count') + delta * len(changed))
+    else:
+        adjust_tag_counts(changed, delta, using)
+
+
+def publish_after_commit(user_id, event, using):
+    transaction.on_commit(partial(get_broker().publish, user_id, event), using=using)
+
+
+@receiver(post_save, sender=Memo)
+def publish_memo_saved(sender, instance, created, raw, using, **kwargs):
+    # 다른 탭/기기의 메모 목록이 새로고침 없이 갱신되도록 SSE 이벤트를 보낸다
+    if raw:
+        return
+    publish_after_commit(instance.user_id, memo_event('created' if created else 'updated', instance), using)
+
+
+@receiver(post_delete, sender=Memo)
+def publish_memo_deleted(sender, instance, using, **kwargs):
+    publish_after_commit(instance.user_id, memo_event('deleted', instance), using)
@@ -0,0 +1,184 @@
+import hashlib
+import re
+import struct
+from django.conf import settings
+from django.db.models import Q
+from .models import MemoBucket, MemoSignature
+from .sharding import batched
+
+try:
+    import numpy as np
+except ImportError:  # numpy가 없으면 같은 결과를 파이썬으로 계산한다
+    np = None
+
+
+# 서명 길이 = 밴드 수 × 밴드당 행 수. 바꾸면 backfill_memo_signatures --rebuild가 필요하다
+NUM_HASHES = 64
+BANDS = 16
+ROWS = NUM_HASHES // BANDS
+SHINGLE_SIZE = 3
+# 비어 있는 칸 표시 (32비트 값보다 크다)
+EMPTY = 1 << 32
+# 빈 칸을 채울 때 거리마다 더하는 홀수 상수
+DENSIFY_STEP = 0x9E3779B1
+# 메모 하나에서 비교할 최대 후보 수
+MAX_CANDIDATES = 200
+
+SIGNATURE_FORMAT = struct.Struct(f'<{NUM_HASHES}I')
+WORD = re.compile(r'\w+')
+
+
+def get_threshold():
+    # 유사 메모로 보여줄 최소 유사도 (추정 자카드 유사도)
+    return getattr(settings, 'MEMO_SIMILAR_THRESHOLD', 0.5)
+
+
+def memo_text(memo):
+    return f'{memo.title}\n{memo.content}'
+
+
+def shingle_hashes(text):
+    """단어 3-gram마다 64비트 해시를 하나씩 구한다 (같은 shingle은 한 번만)"""
+    words = WORD.findall(text.lower())
+    if len(words) < SHINGLE_SIZE:
+        shingles = {' '.join(words)} if words else set()
+    else:
+        shingles = set(map(' '.join, zip(*(words[offset:] for offset in range(SHINGLE_SIZE)))))
+    return [
+        int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'little')
+        for shingle in shingles
+    ]
+
+
+def densify(values):
+    """비어 있는 칸을 오른쪽으로 가장 가까운 값으로 채운다 (rotation densification)
+
+    짧은 메모끼리 빈 칸이 우연히 일치해서 비슷해 보이는 것을 막는다.
+    """
+    if all(value == EMPTY for value in values):
+        return None
+    result = list(values)
+    for index, value in enumerate(values):
+        if value != EMPTY:
+            continue
+        distance = 1
+        while values[(index + distance) % NUM_HASHES] == EMPTY:
+            distance += 1
+        result[index] = (values[(index + distance) % NUM_HASHES] + distance * DENSIFY_STEP) & 0xFFFFFFFF
+    return tuple(result)
+
+
+def minhash(hashes):
+    """one permutation MinHash: 해시 하나를 하위 6비트로 칸을 고르고 상위 32비트 최솟값을 남긴다
+
+    shingle마다 해시를 64번 구하는 대신 한 번만 구하므로 긴 메모도 저장할 때 계산할 수 있다.
+    """
+    values = [EMPTY] * NUM_HASHES
+    for value in hashes:
+        index = value & (NUM_HASHES - 1)
+        value >>= 32
+        if value < values[index]:
+            values[index] = value
+    return densify(values)
+
+
+def compute_signature(text):
+    return minhash(shingle_hashes(text))
+
+
+def compute_signatures(texts):
+    """여러 메모의 서명을 한 번에 구한다 (numpy가 있으면 칸별 최솟값을 벡터 연산으로)"""
+    hash_lists = [shingle_hashes(text) for text in texts]
+    if np is None:
+        return [minhash(hashes) for hashes in hash_lists]
+    lengths = [len(hashes) for hashes in hash_lists]
+    hashes = np.fromiter((value for values in hash_lists for value in values), dtype=np.uint64, count=sum(lengths))
+    rows = np.repeat(np.arange(len(texts)), lengths)
+    values = np.full((len(texts), NUM_HASHES), EMPTY, dtype=np.uint64)
+    np.minimum.at(values, (rows, (hashes & np.uint64(NUM_HASHES - 1)).astype(np.intp)), hashes >> np.uint64(32))
+    return [densify(row) for row in values.tolist()]
+
+
+def encode_signature(signature):
+    return SIGNATURE_FORMAT.pack(*signature)
+
+
+def decode_signature(data):
+    return SIGNATURE_FORMAT.unpack(bytes(data))
+
+
+def band_keys(signature):
+    """밴드마다 행 값들을 해시한 버킷 키 (SQLite 정수 범위의 부호 있는 64비트)"""
+    data = encode_signature(signature)
+    width = ROWS * 4
+    return [
+        (band, int.from_bytes(
+            hashlib.blake2b(data[band * width:(band + 1) * width], digest_size=8).digest(), 'little', signed=True,
+        ))
+        for band in range(BANDS)
+    ]
+
+
+def estimate_similarity(first, second):
+    """같은 칸 비율 = 자카드 유사도 추정값"""
+    return sum(a == b for a, b in zip(first, second)) / NUM_HASHES
+
+
+def write_index(entries, using):
+    """(메모, 서명) 목록의 서명과 버킷을 다시 쓴다. 서명이 None이면(단어가 없는 메모) 지우기만 한다"""
+    for batch in batched(entries, 500):
+        memo_ids = [memo.pk for memo, _ in batch]
+        MemoBucket.objects.using(using).filter(memo_id__in=memo_ids).delete()
+        MemoSignature.objects.using(using).filter(memo_id__in=memo_ids).delete()
+        batch = [(memo, signature) for memo, signature in batch if signature is not None]
+        MemoSignature.objects.using(using).bulk_create([
+            MemoSignature(memo_id=memo.pk, signature=encode_signature(signature)) for memo, signature in batch
+        ])
+        MemoBucket.objects.using(using).bulk_create([
+            MemoBucket(memo_id=memo.pk, user_id=memo.user_id, band=band, bucket=bucket)
+            for memo, signature in batch
+            for band, bucket in band_keys(signature)
+        ])
+
+
+def update_index(memo, using, force=False):
+    """저장한 메모의 서명을 갱신한다. 서명이 같으면 버킷을 다시 쓰지 않는다"""
+    signature = compute_signature(memo_text(memo))
+    if not force:
+        stored = MemoSignature.objects.using(using).filter(memo_id=memo.pk).values_list('signature', flat=True).first()
+        if (None if stored is None else decode_signature(stored)) == signature:
+            return
+    write_index([(memo, signature)], using)
+
+
+def similar_memos(memo, using, limit=5, threshold=None):
+    """같은 사용자의 비슷한 메모를 유사도 순으로 돌려준다
+
+    메모의 밴드 버킷과 같은 버킷에 있는 메모만 후보로 읽으므로 메모 수가 늘어도
+    조회 비용은 후보 수에만 비례한다.
+    """
+    threshold = get_threshold() if threshold is None else threshold
+    stored = MemoSignature.objects.using(using).filter(memo_id=memo.pk).values_list('signature', flat=True).first()
+    if stored is None:
+        return []
+    signature = decode_signature(stored)
+    # 사용자 조건을 OR 항마다 넣어야 SQLite가 (user, band, bucket) 인덱스를 밴드마다 찾는다
+    lookup = Q()
+    for band, bucket in band_keys(signature):
+        lookup |= Q(user_id=memo.user_id, band=band, bucket=bucket)
+    candidate_ids = list(
+        MemoBucket.objects.using(using).filter(lookup).exclude(memo_id=memo.pk)
+        .values_list('memo_id', flat=True).distinct()[:MAX_CANDIDATES]
+    )
+    if not candidate_ids:
+        return []
+    candidates = MemoSignature.objects.using(using).filter(memo_id__in=candidate_ids).values_list(
+        'memo_id', 'memo__title', 'signature',
+    )
+    results = []
+    for memo_id, title, data in candidates:
+        score = estimate_similarity(signature, decode_signature(data))
+        if score >= threshold:
+            results.append({'pk': memo_id, 'title': title, 'similarity': score})
+    results.sort(key=lambda item: (-item['similarity'], item['pk']))
+    return results[:limit]
@@ -0,0 +1,63 @@
+import json
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from django.conf import settings
+
+
+# 자식 프로세스에서 실행되는 측정 코드: 설정 읽기와 앱 레지스트리 구성을 나눠서 잰다
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import django
+from django.conf import settings
+settings.INSTALLED_APPS
+configured = time.perf_counter()
+django.setup()
+ready = time.perf_counter()
+print(json.dumps({
+    "settings": configured - started,
+    "setup": ready - configured,
+    "installed_apps": list(settings.INSTALLED_APPS),
+    "modules": sorted(sys.modules),
+}))
+"""
+
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+def parse_importtime(output):
+    """-X importtime 출력을 (모듈, 자체 시간, 누적 시간, 깊이) 목록으로 바꾼다 (시간 단위: 초)"""
+    rows = []
+    for line in output.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            own, cumulative, indent, module = match.groups()
+            rows.append((module, int(own) / 1e6, int(cumulative) / 1e6, (len(indent) - 1) // 2))
+    return rows
+
+
+def summarize_packages(rows):
+    # 최상위 패키지별 자체 import 시간 합계
+    totals = defaultdict(float)
+    for module, own, cumulative, depth in rows:
+        totals[module.split('.')[0]] += own
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)
+
+
+def measure_startup(profile=None, importtime=True):
+    """새 파이썬 프로세스에서 django.setup()까지 걸리는 시간을 잰다"""
+    env = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'memoapp.settings')}
+    if profile:
+        env['SETTINGS_PROFILE'] = profile
+    command = [sys.executable]
+    if importtime:
+        command += ['-X', 'importtime']
+    command += ['-c', PROBE]
+    result = subprocess.run(command, cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, check=True)
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    report['imports'] = parse_importtime(result.stderr) if importtime else []
+    report['import_total'] = sum(own for module, own, cumulative, depth in report['imports'])
+    return report
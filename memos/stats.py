@@ -0,0 +1,103 @@
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Count, F, Max, Q, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+from .expressions import ByteLength
+from .models import Memo, MemoStats
+
+
+def content_bytes(content):
+    return len(content.encode('utf-8'))
+
+
+def stored_content_bytes(memo_pk, using='default'):
+    # 내용을 파이썬으로 읽지 않고 DB에서 바이트 길이만 구한다
+    return Memo.objects.using(using).filter(pk=memo_pk).annotate(
+        size=ByteLength('content')
+    ).values_list('size', flat=True).first() or 0
+
+
+def apply_delta(user_id, count=0, size=0, created_at=None, updated_at=None, using='default'):
+    """사용자 통계 행에 변화량을 더한다. 행이 없으면 메모가 늘어날 때만 만든다.
+
+    통계가 이미 어긋나 있어도 시그널 안에서 IntegrityError가 나지 않도록 0 아래로는 내리지 않는다
+    (어긋난 값은 recompute_memo_stats로 복구한다).
+    """
+    changes = {
+        'memo_count': Greatest(F('memo_count') + count, Value(0)),
+        'content_bytes': Greatest(F('content_bytes') + size, Value(0)),
+    }
+    if created_at is not None:
+        changes['last_created_at'] = Greatest(Coalesce('last_created_at', Value(created_at)), Value(created_at))
+    if updated_at is not None:
+        changes['last_updated_at'] = Greatest(Coalesce('last_updated_at', Value(updated_at)), Value(updated_at))
+    if MemoStats.objects.using(using).filter(user_id=user_id).update(**changes):
+        return
+    # 사용자 삭제 중(cascade)에는 행을 다시 만들지 않는다
+    if count > 0:
+        MemoStats.objects.using(using).create(
+            user_id=user_id,
+            memo_count=count,
+            content_bytes=size,
+            last_created_at=created_at,
+            last_updated_at=updated_at,
+        )
+
+
+def refresh_timestamps(user_id, removed_created_at, removed_updated_at, using='default'):
+    """지워진 메모가 가장 최근 메모였을 때만 최근 시각을 다시 구한다"""
+    rows = MemoStats.objects.using(using).filter(user_id=user_id).filter(
+        Q(last_created_at__lte=removed_created_at) | Q(last_updated_at__lte=removed_updated_at)
+    )
+    if not rows.exists():
+        return
+    latest = Memo.objects.using(using).filter(user_id=user_id).aggregate(
+        last_created_at=Max('created_at'),
+        last_updated_at=Max('updated_at'),
+    )
+    MemoStats.objects.using(using).filter(user_id=user_id).update(**latest)
+
+
+def compute_stats(using='default', user_ids=None):
+    """메모 테이블에서 사용자별 통계를 다시 계산한다 (검증/복구용)"""
+    memos = Memo.objects.using(using)
+    if user_ids is not None:
+        memos = memos.filter(user_id__in=user_ids)
+    rows = memos.values('user_id').annotate(
+        memo_count=Count('pk'),
+        content_bytes=Sum(ByteLength('content')),
+        last_created_at=Max('created_at'),
+        last_updated_at=Max('updated_at'),
+    ).order_by()
+    return {row.pop('user_id'): row for row in rows}
+
+
+def check_quota(user, count=0, size=0, using='default'):
+    """할당량 안에서만 통계 행에 count/size를 미리 더한다 (예약)
+
+    검사와 예약을 조건부 UPDATE 한 번으로 하므로 동시에 저장해도 한도를 넘지 않는다.
+    저장과 같은 트랜잭션에서 불러야 하고, 예약했으면 True를 돌려준다. 호출한 쪽은 저장할 메모에
+    _quota_reserved를 표시해서 post_save 시그널이 같은 변화량을 다시 더하지 않게 한다.
+    """
+    max_count = getattr(settings, 'MEMO_QUOTA_MAX_COUNT', 0)
+    max_bytes = getattr(settings, 'MEMO_QUOTA_MAX_BYTES', 0)
+    if not max_count and not max_bytes:
+        return False
+    rows = MemoStats.objects.using(using)
+    # 첫 메모라 통계 행이 없으면 빈 행부터 만든다 (동시에 만들어도 한 행만 남는다)
+    rows.bulk_create([MemoStats(user=user)], ignore_conflicts=True)
+    limits = Q()
+    if max_count and count > 0:
+        limits &= Q(memo_count__lte=max_count - count)
+    if max_bytes and size > 0:
+        limits &= Q(content_bytes__lte=max_bytes - size)
+    reserved = rows.filter(limits, user=user).update(
+        memo_count=Greatest(F('memo_count') + count, Value(0)),
+        content_bytes=Greatest(F('content_bytes') + size, Value(0)),
+    )
+    if reserved:
+        return True
+    stats = rows.get(user=user)
+    if max_count and count > 0 and stats.memo_count + count > max_count:
+        raise ValidationError(f"Превышен лимит количества заметок ({max_count}).", code='quota_count')
+    raise ValidationError(f"Превышен лимит объёма заметок ({max_bytes} байт).", code='quota_bytes')
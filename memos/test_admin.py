@@ -0,0 +1,132 @@
+"""
+관리자 메모 목록 성능 모드 테스트
+"""
+
+from contextlib import ExitStack
+from datetime import datetime, timezone as dt_timezone
+from unittest import mock
+from django.db import connections
+from django.db.models import Max, Min
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.contrib.auth.models import User
+from memos import sharding
+from memos.admin import LARGE_TABLE_SEARCH_HELP, IndexedDateQuerySet, MemoAdmin
+from memos.models import Memo, ShardAssignment
+from memos.testcases import MemoTestCase
+
+
+@override_settings(MEMO_ADMIN_ESTIMATE_THRESHOLD=1)
+class TestMemoAdminPerformanceMode(MemoTestCase):
+    """관리자 메모 목록 성능 모드 테스트 (추정 행 수가 기준 이상인 큰 테이블)"""
+
+    def setUp(self):
+        """테스트 데이터 초기화"""
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'adminpassword123')
+        self.user = User.objects.create_user('memouser', 'memo@example.com', 'testpassword123')
+        self.memos = [
+            Memo.objects.create(user=self.user, title=f'memo {index:02d}', content='검색되지 않는 내용')
+            for index in range(30)
+        ]
+        self.client.force_login(self.admin)
+        self.url = reverse('admin:memos_memo_changelist')
+        # 샤딩을 켜면 목록은 샤드 하나씩 보여주므로 메모가 있는 샤드를 고른다
+        self.using = self.shard_of(self.user)
+        self.params = {'shard': self.using} if sharding.is_enabled() else {}
+        # 샤드의 기본 키는 공통 시퀀스라 범위로 추정할 수 없으므로 ANALYZE 통계를 쓴다
+        with connections[self.using].cursor() as cursor:
+            cursor.execute('ANALYZE memos_memo')
+
+    def get(self, params=None):
+        return self.client.get(self.url, {**self.params, **(params or {})})
+
+    def count_queries(self):
+        """목록을 한 번 그리는 동안 모든 DB에 나간 쿼리 수"""
+        contexts = [CaptureQueriesContext(connections[alias]) for alias in connections]
+        with ExitStack() as stack:
+            for context in contexts:
+                stack.enter_context(context)
+            response = self.get()
+        self.assertEqual(response.status_code, 200)
+        return sum(len(context) for context in contexts)
+
+    def test_changelist_loads_users_with_join(self):
+        """사용자를 조인(샤딩이면 한 번의 프리페치)으로 읽어서 행과 사용자가 늘어도 쿼리 수가 같은지 테스트"""
+        before = self.count_queries()
+        for index in range(3):
+            user = User.objects.create_user(f'more{index}', f'more{index}@example.com', 'testpassword123')
+            ShardAssignment.objects.create(user=user, shard=self.using)
+            for number in range(10):
+                Memo.objects.create(user=user, title=f'more {index} {number}', content='내용')
+        self.assertEqual(self.count_queries(), before)
+
+    def test_estimated_count_for_large_tables(self):
+        """큰 테이블은 추정 개수를 보여주는지 테스트"""
+        response = self.get()
+        self.assertTrue(response.context['cl'].result_count_estimated)
+        self.assertEqual(response.context['cl'].result_count, 30)
+        self.assertContains(response, '≈ 30')
+
+    @override_settings(MEMO_ADMIN_COUNT_CAP=5)
+    def test_filtered_count_is_capped(self):
+        """검색 결과 개수는 상한까지만 세는지 테스트"""
+        response = self.get({'q': 'memo'})
+        self.assertEqual(response.context['cl'].result_count, 5)
+        self.assertTrue(response.context['cl'].result_count_estimated)
+
+    def test_keyset_cursor_paging(self):
+        """cursor 파라미터로 OFFSET 없이 다음 페이지를 가져오는지 테스트"""
+        with mock.patch.object(MemoAdmin, 'list_per_page', 10):
+            first = self.get().context['cl']
+            self.assertEqual([memo.pk for memo in first.result_list], [memo.pk for memo in self.memos[::-1][:10]])
+            self.assertIn('cursor=%d' % self.memos[20].pk, first.next_cursor_url)
+            second = self.client.get(self.url + first.next_cursor_url).context['cl']
+            self.assertEqual([memo.pk for memo in second.result_list], [memo.pk for memo in self.memos[::-1][10:20]])
+            deep = self.get({'p': 3}).context['cl']
+            self.assertEqual([memo.pk for memo in deep.result_list], [memo.pk for memo in self.memos[::-1][20:30]])
+
+    def test_search_uses_indexed_conditions(self):
+        """검색이 id/사용자 이름/제목 접두사로만 찾는지 테스트"""
+        response = self.get({'q': 'memo 0'})
+        self.assertEqual(len(response.context['cl'].result_list), 10)
+        response = self.get({'q': 'memouser'})
+        self.assertEqual(len(response.context['cl'].result_list), 30)
+        response = self.get({'q': str(self.memos[3].pk)})
+        self.assertIn(self.memos[3], response.context['cl'].result_list)
+        response = self.get({'q': '검색되지'})
+        self.assertEqual(len(response.context['cl'].result_list), 0)
+        # 내용 검색이 꺼졌음을 검색창 아래에 알린다
+        self.assertContains(response, LARGE_TABLE_SEARCH_HELP)
+
+    @override_settings(MEMO_ADMIN_ESTIMATE_THRESHOLD=100_000)
+    def test_small_table_keeps_default_mode(self):
+        """추정 행 수가 기준보다 작으면 성능 모드를 켜 두어도 정확한 개수와 내용 검색을 쓰는지 테스트"""
+        response = self.get({'q': '검색되지'})
+        cl = response.context['cl']
+        self.assertEqual(cl.result_count, 30)
+        self.assertFalse(getattr(cl, 'result_count_estimated', False))
+        self.assertTrue(cl.show_full_result_count)
+        self.assertNotContains(response, LARGE_TABLE_SEARCH_HELP)
+
+    @override_settings(MEMO_ADMIN_PERFORMANCE_MODE=False)
+    def test_default_mode_searches_content(self):
+        """성능 모드를 끄면 기존처럼 내용까지 검색하는지 테스트"""
+        response = self.get({'q': '검색되지'})
+        self.assertEqual(response.context['cl'].result_count, 30)
+
+    def test_indexed_datetimes_match_django(self):
+        """인덱스 탐색 datetimes()가 Django 기본 결과와 같은지 테스트"""
+        moments = [datetime(2023, 12, 31, 22, 30), datetime(2024, 1, 1, 1, 0), datetime(2024, 3, 5, 12, 0)]
+        for memo, moment in zip(self.memos, moments):
+            Memo.objects.for_user(self.user).filter(pk=memo.pk).update(
+                created_at=timezone.make_aware(moment, dt_timezone.utc),
+            )
+        memos = Memo.objects.using(self.using)
+        indexed = IndexedDateQuerySet(model=Memo, using=self.using)
+        for kind in ('year', 'month', 'day'):
+            self.assertEqual(list(indexed.datetimes('created_at', kind)), list(memos.datetimes('created_at', kind)))
+        bounds = {'first': Min('created_at'), 'last': Max('created_at')}
+        self.assertEqual(indexed.aggregate(**bounds), memos.aggregate(**bounds))
+        self.assertEqual(indexed.filter(pk=-1).aggregate(**bounds), {'first': None, 'last': None})
@@ -0,0 +1,240 @@
+"""
+메모 일괄 삭제/이동 테스트
+"""
+
+import io
+import os
+import re
+import time
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connections
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from memos import bulk, chunks, similarity, stats
+from memos.events import get_broker
+from memos.models import Folder, Memo, MemoBucket, MemoChunk, MemoSignature, MemoStats, MemoTag, Tag
+from memos.stats import compute_stats
+from memos.testcases import MemoTestCase
+
+
+# 조각/서명/버킷/태그가 딸린 메모 1만 개 일괄 삭제에 허용하는 시간(초). 느린 CI에서는 환경 변수로 늘린다.
+# 대부분은 버킷 16만 행의 인덱스를 지우는 시간이다
+BULK_DELETE_BUDGET_SECONDS = float(os.environ.get('BULK_DELETE_BUDGET_SECONDS', 2.0))
+
+class TestMemoBulk(MemoTestCase):
+    """메모 목록 일괄 작업 테스트"""
+
+    def setUp(self):
+        """테스트 데이터 초기화"""
+        self.user = User.objects.create_user('bulkuser', 'bulk@example.com', 'testpassword123')
+        self.other = User.objects.create_user('otheruser', 'other@example.com', 'otherpassword123')
+        self.client.login(username='bulkuser', password='testpassword123')
+
+    def create_memos(self, count, folder_name='', tag_names=''):
+        """화면에서 만들어 폴더/태그/통계 카운터가 시그널로 맞춰지게 한다"""
+        for index in range(count):
+            self.client.post(reverse('memo_create'), {
+                'title': f'{folder_name}메모{index}', 'content': '내용' * (index + 1),
+                'folder_name': folder_name, 'tag_names': tag_names,
+            })
+        return list(Memo.objects.for_user(self.user).filter(title__startswith=f'{folder_name}메모').order_by('pk'))
+
+    def assert_stats_consistent(self, user):
+        using = self.shard_of(user)
+        stats = MemoStats.objects.for_user(user).get()
+        expected = compute_stats(using, user_ids=[user.pk]).get(user.pk, {'memo_count': 0, 'content_bytes': None})
+        self.assertEqual(stats.memo_count, expected['memo_count'])
+        self.assertEqual(stats.content_bytes, expected['content_bytes'] or 0)
+        for folder in Folder.objects.for_user(user):
+            self.assertEqual(folder.memo_count, folder.memos.count(), folder.name)
+        for tag in Tag.objects.for_user(user):
+            self.assertEqual(tag.memo_count, MemoTag.objects.using(using).filter(tag=tag).count(), tag.name)
+
+    @override_settings(MEMO_CHUNK_SIZE=4)
+    def test_bulk_delete_keeps_counts(self):
+        """일괄 삭제 후 폴더/태그 수, 통계가 남은 메모와 맞고 조각도 지워지는지 테스트"""
+        memos = self.create_memos(5, folder_name='일', tag_names='a, b')
+        keep = memos[0]
+        response = self.client.post(reverse('memo_bulk'), {
+            'action': 'delete', 'memo_ids': ','.join(str(memo.pk) for memo in memos[1:]),
+        })
+        self.assertRedirects(response, reverse('memo_list'), fetch_redirect_response=False)
+        self.assertEqual(list(Memo.objects.for_user(self.user)), [keep])
+        using = self.shard_of(self.user)
+        self.assertEqual(MemoChunk.objects.using(using).exclude(memo=keep).count(), 0)
+        self.assertEqual(MemoSignature.objects.using(using).exclude(memo=keep).count(), 0)
+        self.assertEqual(MemoBucket.objects.using(using).exclude(memo=keep).count(), 0)
+        self.assertEqual(Folder.objects.for_user(self.user).get().memo_count, 1)
+        self.assertEqual(Tag.objects.for_user(self.user).filter(memo_count=1).count(), 2)
+        self.assert_stats_consistent(self.user)
+        self.assertContains(self.client.get(reverse('memo_list')), 'Удалено заметок: 4')
+
+    def test_bulk_move_keeps_counts(self):
+        """일괄 이동 후 원래 폴더와 대상 폴더 수가 맞는지 테스트"""
+        memos = self.create_memos(4, folder_name='일')
+        response = self.client.post(reverse('memo_bulk'), {
+            'action': 'move', 'memo_ids': [str(memo.pk) for memo in memos[:3]], 'folder_name': '보관',
+        })
+        self.assertRedirects(response, reverse('memo_list'))
+        self.assertEqual(Folder.objects.for_user(self.user).get(name='일').memo_count, 1)
+        self.assertEqual(Folder.objects.for_user(self.user).get(name='보관').memo_count, 3)
+        self.assert_stats_consistent(self.user)
+
+        # 폴더 이름을 비우면 폴더에서 뺀다
+        self.client.post(reverse('memo_bulk'), {'action': 'move', 'memo_ids': str(memos[0].pk)})
+        self.assertIsNone(Memo.objects.for_user(self.user).get(pk=memos[0].pk).folder)
+        self.assertEqual(Folder.objects.for_user(self.user).get(name='보관').memo_count, 2)
+        self.assert_stats_consistent(self.user)
+
+    def test_select_all_uses_list_filter(self):
+        """전체 선택은 목록 필터에 맞는 메모에만 적용되는지 테스트"""
+        self.create_memos(3, folder_name='일')
+        self.create_memos(2, folder_name='개인')
+        folder = Folder.objects.for_user(self.user).get(name='일')
+        response = self.client.post(reverse('memo_bulk'), {
+            'action': 'delete', 'select_all': '1', 'folder': str(folder.pk), 'tag': '',
+        })
+        self.assertRedirects(response, reverse('memo_list') + f'?folder={folder.pk}')
+        self.assertEqual(Memo.objects.for_user(self.user).count(), 2)
+        self.assertFalse(Memo.objects.for_user(self.user).filter(folder=folder).exists())
+        self.assert_stats_consistent(self.user)
+
+    def test_other_users_memos_ignored(self):
+        """다른 사용자의 메모 id는 무시되는지 테스트"""
+        mine = self.create_memos(1)
+        others = [Memo.objects.create(user=self.other, title=f'남의 메모{index}', content='내용') for index in range(2)]
+        ids = [memo.pk for memo in mine + others]
+        self.client.post(reverse('memo_bulk'), {'action': 'move', 'memo_ids': ids, 'folder_name': '훔침'})
+        self.assertFalse(Memo.objects.for_user(self.other).filter(folder__isnull=False).exists())
+        self.client.post(reverse('memo_bulk'), {'action': 'delete', 'memo_ids': ids})
+        self.assertFalse(Memo.objects.for_user(self.user).exists())
+        self.assertEqual(Memo.objects.for_user(self.other).count(), 2)
+        self.assert_stats_consistent(self.other)
+
+    def test_invalid_requests(self):
+        """선택이 없거나 id가 잘못되면 아무것도 지우지 않는지 테스트"""
+        self.create_memos(1)
+        for data in ({'action': 'delete'}, {'action': 'delete', 'memo_ids': '1,x'}, {'action': 'drop', 'memo_ids': '1'}):
+            response = self.client.post(reverse('memo_bulk'), data)
+            self.assertRedirects(response, reverse('memo_list'))
+        self.assertEqual(Memo.objects.for_user(self.user).count(), 1)
+        self.assertEqual(self.client.get(reverse('memo_bulk')).status_code, 405)
+
+    def test_one_event_per_operation(self):
+        """메모 개수와 상관없이 작업마다 이벤트 하나만 발행되는지 테스트"""
+        memos = self.create_memos(3)
+        published = []
+        broker = get_broker()
+        original = broker.publish
+        broker.publish = lambda user_id, event: published.append((user_id, event))
+        try:
+            with self.captureOnCommitCallbacks(using=self.shard_of(self.user), execute=True):
+                self.client.post(reverse('memo_bulk'), {
+                    'action': 'delete', 'memo_ids': ','.join(str(memo.pk) for memo in memos),
+                })
+        finally:
+            broker.publish = original
+        self.assertEqual(published, [(self.user.pk, {'type': 'deleted', 'ids': [memo.pk for memo in memos]})])
+
+    @override_settings(MEMO_BULK_BATCH_SIZE=10)
+    def test_query_count_bounded_by_batches(self):
+        """쿼리 수가 메모 수가 아니라 배치 수에 비례하고 결과가 로그에 남는지 테스트"""
+        memos = self.create_memos(2, folder_name='일', tag_names='a')
+        ids = [memo.pk for memo in memos]
+        using = self.shard_of(self.user)
+        # bulk_create는 시그널을 보내지 않으므로 통계는 직접 맞춘다
+        Memo.objects.using(using).bulk_create([
+            Memo(user=self.user, title=f'추가{index}', content='x') for index in range(28)
+        ])
+        stats.apply_delta(self.user.pk, 28, 28, using=using)
+        ids += list(Memo.objects.for_user(self.user).filter(title__startswith='추가').values_list('pk', flat=True))
+        selections = bulk.select_memos(self.user, ids, using)
+        # 배치(3개)마다 집계/폴더 수/태그 수/조각 삭제/버킷 삭제/서명 삭제/메모 삭제,
+        # 끝에 태그 연결 삭제 1번, 통계 1번, 최근 시각 다시 구하기 3번
+        with self.assertNumQueries(3 * 7 + 5, using=using), self.assertLogs('memos.bulk', 'INFO') as logs:
+            deleted = bulk.delete_memos(self.user, selections, using, ids)
+            bulk.log_result('delete', self.user, len(ids), deleted)
+        self.assertEqual(deleted, 30)
+        self.assertIn('30 requested, 30 affected', logs.output[0])
+
+    def test_select_all_does_not_load_ids(self):
+        """전체 선택은 메모 수와 상관없이 같은 수의 문장으로 처리되고 태그 필터도 지켜지는지 테스트"""
+        using = self.shard_of(self.user)
+        self.create_memos(1, folder_name='개인', tag_names='b')
+        self.create_memos(2, folder_name='일', tag_names='a, b')
+        tag = Tag.objects.for_user(self.user).get(name='a')
+        data = {'action': 'delete', 'select_all': '1', 'folder': '', 'tag': str(tag.pk)}
+        with CaptureQueriesContext(connections[using]) as small:
+            self.client.post(reverse('memo_bulk'), data)
+        small_count = len(small)
+        self.assertEqual(Memo.objects.for_user(self.user).count(), 1)
+        self.assertEqual(Tag.objects.for_user(self.user).get(name='b').memo_count, 1)
+        self.assertFalse(MemoTag.objects.using(using).filter(tag=tag).exists())
+        self.assert_stats_consistent(self.user)
+
+        self.create_memos(10, folder_name='다시', tag_names='a')
+        with CaptureQueriesContext(connections[using]) as large:
+            self.client.post(reverse('memo_bulk'), data)
+        self.assertEqual(len(large), small_count)
+        # id 목록을 값으로 넣은 문장이 없다 (모두 부분 쿼리)
+        self.assertFalse([query for query in large.captured_queries if re.search(r'IN \(\d', query['sql'])])
+        self.assertEqual(Memo.objects.for_user(self.user).count(), 1)
+        self.assert_stats_consistent(self.user)
+
+    def seed_memos(self, count, using):
+        """화면에서 만든 것과 같은 행(조각, 서명, 버킷, 태그, 폴더, 통계)을 한꺼번에 넣는다"""
+        folders = Folder.objects.using(using).bulk_create([
+            Folder(user=self.user, name=f'폴더{index}') for index in range(10)
+        ])
+        tags = Tag.objects.using(using).bulk_create([Tag(user=self.user, name=f'태그{index}') for index in range(20)])
+        words = '가나 다라 마바 사아 자차 카타 파하'.split()
+        memos = Memo.objects.using(using).bulk_create([
+            Memo(
+                user=self.user, title=f'메모{index}', folder=folders[index % len(folders)],
+                content=' '.join(words[(index + offset) % len(words)] for offset in range(40)) + f' {index}',
+            )
+            for index in range(count)
+        ])
+        MemoChunk.objects.using(using).bulk_create([
+            MemoChunk(memo=memo, position=position, content=text, digest=chunks.digest_chunk(text))
+            for memo in memos
+            for position, text in enumerate(chunks.split_content(memo.content, 64))
+        ])
+        similarity.write_index(list(zip(memos, similarity.compute_signatures(
+            [similarity.memo_text(memo) for memo in memos]
+        ))), using)
+        MemoTag.objects.using(using).bulk_create([
+            MemoTag(memo=memo, tag=tags[(memo.pk + offset) % len(tags)]) for memo in memos for offset in range(2)
+        ])
+        call_command('recompute_memo_stats', stdout=io.StringIO())
+        for folder in folders:
+            Folder.objects.using(using).filter(pk=folder.pk).update(memo_count=folder.memos.count())
+        for tag in tags:
+            Tag.objects.using(using).filter(pk=tag.pk).update(
+                memo_count=MemoTag.objects.using(using).filter(tag=tag).count()
+            )
+        return memos
+
+    def test_delete_ten_thousand_memos(self):
+        """조각/서명/버킷/태그가 딸린 메모 1만 개 일괄 삭제가 예산 안에 끝나고 카운터가 맞는지 테스트"""
+        using = self.shard_of(self.user)
+        memos = self.seed_memos(10000, using)
+        ids = ','.join(str(memo.pk) for memo in memos)
+        started = time.perf_counter()
+        response = self.client.post(reverse('memo_bulk'), {'action': 'delete', 'memo_ids': ids})
+        elapsed = time.perf_counter() - started
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Memo.objects.for_user(self.user).exists())
+        for model in (MemoChunk, MemoSignature, MemoBucket, MemoTag):
+            self.assertFalse(model.objects.using(using).exists(), model.__name__)
+        self.assert_stats_consistent(self.user)
+        self.assertLess(elapsed, BULK_DELETE_BUDGET_SECONDS)
+
+    def test_list_renders_checkboxes(self):
+        """목록에 선택 체크박스와 일괄 작업 폼이 보이는지 테스트"""
+        memo = self.create_memos(1)[0]
+        response = self.client.get(reverse('memo_list'))
+        self.assertContains(response, f'name="memo_ids" value="{memo.pk}"')
+        self.assertContains(response, reverse('memo_bulk'))
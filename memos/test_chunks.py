@@ -0,0 +1,115 @@
+"""
+메모 내용 조각 저장 테스트
+"""
+
+from django.db import connections
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.contrib.auth.models import User
+from memos.chunks import split_content, sync_chunks
+from memos.models import Memo, MemoChunk
+from memos.testcases import MemoTestCase
+
+
+@override_settings(MEMO_CHUNK_SIZE=10)
+class TestMemoChunks(MemoTestCase):
+    """메모 조각 저장 및 지연 로딩 테스트"""
+
+    def setUp(self):
+        """테스트 데이터 초기화"""
+        self.user = User.objects.create_user('chunkuser', 'chunk@example.com', 'testpassword123')
+        self.other_user = User.objects.create_user('otheruser', 'other@example.com', 'otherpassword123')
+        self.memo = Memo.objects.create(user=self.user, title='긴 메모', content='a' * 10 + 'b' * 10 + 'c' * 5)
+
+    def test_content_split_into_chunks(self):
+        """저장 시 내용이 조각으로 나뉘는지 테스트 (줄바꿈이나 공백이 없으면 조각 크기에서 자른다)"""
+        chunks = list(self.memo.chunks.values_list('position', 'content'))
+        self.assertEqual(chunks, [(0, 'a' * 10), (1, 'b' * 10), (2, 'c' * 5)])
+
+    def test_update_rewrites_only_changed_chunks(self):
+        """수정 시 바뀐 조각만 다시 쓰는지 테스트"""
+        before = dict(self.memo.chunks.values_list('position', 'id'))
+        self.memo.content = 'a' * 10 + 'B' * 10 + 'c' * 5
+        self.memo.save()
+        after = dict(self.memo.chunks.values_list('position', 'id'))
+        self.assertEqual(before, after)
+        self.assertEqual(self.memo.chunks.get(position=1).content, 'B' * 10)
+        self.assertEqual(self.memo.chunks.get(position=0).content, 'a' * 10)
+
+    def test_split_follows_line_breaks(self):
+        """조각 경계가 조각 뒤쪽 절반의 마지막 줄바꿈(없으면 공백) 뒤에 오는지 테스트"""
+        self.assertEqual(list(split_content('abcdefg\nhijklm nopqrs', 10)), ['abcdefg\n', 'hijklm ', 'nopqrs'])
+        self.assertEqual(list(split_content('ab\ncdefghijklm', 10)), ['ab\ncdefghi', 'jklm'])
+
+    def test_insert_rewrites_only_edited_chunk(self):
+        """앞쪽 조각에 글자를 넣어도 뒤 조각은 다시 쓰지 않는지 테스트"""
+        self.memo.content = ''.join(f'line {index}\n' for index in range(8))
+        self.memo.save()
+        before = list(self.memo.chunks.values_list('id', 'content'))
+        self.assertEqual([content for _, content in before], [f'line {index}\n' for index in range(8)])
+        self.memo.content = 'X' + self.memo.content
+        with CaptureQueriesContext(connections[self.shard_of(self.user)]) as queries:
+            sync_chunks(self.memo, using=self.shard_of(self.user))
+        after = list(self.memo.chunks.values_list('id', 'content'))
+        self.assertEqual(after[0], (before[0][0], 'Xline 0\n'))
+        self.assertEqual(after[1:], before[1:])
+        # 조각 읽기 1번, 바뀐 조각 UPDATE 1번
+        self.assertEqual(len(queries), 2)
+
+    def test_shifted_chunks_are_renumbered_not_rewritten(self):
+        """앞에 조각이 하나 늘면 뒤 조각은 순번만 바뀌는지 테스트"""
+        self.memo.content = ''.join(f'line {index}\n' for index in range(4))
+        self.memo.save()
+        before = list(self.memo.chunks.values_list('id', 'content'))
+        self.memo.content = 'head 0\n' + self.memo.content
+        self.memo.save()
+        after = list(self.memo.chunks.values_list('position', 'id', 'content'))
+        self.assertEqual(after[0][2], 'head 0\n')
+        self.assertEqual([(item_id, content) for _, item_id, content in after[1:]], before)
+        self.assertEqual([position for position, _, _ in after], [0, 1, 2, 3, 4])
+
+    def test_shrinking_content_removes_tail_chunks(self):
+        """내용이 줄면 남는 조각이 삭제되는지 테스트"""
+        self.memo.content = 'a' * 10
+        self.memo.save()
+        self.assertEqual(list(self.memo.chunks.values_list('position', flat=True)), [0])
+
+    def test_save_without_content_skips_chunks(self):
+        """내용을 저장하지 않는 update_fields 저장은 조각을 건드리지 않는지 테스트"""
+        self.memo.content = 'changed'
+        self.memo.save(update_fields=['title'])
+        self.assertEqual(self.memo.chunks.count(), 3)
+
+    def test_detail_renders_first_chunk_only(self):
+        """상세 페이지가 첫 조각만 렌더링하는지 테스트"""
+        self.client.login(username='chunkuser', password='testpassword123')
+        response = self.client.get(reverse('memo_detail', args=[self.memo.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'a' * 10)
+        self.assertNotContains(response, 'b' * 10)
+        self.assertContains(response, reverse('memo_chunk', args=[self.memo.pk, 1]))
+        # 조각을 못 가져오면 다시 시도할 수 있다
+        self.assertContains(response, 'Повторить')
+
+    def test_chunk_endpoint_returns_next_url(self):
+        """조각 엔드포인트가 내용과 다음 조각 주소를 반환하는지 테스트"""
+        self.client.login(username='chunkuser', password='testpassword123')
+        response = self.client.get(reverse('memo_chunk', args=[self.memo.pk, 1]))
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['content'], 'b' * 10)
+        self.assertEqual(data['next_url'], reverse('memo_chunk', args=[self.memo.pk, 2]))
+        last = self.client.get(reverse('memo_chunk', args=[self.memo.pk, 2])).json()
+        self.assertIsNone(last['next_url'])
+
+    def test_chunk_endpoint_wrong_user(self):
+        """다른 사용자의 조각 접근 테스트"""
+        self.client.login(username='otheruser', password='otherpassword123')
+        response = self.client.get(reverse('memo_chunk', args=[self.memo.pk, 0]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_chunks_deleted_with_memo(self):
+        """메모 삭제 시 조각도 삭제되는지 테스트"""
+        self.memo.delete()
+        self.assertFalse(MemoChunk.objects.using(self.shard_of(self.user)).exists())
@@ -0,0 +1,189 @@
+"""
+메모 변경 이벤트(SSE) 테스트
+"""
+
+import asyncio
+import json
+import threading
+from datetime import timedelta
+from asgiref.sync import sync_to_async
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.contrib.auth.models import User
+from memos.events import DatabaseBackend, EventBroker, LocalBackend, format_event, get_broker
+from memos.models import Memo, MemoEvent
+from memos.testcases import MemoTestCase, MemoTransactionTestCase
+
+
+class TestEventBroker(MemoTestCase):
+    """프로세스 내 pub/sub 테스트"""
+
+    def test_dispatch_from_other_thread_reaches_only_owner(self):
+        """다른 스레드에서 보낸 이벤트가 해당 사용자 구독자에게만 가는지 테스트"""
+        broker = EventBroker(LocalBackend())
+
+        async def scenario():
+            mine = broker.subscribe(1)
+            others = broker.subscribe(2)
+            thread = threading.Thread(target=broker.publish, args=(1, {'type': 'created', 'id': 7}))
+            thread.start()
+            event = await asyncio.wait_for(mine.queue.get(), timeout=5)
+            thread.join()
+            self.assertTrue(others.queue.empty())
+            broker.unsubscribe(mine)
+            broker.unsubscribe(others)
+            return event
+
+        self.assertEqual(asyncio.run(scenario()), {'type': 'created', 'id': 7})
+        self.assertFalse(broker.has_subscribers())
+
+    def test_slow_subscriber_gets_reload(self):
+        """밀린 구독자는 큐를 비우고 reload 이벤트를 받는지 테스트"""
+        broker = EventBroker(LocalBackend(), max_pending=2)
+
+        async def scenario():
+            subscription = broker.subscribe(1)
+            for index in range(3):
+                broker.dispatch(1, {'type': 'updated', 'id': index})
+            await asyncio.sleep(0)
+            return [subscription.queue.get_nowait() for _ in range(subscription.queue.qsize())]
+
+        self.assertEqual(asyncio.run(scenario()), [{'type': 'reload'}])
+
+    def test_format_event(self):
+        """SSE 직렬화 형식 테스트"""
+        self.assertEqual(
+            format_event({'type': 'deleted', 'id': 3}),
+            'event: deleted\ndata: {"type": "deleted", "id": 3}\n\n',
+        )
+
+
+class TestMemoEventPublishing(MemoTestCase):
+    """메모 저장/삭제 시 이벤트 발행 테스트"""
+
+    def setUp(self):
+        """테스트 데이터 초기화"""
+        self.user = User.objects.create_user('eventuser', 'event@example.com', 'testpassword123')
+
+    def collect_events(self, action):
+        published = []
+        broker = get_broker()
+        original = broker.publish
+        broker.publish = lambda user_id, event: published.append((user_id, event))
+        try:
+            # 이벤트는 메모가 저장된 샤드의 트랜잭션이 커밋된 뒤에 나간다
+            with self.captureOnCommitCallbacks(using=self.shard_of(self.user), execute=True):
+                action()
+        finally:
+            broker.publish = original
+        return published
+
+    def test_create_update_delete_publish_events(self):
+        """생성/수정/삭제가 커밋 후 이벤트를 발행하는지 테스트"""
+        events = self.collect_events(lambda: Memo.objects.create(user=self.user, title='새 메모', content='내용'))
+        memo = Memo.objects.for_user(self.user).get(title='새 메모')
+        self.assertEqual(events, [(self.user.pk, {
+            'type': 'created', 'id': memo.pk, 'title': '새 메모', 'created_at': events[0][1]['created_at'],
+        })])
+
+        memo.title = '고친 메모'
+        events = self.collect_events(memo.save)
+        self.assertEqual(events[0][1]['type'], 'updated')
+        self.assertEqual(events[0][1]['title'], '고친 메모')
+
+        memo_pk = memo.pk
+        events = self.collect_events(memo.delete)
+        self.assertEqual(events, [(self.user.pk, {'type': 'deleted', 'id': memo_pk})])
+
+
+class TestDatabaseBackend(MemoTestCase):
+    """SQLite 폴링 백엔드 테스트"""
+
+    def setUp(self):
+        """테스트 데이터 초기화"""
+        self.user = User.objects.create_user('eventuser', 'event@example.com', 'testpassword123')
+
+    def test_poll_dispatches_new_events_once(self):
+        """폴링이 새 이벤트만 한 번씩 전달하는지 테스트"""
+        backend = DatabaseBackend()
+        broker = EventBroker(backend)
+        dispatched = []
+        broker.dispatch = lambda user_id, event: dispatched.append((user_id, event))
+        backend.publish(broker, self.user.pk, {'type': 'created', 'id': 1})
+        backend.poll_once(broker)
+        self.assertEqual(dispatched, [])
+        backend.publish(broker, self.user.pk, {'type': 'deleted', 'id': 1})
+        backend.poll_once(broker)
+        backend.poll_once(broker)
+        self.assertEqual(dispatched, [(self.user.pk, {'type': 'deleted', 'id': 1})])
+        self.assertEqual(MemoEvent.objects.count(), 2)
+
+    def test_publish_prunes_without_subscribers(self):
+        """구독자가 없어도 발행할 때 보존 시간이 지난 이벤트를 지우는지 테스트"""
+        backend = DatabaseBackend()
+        broker = EventBroker(backend)
+        for index in range(5):
+            backend.publish(broker, self.user.pk, {'type': 'created', 'id': index})
+        MemoEvent.objects.update(created_at=timezone.now() - timedelta(seconds=backend.retention + 60))
+        backend._last_prune -= backend.retention + 1
+        backend.publish(broker, self.user.pk, {'type': 'created', 'id': 5})
+        self.assertFalse(broker.has_subscribers())
+        self.assertEqual(list(MemoEvent.objects.values_list('payload__id', flat=True)), [5])
+        # 보존 시간 안에는 다시 지우지 않고 INSERT만 한다
+        with self.assertNumQueries(1):
+            backend.publish(broker, self.user.pk, {'type': 'created', 'id': 6})
+
+    async def test_events_between_subscribe_and_first_poll(self):
+        """구독한 뒤 첫 폴링 전에 발행된 이벤트도 전달되는지 테스트"""
+        backend = DatabaseBackend()
+        broker = EventBroker(backend)
+        dispatched = []
+        broker.dispatch = lambda user_id, event: dispatched.append((user_id, event))
+        await sync_to_async(backend.publish)(broker, self.user.pk, {'type': 'created', 'id': 1})
+        await backend.prepare(asyncio.get_running_loop())
+        await sync_to_async(backend.publish)(broker, self.user.pk, {'type': 'deleted', 'id': 1})
+        await sync_to_async(backend.poll_once)(broker)
+        self.assertEqual(dispatched, [(self.user.pk, {'type': 'deleted', 'id': 1})])
+
+
+class TestMemoEventsView(MemoTransactionTestCase):
+    """SSE 엔드포인트 테스트"""
+
+    def setUp(self):
+        """테스트 데이터 초기화"""
+        self.user = User.objects.create_user('eventuser', 'event@example.com', 'testpassword123')
+
+    def test_requires_login(self):
+        """로그인하지 않으면 리다이렉트되는지 테스트"""
+        response = self.client.get(reverse('memo_events'))
+        self.assertEqual(response.status_code, 302)
+
+    def test_wsgi_request_gets_no_stream(self):
+        """WSGI 요청에는 스트림 대신 204를 주는지 테스트"""
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('memo_events'))
+        self.assertEqual(response.status_code, 204)
+
+    @override_settings(MEMO_EVENTS_BACKEND='memos.events.LocalBackend')
+    async def test_asgi_stream_delivers_events(self):
+        """ASGI 스트림이 같은 사용자의 메모 이벤트를 전달하는지 테스트"""
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse('memo_events'))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+        self.assertEqual(await anext(stream), b'retry: 3000\n\n')
+        next_chunk = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0)
+        memo = await sync_to_async(Memo.objects.create)(user=self.user, title='실시간', content='내용')
+        chunk = await asyncio.wait_for(next_chunk, timeout=5)
+        event_type, data = chunk.decode().strip().split('\n')
+        self.assertEqual(event_type, 'event: created')
+        self.assertEqual(json.loads(data.removeprefix('data: '))['id'], memo.pk)
+        # 클라이언트가 끊기면 ASGI 핸들러가 응답 태스크를 취소한다
+        pending = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0)
+        pending.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await pending
+        self.assertFalse(get_broker().has_subscribers())
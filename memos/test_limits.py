@@ -0,0 +1,108 @@
+"""
+메모 저장 요청 크기 제한과 내용 정리 테스트
+"""
+
+import time
+from unittest import mock
+from urllib.parse import urlencode
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.http import HttpRequest
+from django.test import Client, SimpleTestCase, override_settings
+from django.test.client import MULTIPART_CONTENT
+from django.urls import reverse
+from memos.limits import normalize_content
+from memos.models import Memo, MemoStats
+from memos.testcases import MemoTestCase
+
+
+class TestNormalizeContent(SimpleTestCase):
+    """내용 정리 테스트"""
+
+    def test_newlines_and_trailing_whitespace(self):
+        """CR/CRLF는 LF로, 줄 끝 공백과 제어 문자는 지워지고 줄 안 공백은 남는지 테스트"""
+        self.assertEqual(
+            normalize_content('제목  \r\n  들여쓰기\t\r끝\x00 a  b \n'),
+            '제목\n  들여쓰기\n끝 a  b\n',
+        )
+        # 지워지는 제어 문자 앞의 줄 끝 공백도 한 번에 지워진다
+        for content, expected in [('a \x00\nb\t\x7f\r\nc', 'a\nb\nc'), ('a \x00 \t\x01', 'a'), ('a\x00 b', 'a b')]:
+            self.assertEqual(normalize_content(content), expected)
+            self.assertEqual(normalize_content(expected), expected)
+
+    def test_linear_on_long_whitespace(self):
+        """공백만 길게 이어진 입력도 선형 시간에 정리되는지 테스트"""
+        started = time.perf_counter()
+        self.assertEqual(normalize_content(' ' * 1_000_000 + 'x'), ' ' * 1_000_000 + 'x')
+        self.assertLess(time.perf_counter() - started, 1.0)
+        started = time.perf_counter()
+        self.assertEqual(normalize_content(' \x00' * 500_000 + 'x'), ' ' * 500_000 + 'x')
+        self.assertLess(time.perf_counter() - started, 1.0)
+
+
+class TestDefaultLimits(SimpleTestCase):
+    """기본 설정 한도 사이의 관계 테스트"""
+
+    def test_max_content_fits_request_limit(self):
+        """최대 크기 한글 내용을 폼 인코딩해도 요청 한도 안에 드는지 테스트"""
+        body = urlencode({'title': 'x' * 100, 'content': '가' * (settings.MEMO_MAX_CONTENT_SIZE // 3)})
+        self.assertLessEqual(len(body), settings.MEMO_MAX_REQUEST_SIZE)
+        self.assertEqual(settings.DATA_UPLOAD_MAX_MEMORY_SIZE, settings.MEMO_MAX_REQUEST_SIZE)
+
+
+@override_settings(MEMO_MAX_CONTENT_SIZE=1000, MEMO_MAX_REQUEST_SIZE=4000, DATA_UPLOAD_MAX_MEMORY_SIZE=4000)
+class TestMemoSizeLimits(MemoTestCase):
+    """메모 저장 요청 크기 제한 테스트"""
+
+    def setUp(self):
+        """테스트 데이터 초기화"""
+        self.user = User.objects.create_user('limituser', 'limit@example.com', 'testpassword123')
+        self.client.login(username='limituser', password='testpassword123')
+
+    def test_content_over_limit_rejected_by_form(self):
+        """요청은 받을 수 있지만 내용이 한도를 넘으면 폼 오류가 나는지 테스트 (바이트 기준)"""
+        response = self.client.post(reverse('memo_create'), {'title': '큰 메모', 'content': '가' * 400})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Заметка слишком большая')
+        self.assertFalse(Memo.objects.for_user(self.user).exists())
+
+        response = self.client.post(reverse('memo_create'), {'title': '작은 메모', 'content': '가' * 300 + ' \r\n'})
+        memo = Memo.objects.for_user(self.user).get()
+        self.assertRedirects(response, reverse('memo_detail', args=[memo.pk]))
+        self.assertEqual(memo.content, '가' * 300)
+        self.assertEqual(MemoStats.objects.for_user(self.user).get().content_bytes, 900)
+
+    def test_oversized_body_rejected_before_reading(self):
+        """CSRF 검사를 켜도 Content-Length가 한도를 넘으면 본문을 읽지 않고 413인지 테스트 (두 폼 인코딩)"""
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.user)
+        client.get(reverse('memo_create'))
+        data = {'title': '메모', 'content': 'x' * 5000, 'csrfmiddlewaretoken': client.cookies['csrftoken'].value}
+        # 테스트 클라이언트는 multipart일 때 사전을 직접 인코딩한다
+        bodies = {'application/x-www-form-urlencoded': urlencode(data), MULTIPART_CONTENT: data}
+        # 폼 필드를 읽으면(CSRF 검사, 뷰) 테스트가 실패한다
+        with mock.patch.object(HttpRequest, '_load_post_and_files', side_effect=AssertionError("body was read")):
+            for content_type, body in bodies.items():
+                with self.subTest(content_type=content_type):
+                    response = client.post(reverse('memo_create'), body, content_type=content_type)
+                    self.assertEqual(response.status_code, 413)
+        self.assertFalse(Memo.objects.for_user(self.user).exists())
+
+    def test_update_limited_too(self):
+        """수정 요청에도 같은 제한이 걸리는지 테스트"""
+        memo = Memo.objects.create(user=self.user, title='메모', content='내용')
+        response = self.client.post(reverse('memo_update', args=[memo.pk]), {'title': '메모', 'content': 'x' * 5000})
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(Memo.objects.for_user(self.user).get().content, '내용')
+
+    @override_settings(MEMO_MAX_REQUEST_SIZE=100_000)
+    def test_data_upload_limit_returns_413(self):
+        """본문 한도가 더 커도 DATA_UPLOAD_MAX_MEMORY_SIZE에 걸리면 CSRF 검사의 400 대신 413인지 테스트"""
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.user)
+        client.get(reverse('memo_create'))
+        response = client.post(reverse('memo_create'), urlencode({
+            'title': '메모', 'content': 'x' * 5000, 'csrfmiddlewaretoken': client.cookies['csrftoken'].value,
+        }), content_type='application/x-www-form-urlencoded')
+        self.assertEqual(response.status_code, 413)
+        self.assertFalse(Memo.objects.for_user(self.user).exists())
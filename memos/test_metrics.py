@@ -0,0 +1,171 @@
+"""
+메트릭 레지스트리와 /metrics 엔드포인트 테스트
+"""
+
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import Client, SimpleTestCase, override_settings
+from django.urls import reverse
+from memos import metrics
+from memos.testcases import MemoTestCase
+
+
+# 요청 경로에서 메트릭 하나 갱신에 허용하는 평균 시간(초)
+METRIC_UPDATE_BUDGET_SECONDS = float(os.environ.get('METRIC_UPDATE_BUDGET_SECONDS', 5e-6))
+
+
+class TestRegistry(SimpleTestCase):
+    """카운터/히스토그램과 텍스트 형식 테스트"""
+
+    def test_render_text_format(self):
+        """레이블 이스케이프와 누적 구간, 합계/개수가 텍스트 형식에 맞는지 테스트"""
+        registry = metrics.Registry()
+        counter = registry.register(metrics.Counter('test_total', "Test counter.", ('view',)))
+        histogram = registry.register(metrics.Histogram('test_seconds', "Test histogram.", ('view',), buckets=(0.1, 1)))
+        counter.inc('a"b')
+        counter.inc('a"b', amount=2)
+        histogram.observe(0.1, 'x')
+        histogram.observe(0.5, 'x')
+        histogram.observe(3, 'x')
+        text = registry.render()
+        self.assertIn('# TYPE test_total counter\ntest_total{view="a\\"b"} 3.0\n', text)
+        self.assertIn('test_seconds_bucket{view="x",le="0.1"} 1.0\n', text)
+        self.assertIn('test_seconds_bucket{view="x",le="1.0"} 2.0\n', text)
+        self.assertIn('test_seconds_bucket{view="x",le="+Inf"} 3.0\n', text)
+        self.assertIn('test_seconds_sum{view="x"} 3.6\n', text)
+        self.assertIn('test_seconds_count{view="x"} 3.0\n', text)
+
+    def test_forked_workers_are_aggregated(self):
+        """워커 프로세스마다 쓴 파일이 수집할 때 합쳐지는지 테스트"""
+        with tempfile.TemporaryDirectory() as directory, self.settings(MEMO_METRICS_DIR=directory):
+            pid = os.fork()
+            if pid == 0:
+                # 자식은 fork할 때 값이 비워지고 자기 파일에 쓴다
+                try:
+                    for _ in range(3):
+                        metrics.requests_total.inc('fork_test', 'GET', '200')
+                    metrics.registry.flush()
+                finally:
+                    os._exit(0)
+            os.waitpid(pid, 0)
+            metrics.requests_total.inc('fork_test', 'GET', '200', amount=2)
+            values = metrics.registry.collect()['memo_http_requests_total']
+            self.assertEqual(values[('fork_test', 'GET', '200')], 5)
+            # 끝난 자식의 파일은 값을 넘겨받고 지운다 (다시 수집해도 두 번 세지 않는다)
+            self.assertEqual(os.listdir(directory), [f'{os.getpid()}-{metrics.registry._token}.json'])
+            values = metrics.registry.collect()['memo_http_requests_total']
+            self.assertEqual(values[('fork_test', 'GET', '200')], 5)
+
+    def test_concurrent_flush_uses_separate_temporary_files(self):
+        """여러 스레드가 동시에 써도 임시 파일이 겹치지 않고 결과 파일 하나만 남는지 테스트"""
+        registry = metrics.Registry()
+        registry.register(metrics.Counter('flush_total', "Flush test."))
+        with tempfile.TemporaryDirectory() as directory, self.settings(MEMO_METRICS_DIR=directory):
+            temporary_names = []
+            mkstemp = tempfile.mkstemp
+
+            def record(*args, **kwargs):
+                descriptor, name = mkstemp(*args, **kwargs)
+                temporary_names.append(name)
+                return descriptor, name
+
+            with mock.patch('memos.metrics.tempfile.mkstemp', side_effect=record):
+                threads = [threading.Thread(target=registry.flush) for _ in range(8)]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+            self.assertEqual(len(set(temporary_names)), 8)
+            self.assertEqual([path.suffix for path in Path(directory).iterdir()], ['.json'])
+
+    def test_flush_error_is_logged(self):
+        """파일을 쓰지 못해도 예외 없이 경고만 남기는지 테스트"""
+        with tempfile.TemporaryDirectory() as directory:
+            blocked = Path(directory) / 'file'
+            blocked.write_text('')
+            # 파일 아래에는 디렉터리를 만들 수 없다
+            with self.settings(MEMO_METRICS_DIR=str(blocked / 'metrics')), self.assertLogs('memos.metrics', 'WARNING'):
+                metrics.Registry().flush()
+
+    def test_update_cost(self):
+        """카운터 증가와 히스토그램 관측이 요청 경로에 쓸 만큼 싼지 테스트 (마이크로벤치마크)"""
+        counter = metrics.Counter('bench_total', "Benchmark.", ('view', 'method', 'status'))
+        histogram = metrics.Histogram('bench_seconds', "Benchmark.", ('view',))
+        rounds = 100_000
+        started = time.perf_counter()
+        for index in range(rounds):
+            counter.inc('memo_list', 'GET', '200')
+            histogram.observe(index * 1e-6, 'memo_list')
+        per_update = (time.perf_counter() - started) / (rounds * 2)
+        self.assertLess(per_update, METRIC_UPDATE_BUDGET_SECONDS)
+        self.assertEqual(counter.snapshot()[('memo_list', 'GET', '200')], rounds)
+
+
+class TestMetricsEndpoint(MemoTestCase):
+    """요청/DB/캐시/세션 메트릭과 수집 엔드포인트 테스트"""
+
+    def setUp(self):
+        """테스트 데이터 초기화"""
+        self.user = User.objects.create_user('metricuser', 'metric@example.com', 'testpassword123')
+        self.staff = User.objects.create_user('staffuser', 'staff@example.com', 'staffpassword123', is_staff=True)
+
+    def test_records_requests_by_url_name(self):
+        """URL 이름별 요청 수와 요청당 DB 쿼리 수가 기록되는지 테스트"""
+        requests_before = metrics.requests_total.snapshot().get(('memo_list', 'GET', '200'), 0)
+        queries_before = metrics.db_queries.snapshot().get(('memo_list',), [0] * 10)[-1]
+        self.client.force_login(self.user)
+        self.client.get(reverse('memo_list'))
+        self.client.get('/no-such-page/')
+        self.assertEqual(metrics.requests_total.snapshot()[('memo_list', 'GET', '200')], requests_before + 1)
+        self.assertGreater(metrics.db_queries.snapshot()[('memo_list',)][-1], queries_before)
+        self.assertIn(('<unresolved>', 'GET', '404'), metrics.requests_total.snapshot())
+
+    @override_settings(MEMO_METRICS_TOKEN='secret-token')
+    def test_endpoint_requires_staff_or_token(self):
+        """스태프 세션이나 토큰이 있어야 메트릭을 볼 수 있는지 테스트"""
+        url = reverse('metrics')
+        self.assertEqual(url, '/metrics')
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.assertEqual(self.client.get(url, headers={'Authorization': 'Bearer wrong'}).status_code, 403)
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        self.client.logout()
+        response = self.client.get(url, headers={'Authorization': 'Bearer secret-token'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], metrics.CONTENT_TYPE)
+        self.client.force_login(self.staff)
+        self.assertContains(self.client.get(url), '# TYPE memo_http_request_duration_seconds histogram')
+
+    def test_cache_and_session_metrics(self):
+        """캐시 적중/실패와 활성 세션 수가 보이는지 테스트"""
+        before = metrics.cache_requests.snapshot()
+        cache.set('metric-key', 1)
+        cache.get('metric-key')
+        cache.get_many(['metric-key', 'missing-key'])
+        after = metrics.cache_requests.snapshot()
+        self.assertEqual(after[('hit',)] - before.get(('hit',), 0), 2)
+        self.assertEqual(after[('miss',)] - before.get(('miss',), 0), 1)
+
+        metrics.active_sessions.reset()
+        self.client.force_login(self.staff)
+        self.assertContains(self.client.get(reverse('metrics')), 'memo_active_sessions 1.0')
+
+    def test_session_gauge_is_cached(self):
+        """수집할 때마다 세션 테이블을 세지 않는지 테스트"""
+        metrics.active_sessions.reset()
+        self.client.force_login(self.staff)
+        self.client.get(reverse('metrics'))
+        # 다른 브라우저에서 로그인해 세션을 하나 더 만든다
+        Client().force_login(self.user)
+        with self.assertNumQueries(0, using='default'):
+            text = metrics.registry.render()
+        self.assertIn('memo_active_sessions 1.0', text)
+        with self.settings(MEMO_METRICS_GAUGE_TTL=0):
+            self.assertIn('memo_active_sessions 2.0', metrics.registry.render())
@@ -3,15 +3,16 @@
 """
 
 import os
-from django.test import TestCase, override_settings
+from django.test import override_settings
 from django.test.client import Client
 from django.core.management import execute_from_command_line
 from django.core.management.base import BaseCommand
 from django.contrib.auth.models import User
 from memos.models import Memo
+from memos.testcases import MemoTestCase
 
 
-class SecuritySettingsTest(TestCase):
+class SecuritySettingsTest(MemoTestCase):
     """보안 설정 테스트"""
     
     def test_signup_redirect_after_registration(self):
@@ -114,4 +115,4 @@ class SecuritySettingsTest(TestCase):
         self.assertEqual(response.status_code, 404)  # 삭제 불가
         
         # 메모가 여전히 존재하는지 확인
-        self.assertTrue(Memo.objects.filter(pk=memo1.pk).exists())
\ No newline at end of file
+        self.assertTrue(Memo.objects.for_user(user1).filter(pk=memo1.pk).exists())
\ No newline at end of file
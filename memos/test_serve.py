@@ -0,0 +1,231 @@
+"""
+serve 명령(prefork 서버)과 워커 예열 테스트
+"""
+
+import http.client
+import os
+import re
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.core.servers.basehttp import get_internal_wsgi_application
+from django.template import engines
+from django.test import SimpleTestCase, override_settings
+from memos.server import PooledWSGIServer, PreforkServer, template_libraries, warm_up
+
+
+# 프로필을 바꾼 새 프로세스에서 예열한다 (INSTALLED_APPS는 기동 시 정해진다)
+WARM_UP_PROBE = """
+import django
+django.setup()
+from memos.server import warm_up
+warm_up(connect=False)
+"""
+
+
+class TestWarmUp(SimpleTestCase):
+    """워커 예열 테스트"""
+
+    def test_warm_up_compiles_project_templates(self):
+        """예열 시 프로젝트 템플릿이 캐시 로더에 컴파일되는지 테스트"""
+        timings = warm_up(connect=False)
+        self.assertEqual(set(timings), {'urls', 'templates'})
+        loader = engines['django'].engine.template_loaders[0]
+        cached_names = {key.split('-')[0] for key in loader.get_template_cache}
+        self.assertIn('memos/memo_list.html', cached_names)
+        self.assertIn('base.html', cached_names)
+
+    def test_template_libraries(self):
+        """{% load %} 태그에서 라이브러리 이름을 읽는지 테스트"""
+        source = "{% load i18n crispy_forms_tags %}{% load querystring from admin_list %}"
+        self.assertEqual(template_libraries(source), {'i18n', 'crispy_forms_tags', 'admin_list'})
+
+    def test_warm_up_under_each_profile(self):
+        """모든 실행 프로필에서 예열이 실패하지 않는지 테스트 (가벼운 프로필은 admin/crispy 템플릿을 건너뛴다)"""
+        for profile in ('web', *settings.LEAN_PROFILES):
+            with self.subTest(profile=profile):
+                result = subprocess.run(
+                    [sys.executable, '-c', WARM_UP_PROBE], cwd=settings.BASE_DIR,
+                    env={**os.environ, 'SETTINGS_PROFILE': profile}, capture_output=True, text=True,
+                )
+                self.assertEqual(result.returncode, 0, result.stderr)
+
+    @override_settings(SETTINGS_PROFILE='headless')
+    def test_serve_refuses_lean_profile(self):
+        """admin과 crispy가 없는 프로필에서는 serve가 시작하지 않는지 테스트"""
+        with self.assertRaisesMessage(CommandError, 'SETTINGS_PROFILE=headless'):
+            call_command('serve', '--bind', '127.0.0.1:0')
+
+
+class TestPooledWSGIServer(SimpleTestCase):
+    """스레드 풀 WSGI 서버 테스트"""
+
+    def test_serves_requests_from_inherited_socket(self):
+        """미리 열린 소켓으로 요청을 처리하는지 테스트"""
+        sock = socket.socket()
+        sock.bind(('127.0.0.1', 0))
+        sock.listen(8)
+        server = PooledWSGIServer(sock, get_internal_wsgi_application(), threads=2)
+        warmed = []
+        server.warm_threads(lambda: warmed.append(threading.get_ident()))
+        self.assertEqual(len(set(warmed)), 2)
+        thread = threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.1})
+        thread.start()
+        # 요청 로그가 테스트 출력(stderr)에 섞이지 않게 받아 둔다 (응답을 보낸 뒤 남으므로 서버를 닫을 때까지)
+        with self.assertLogs('django.server', 'INFO') as logs:
+            try:
+                client = http.client.HTTPConnection(*sock.getsockname(), timeout=10)
+                client.request('GET', '/accounts/login/', headers={'Host': 'localhost'})
+                self.assertEqual(client.getresponse().status, 200)
+                client.close()
+            finally:
+                server.shutdown()
+                thread.join()
+                server.server_close()
+        self.assertIn('/accounts/login/', logs.output[0])
+
+    def test_accepts_only_with_free_thread(self):
+        """모든 스레드가 바쁘면 다음 연결을 accept하지 않고 backlog에 남기는지 테스트"""
+        busy = threading.Event()
+        release = threading.Event()
+
+        def application(environ, start_response):
+            busy.set()
+            release.wait(10)
+            start_response('200 OK', [('Content-Type', 'text/plain')])
+            return [b'ok']
+
+        sock = socket.socket()
+        sock.bind(('127.0.0.1', 0))
+        sock.listen(8)
+        server = PooledWSGIServer(sock, application, threads=1)
+        accepted = []
+        get_request = server.get_request
+
+        def counting_get_request():
+            accepted.append(time.monotonic())
+            return get_request()
+
+        server.get_request = counting_get_request
+        thread = threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05})
+        thread.start()
+        clients = [http.client.HTTPConnection(*sock.getsockname(), timeout=10) for _ in range(2)]
+        with self.assertLogs('django.server', 'INFO'):
+            try:
+                clients[0].request('GET', '/', headers={'Host': 'localhost'})
+                self.assertTrue(busy.wait(10))
+                clients[1].request('GET', '/', headers={'Host': 'localhost'})
+                time.sleep(0.5)
+                self.assertEqual(len(accepted), 1)
+                release.set()
+                self.assertEqual([client.getresponse().status for client in clients], [200, 200])
+                self.assertEqual(len(accepted), 2)
+            finally:
+                release.set()
+                for client in clients:
+                    client.close()
+                server.shutdown()
+                thread.join()
+                server.server_close()
+
+
+class TestRestartBackoff(SimpleTestCase):
+    """워커 재시작 백오프 테스트"""
+
+    def test_backoff_after_failed_starts(self):
+        """기동 직후 죽는 워커는 재시작 간격이 두 배씩 늘고, 오래 돈 워커가 죽으면 초기화되는지 테스트"""
+        server = PreforkServer(load_application=None, workers=1)
+        pids = iter(range(1000, 2000))
+
+        def spawn_worker():
+            pid = next(pids)
+            server.workers[pid] = server.generation
+            server.started[pid] = time.monotonic()
+            return pid
+
+        with mock.patch.object(server, 'spawn_worker', side_effect=spawn_worker) as spawn, \
+                self.assertLogs('memos.server', 'WARNING'):
+            server.spawn_workers()
+            self.assertEqual(spawn.call_count, 1)
+            server.worker_exited(1000, 256)
+            server.spawn_workers()
+            self.assertEqual(spawn.call_count, 1)
+            self.assertAlmostEqual(server._next_spawn - time.monotonic(), 0.5, delta=0.1)
+
+            server._next_spawn = 0.0
+            server.spawn_workers()
+            server.worker_exited(1001, 256)
+            self.assertAlmostEqual(server._next_spawn - time.monotonic(), 1.0, delta=0.1)
+
+            # 다시 읽기(SIGHUP)는 백오프 중에도 새 워커를 띄운다
+            server.spawn_workers(force=True)
+            self.assertEqual(spawn.call_count, 3)
+            server.started[1002] -= 60
+            server.worker_exited(1002, 256)
+            self.assertEqual(server._failures, 0)
+
+
+@unittest.skipUnless(hasattr(os, 'fork'), "prefork 서버는 POSIX 전용")
+class TestServeCommand(SimpleTestCase):
+    """manage.py serve 통합 테스트"""
+
+    def request_status(self, address):
+        client = http.client.HTTPConnection(*address, timeout=10)
+        client.request('GET', '/accounts/login/', headers={'Host': 'localhost'})
+        status = client.getresponse().status
+        client.close()
+        return status
+
+    def start_serve(self, tmp, *arguments):
+        """serve를 띄우고 (프로세스, 수신 주소)를 돌려준다"""
+        env = {**os.environ, 'DATABASE_PATH': os.path.join(tmp, 'db.sqlite3')}
+        process = subprocess.Popen(
+            [sys.executable, 'manage.py', 'serve', '--bind', '127.0.0.1:0', *arguments],
+            cwd=settings.BASE_DIR, env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+        )
+        self.addCleanup(process.stdout.close)
+        self.addCleanup(lambda: process.poll() is None and process.kill())
+        line = process.stdout.readline()
+        match = re.search(r'http://([\d.]+):(\d+)/', line)
+        self.assertIsNotNone(match, line)
+        return process, (match.group(1), int(match.group(2)))
+
+    def test_serve_reload_and_stop(self):
+        """워커가 요청을 처리하고 SIGHUP 재시작과 SIGTERM 종료를 처리하는지 테스트"""
+        with tempfile.TemporaryDirectory() as tmp:
+            process, address = self.start_serve(tmp, '--workers', '2', '--threads', '2', '--graceful-timeout', '20')
+            self.assertEqual(self.request_status(address), 200)
+            process.send_signal(signal.SIGHUP)
+            self.assertEqual(self.request_status(address), 200)
+            started = time.monotonic()
+            process.send_signal(signal.SIGTERM)
+            self.assertEqual(process.wait(timeout=30), 0)
+            self.assertLess(time.monotonic() - started, 5)
+
+    def test_stop_after_concurrent_burst(self):
+        """동시 요청이 몰린 뒤에도 워커가 accept()에 묶이지 않고 유예 시간보다 훨씬 빨리 끝나는지 테스트"""
+        with tempfile.TemporaryDirectory() as tmp:
+            process, address = self.start_serve(tmp, '--workers', '4', '--threads', '2', '--graceful-timeout', '20')
+            statuses = []
+
+            def request():
+                statuses.append(self.request_status(address))
+
+            threads = [threading.Thread(target=request) for _ in range(100)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(statuses, [200] * 100)
+            started = time.monotonic()
+            process.send_signal(signal.SIGTERM)
+            self.assertEqual(process.wait(timeout=30), 0)
+            self.assertLess(time.monotonic() - started, 5)
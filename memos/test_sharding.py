@@ -0,0 +1,222 @@
+"""
+사용자별 메모 샤딩 테스트
+
+샤드 DB가 필요한 테스트는 MEMO_SHARDS=2 이상으로 실행한다:
+    MEMO_SHARDS=2 python manage.py test memos.test_sharding
+"""
+
+import threading
+from collections import Counter
+from io import StringIO
+from unittest import skipUnless
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from memos import sharding
+from memos.models import (
+    Folder, Memo, MemoBucket, MemoChunk, MemoSignature, MemoStats, MemoTag, ShardAssignment, Tag,
+)
+from memos.testcases import MemoTestCase, MemoTransactionTestCase
+
+
+requires_shards = skipUnless(
+    len(getattr(settings, 'MEMO_SHARD_DATABASES', [])) >= 2,
+    "MEMO_SHARDS=2 이상으로 실행해야 하는 테스트",
+)
+
+
+class TestHashRing(SimpleTestCase):
+    """일관 해시 링 테스트"""
+
+    def test_spreads_users_evenly(self):
+        """사용자가 샤드에 고르게 나뉘는지 테스트"""
+        ring = sharding.HashRing(['shard0', 'shard1', 'shard2'])
+        counts = Counter(ring.get(user_id) for user_id in range(1, 30001))
+        for shard in ('shard0', 'shard1', 'shard2'):
+            self.assertGreater(counts[shard], 8500)
+            self.assertLess(counts[shard], 11500)
+
+    def test_adding_shard_moves_only_its_share(self):
+        """샤드를 하나 더하면 약 1/N 사용자만 새 샤드로 옮겨지는지 테스트"""
+        before = sharding.HashRing(['shard0', 'shard1', 'shard2'])
+        after = sharding.HashRing(['shard0', 'shard1', 'shard2', 'shard3'])
+        moved = [user_id for user_id in range(1, 6001) if before.get(user_id) != after.get(user_id)]
+        self.assertTrue(all(after.get(user_id) == 'shard3' for user_id in moved))
+        self.assertGreater(len(moved), 6000 * 0.15)
+        self.assertLess(len(moved), 6000 * 0.35)
+
+    @override_settings(MEMO_SHARD_DATABASES=[])
+    def test_disabled_without_shards(self):
+        """샤드가 없으면 라우터가 관여하지 않고 모든 사용자가 default를 쓰는지 테스트"""
+        router = sharding.ShardRouter()
+        self.assertIsNone(router.db_for_write(Memo, instance=User(pk=1)))
+        self.assertIsNone(router.allow_migrate('default', 'memos', 'memo'))
+        self.assertEqual(sharding.shard_for_user(1), DEFAULT_DB_ALIAS)
+
+
+@requires_shards
+class TestShardedMemos(MemoTestCase):
+    """샤드에 메모 저장/조회/재배치 테스트"""
+
+    def setUp(self):
+        """테스트 데이터 초기화"""
+        self.user = User.objects.create_user('sharduser', 'shard@example.com', 'testpassword123')
+        self.client.login(username='sharduser', password='testpassword123')
+
+    def assign(self, user, shard):
+        ShardAssignment.objects.create(user=user, shard=shard)
+
+    def other_shard(self, shard):
+        return next(alias for alias in settings.MEMO_SHARD_DATABASES if alias != shard)
+
+    def create_memo(self, title='샤드 메모', content='내용', folder_name='', tag_names=''):
+        self.client.post(reverse('memo_create'), {
+            'title': title, 'content': content, 'folder_name': folder_name, 'tag_names': tag_names,
+        })
+        # self.user에 기억된 배정은 재배치 전 값일 수 있으므로 id로 다시 찾는다
+        return Memo.objects.using(sharding.shard_for_user(self.user.pk)).get(user=self.user, title=title)
+
+    def test_memo_saved_on_user_shard(self):
+        """화면에서 만든 메모와 폴더/태그/통계가 사용자 샤드에만 저장되는지 테스트"""
+        memo = self.create_memo(folder_name='일', tag_names='a, b')
+        shard = sharding.shard_for_user(self.user.pk)
+        self.assertIn(shard, settings.MEMO_SHARD_DATABASES)
+        self.assertEqual(memo._state.db, shard)
+        self.assertFalse(Memo.objects.using(DEFAULT_DB_ALIAS).exists())
+        self.assertEqual(Folder.objects.using(shard).get(user=self.user).memo_count, 1)
+        self.assertEqual(Tag.objects.using(shard).filter(user=self.user, memo_count=1).count(), 2)
+        self.assertEqual(MemoStats.objects.using(shard).get(user=self.user).memo_count, 1)
+
+        response = self.client.get(reverse('memo_list'))
+        self.assertContains(response, '샤드 메모')
+        response = self.client.get(reverse('memo_detail', args=[memo.pk]))
+        self.assertContains(response, '내용')
+
+    def test_ids_unique_across_shards(self):
+        """서로 다른 샤드의 메모도 id가 겹치지 않는지 테스트"""
+        other = User.objects.create_user('otheruser', 'other@example.com', 'otherpassword123')
+        self.assign(self.user, 'shard0')
+        self.assign(other, 'shard1')
+        first = [Memo.objects.create(user=self.user, title=f'a{index}', content='a') for index in range(3)]
+        second = [Memo.objects.create(user=other, title=f'b{index}', content='b') for index in range(3)]
+        self.assertEqual({memo._state.db for memo in first}, {'shard0'})
+        self.assertEqual({memo._state.db for memo in second}, {'shard1'})
+        self.assertFalse({memo.pk for memo in first} & {memo.pk for memo in second})
+
+    @override_settings(MEMO_CHUNK_SIZE=4)
+    def test_move_user_keeps_ids_and_counts(self):
+        """재배치 후에도 같은 id로 메모/조각/태그/폴더/통계를 그대로 읽을 수 있는지 테스트"""
+        memos = [self.create_memo(f'메모{index}', 'abcdefghij', folder_name='일', tag_names='x') for index in range(5)]
+        source = sharding.shard_for_user(self.user.pk)
+        target = self.other_shard(source)
+
+        copied = sharding.move_user(self.user.pk, target, batch_size=2)
+        self.assertEqual(copied, 5)
+        self.assertEqual(ShardAssignment.objects.get(user=self.user).shard, target)
+        self.assertFalse(Memo.objects.using(source).exists())
+        self.assertFalse(MemoChunk.objects.using(source).exists())
+        self.assertEqual(
+            sorted(Memo.objects.using(target).values_list('pk', flat=True)), sorted(memo.pk for memo in memos)
+        )
+        self.assertEqual(MemoChunk.objects.using(target).count(), 5 * 3)
+        self.assertEqual(MemoTag.objects.using(target).count(), 5)
+        self.assertEqual(MemoSignature.objects.using(target).count(), 5)
+        self.assertEqual(MemoBucket.objects.using(target).count(), 5 * 16)
+        self.assertFalse(MemoBucket.objects.using(source).exists())
+        self.assertEqual(Folder.objects.using(target).get(user=self.user).memo_count, 5)
+        self.assertEqual(MemoStats.objects.using(target).get(user=self.user).memo_count, 5)
+
+        response = self.client.get(reverse('memo_detail', args=[memos[0].pk]))
+        self.assertContains(response, 'abcd')
+        # 옮긴 뒤 새 메모도 대상 샤드에 저장된다
+        self.assertEqual(self.create_memo('새 메모')._state.db, target)
+
+    def test_writes_blocked_while_moving(self):
+        """옮기는 중에는 읽기만 되고 쓰기는 막히는지 테스트"""
+        memo = self.create_memo()
+        ShardAssignment.objects.filter(user=self.user).update(moving_to='shard1')
+        response = self.client.post(reverse('memo_create'), {'title': '새 메모', 'content': '내용'})
+        self.assertContains(response, 'Заметки переносятся')
+        response = self.client.post(reverse('memo_delete', args=[memo.pk]))
+        self.assertContains(response, 'Заметки переносятся')
+        self.assertEqual(Memo.objects.for_user(self.user).count(), 1)
+        self.assertEqual(self.client.get(reverse('memo_detail', args=[memo.pk])).status_code, 200)
+
+    def test_bulk_actions_on_shard(self):
+        """일괄 이동/삭제가 사용자 샤드에서 실행되고 카운터가 맞는지 테스트"""
+        memos = [self.create_memo(f'메모{index}', folder_name='일', tag_names='x') for index in range(3)]
+        shard = sharding.shard_for_user(self.user.pk)
+        ids = ','.join(str(memo.pk) for memo in memos)
+        self.client.post(reverse('memo_bulk'), {'action': 'move', 'memo_ids': ids, 'folder_name': '보관'})
+        self.assertEqual(Folder.objects.using(shard).get(user=self.user, name='보관').memo_count, 3)
+        self.client.post(reverse('memo_bulk'), {'action': 'delete', 'memo_ids': ids})
+        self.assertFalse(Memo.objects.using(shard).exists())
+        self.assertEqual(Tag.objects.using(shard).get(user=self.user).memo_count, 0)
+        self.assertEqual(MemoStats.objects.using(shard).get(user=self.user).memo_count, 0)
+
+    def test_user_delete_purges_shard(self):
+        """사용자를 지우면 샤드의 데이터도 지워지는지 테스트"""
+        self.create_memo(folder_name='일', tag_names='x')
+        shard = sharding.shard_for_user(self.user.pk)
+        self.user.delete()
+        for model in (Memo, MemoChunk, MemoTag, MemoSignature, MemoBucket, Folder, Tag, MemoStats):
+            self.assertFalse(model.objects.using(shard).exists(), model)
+
+    def test_rebalance_command_moves_misplaced_users(self):
+        """해시 링과 다른 샤드에 있는 사용자만 옮기는지 테스트"""
+        ring_shard = sharding.get_ring().get(self.user.pk)
+        self.assign(self.user, self.other_shard(ring_shard))
+        self.create_memo()
+
+        out = StringIO()
+        call_command('rebalance_shards', '--dry-run', stdout=out)
+        self.assertIn('1 user(s) to move', out.getvalue())
+        self.assertNotEqual(ShardAssignment.objects.get(user=self.user).shard, ring_shard)
+
+        call_command('rebalance_shards', '--grace', '0', stdout=StringIO())
+        self.assertEqual(ShardAssignment.objects.get(user=self.user).shard, ring_shard)
+        self.assertEqual(Memo.objects.using(ring_shard).filter(user=self.user).count(), 1)
+
+    def test_rebalance_adopts_default_data(self):
+        """샤딩 전 default에 있던 데이터를 샤드로 옮기는지 테스트"""
+        # 샤딩을 켜기 전에 저장된 것처럼 라우터를 거치지 않고 default에 넣는다
+        Memo.objects.using(DEFAULT_DB_ALIAS).create(user_id=self.user.pk, title='옛 메모', content='내용')
+        self.assertEqual(sharding.shard_for_user(self.user.pk), DEFAULT_DB_ALIAS)
+        self.assertContains(self.client.get(reverse('memo_list')), '옛 메모')
+
+        call_command('rebalance_shards', '--grace', '0', stdout=StringIO())
+        shard = sharding.get_assignment(self.user.pk).shard
+        self.assertIn(shard, settings.MEMO_SHARD_DATABASES)
+        self.assertFalse(Memo.objects.using(DEFAULT_DB_ALIAS).exists())
+        self.assertContains(self.client.get(reverse('memo_list')), '옛 메모')
+
+
+@requires_shards
+class TestCrossShardQueries(MemoTransactionTestCase):
+    """여러 샤드에 걸친 병렬 조회 테스트 (다른 스레드가 커밋된 데이터를 읽어야 함)"""
+
+    def test_run_on_shards_uses_threads(self):
+        """샤드마다 다른 스레드에서 실행되는지 테스트"""
+        results = sharding.run_on_shards(lambda alias: threading.get_ident(), settings.MEMO_SHARD_DATABASES)
+        self.assertEqual(list(results), settings.MEMO_SHARD_DATABASES)
+        self.assertNotIn(threading.get_ident(), results.values())
+
+    def test_admin_finds_memos_on_any_shard(self):
+        """관리자 화면이 샤드별 목록과 샤드 개수를 보여주고, 어느 샤드의 메모든 열 수 있는지 테스트"""
+        admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'adminpassword123')
+        owner = User.objects.create_user('owner', 'owner@example.com', 'ownerpassword123')
+        ShardAssignment.objects.create(user=owner, shard='shard1')
+        memo = Memo.objects.create(user=owner, title='둘째 샤드 메모', content='내용')
+        self.client.force_login(admin_user)
+
+        response = self.client.get(reverse('admin:memos_memo_changelist'))
+        self.assertNotContains(response, '둘째 샤드 메모')
+        self.assertContains(response, 'shard1 (1)')
+        response = self.client.get(reverse('admin:memos_memo_changelist'), {'shard': 'shard1'})
+        self.assertContains(response, '둘째 샤드 메모')
+        self.assertContains(response, 'owner')
+        response = self.client.get(reverse('admin:memos_memo_change', args=[memo.pk]))
+        self.assertContains(response, '둘째 샤드 메모')
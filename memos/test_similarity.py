@@ -0,0 +1,158 @@
+"""
+유사 메모(MinHash/LSH) 테스트
+"""
+
+import random
+from io import StringIO
+from unittest import skipIf
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db.models import Q
+from django.test import SimpleTestCase
+from django.urls import reverse
+from memos import similarity
+from memos.models import Memo, MemoBucket, MemoSignature
+from memos.testcases import MemoTestCase
+
+
+WORDS = [f'слово{index}' for index in range(500)]
+
+
+def make_text(seed, length=200):
+    generator = random.Random(seed)
+    return ' '.join(generator.choice(WORDS) for _ in range(length))
+
+
+def edit_words(text, count, seed=0):
+    # 단어 몇 개만 바꾼 거의 같은 글
+    generator = random.Random(seed)
+    words = text.split()
+    for index in generator.sample(range(len(words)), count):
+        words[index] = 'изменено'
+    return ' '.join(words)
+
+
+class TestSignatures(SimpleTestCase):
+    """MinHash 서명 계산 테스트"""
+
+    def test_similarity_estimates(self):
+        """같은 글은 1, 조금 고친 글은 높게, 다른 글은 낮게 추정되는지 테스트"""
+        text = make_text(1)
+        signature = similarity.compute_signature(text)
+        self.assertEqual(similarity.compute_signature(text), signature)
+        self.assertEqual(len(similarity.encode_signature(signature)), 256)
+        self.assertEqual(similarity.decode_signature(similarity.encode_signature(signature)), signature)
+        near = similarity.compute_signature(edit_words(text, 3))
+        self.assertGreaterEqual(similarity.estimate_similarity(signature, near), 0.75)
+        other = similarity.compute_signature(make_text(2))
+        self.assertLess(similarity.estimate_similarity(signature, other), 0.2)
+
+    def test_short_and_empty_text(self):
+        """짧은 글도 빈 칸 없이 서명이 만들어지고, 단어가 없으면 서명이 없는지 테스트"""
+        signature = similarity.compute_signature('коротко')
+        self.assertNotIn(similarity.EMPTY, signature)
+        self.assertNotEqual(similarity.compute_signature('другое'), signature)
+        self.assertIsNone(similarity.compute_signature(' \n ... '))
+
+    def test_batch_matches_single(self):
+        """배치 계산 결과가 하나씩 계산한 결과와 같은지 테스트"""
+        texts = [make_text(seed, length=seed * 7) for seed in range(6)]
+        self.assertEqual(
+            similarity.compute_signatures(texts), [similarity.compute_signature(text) for text in texts],
+        )
+
+    @skipIf(similarity.np is None, "numpy가 설치되어 있을 때만 실행")
+    def test_numpy_matches_python(self):
+        """numpy 경로와 파이썬 경로의 서명이 같은지 테스트"""
+        texts = [make_text(seed) for seed in range(5)]
+        vectorized = similarity.compute_signatures(texts)
+        numpy = similarity.np
+        try:
+            similarity.np = None
+            self.assertEqual(similarity.compute_signatures(texts), vectorized)
+        finally:
+            similarity.np = numpy
+
+
+class TestSimilarMemos(MemoTestCase):
+    """유사 메모 색인과 화면 테스트"""
+
+    def setUp(self):
+        """테스트 데이터 초기화"""
+        self.user = User.objects.create_user('simuser', 'sim@example.com', 'testpassword123')
+        self.other = User.objects.create_user('otheruser', 'other@example.com', 'otherpassword123')
+        self.client.login(username='simuser', password='testpassword123')
+        self.text = make_text(1)
+
+    def test_index_follows_memo_changes(self):
+        """저장하면 서명과 밴드 버킷이 생기고, 수정/삭제를 따라가는지 테스트"""
+        using = self.shard_of(self.user)
+        memo = Memo.objects.create(user=self.user, title='로그', content=self.text)
+        signature = MemoSignature.objects.using(using).get(memo=memo).signature
+        self.assertEqual(MemoBucket.objects.using(using).filter(memo=memo, user=self.user).count(), similarity.BANDS)
+
+        memo.content = make_text(3)
+        memo.save()
+        self.assertNotEqual(bytes(MemoSignature.objects.using(using).get(memo=memo).signature), bytes(signature))
+
+        memo.delete()
+        self.assertFalse(MemoSignature.objects.using(using).exists())
+        self.assertFalse(MemoBucket.objects.using(using).exists())
+
+    def test_detail_shows_similar_memos_of_owner_only(self):
+        """상세 화면에 자기 메모 중 비슷한 메모만 보이는지 테스트"""
+        memo = Memo.objects.create(user=self.user, title='원본', content=self.text)
+        Memo.objects.create(user=self.user, title='사본', content=edit_words(self.text, 2))
+        Memo.objects.create(user=self.user, title='무관', content=make_text(2))
+        Memo.objects.create(user=self.other, title='남의 사본', content=self.text)
+
+        response = self.client.get(reverse('memo_detail', args=[memo.pk]))
+        self.assertContains(response, 'Похожие заметки')
+        self.assertContains(response, '사본')
+        self.assertNotContains(response, '무관')
+        self.assertNotContains(response, '남의 사본')
+
+    def test_lookup_cost_independent_of_memo_count(self):
+        """메모 수와 상관없이 같은 쿼리 수로 찾고, 버킷 조회가 인덱스를 쓰는지 테스트"""
+        memo = Memo.objects.create(user=self.user, title='원본', content=self.text)
+        Memo.objects.create(user=self.user, title='사본', content=self.text)
+        for seed in range(10, 40):
+            Memo.objects.create(user=self.user, title=f'무관{seed}', content=make_text(seed, length=50))
+        using = self.shard_of(self.user)
+        with self.assertNumQueries(3, using=using):
+            results = similarity.similar_memos(memo, using=using)
+        self.assertEqual([item['title'] for item in results], ['사본'])
+        self.assertEqual(results[0]['similarity'], 1.0)
+
+        lookup = Q()
+        for band, bucket in similarity.band_keys(similarity.compute_signature(self.text)):
+            lookup |= Q(user_id=self.user.pk, band=band, bucket=bucket)
+        self.assertIn('memos_memobucket_lookup_idx', MemoBucket.objects.using(using).filter(lookup).explain())
+
+    def test_backfill_and_dedupe_report(self):
+        """backfill이 서명 없는 메모를 채우고, 보고서가 거의 같은 메모를 묶는지 테스트"""
+        # bulk_create는 시그널을 보내지 않으므로 서명이 없다
+        Memo.objects.using(self.shard_of(self.user)).bulk_create([
+            Memo(user=self.user, title='로그 1', content=self.text),
+            Memo(user=self.user, title='로그 2', content=edit_words(self.text, 1)),
+            Memo(user=self.user, title='로그 3', content=self.text),
+            Memo(user=self.user, title='다른 글', content=make_text(2)),
+        ])
+        Memo.objects.using(self.shard_of(self.other)).bulk_create([
+            Memo(user=self.other, title='남의 글', content=self.text),
+        ])
+        aliases = {self.shard_of(self.user), self.shard_of(self.other)}
+        self.assertFalse(any(MemoSignature.objects.using(using).exists() for using in aliases))
+
+        out = StringIO()
+        call_command('backfill_memo_signatures', '--batch-size', '2', stdout=out)
+        self.assertIn('5 memo(s) indexed', out.getvalue())
+        self.assertEqual(sum(MemoSignature.objects.using(using).count() for using in aliases), 5)
+        call_command('backfill_memo_signatures', stdout=out)
+        self.assertIn('0 memo(s) indexed', out.getvalue())
+
+        out = StringIO()
+        call_command('dedupe_report', '--user', 'simuser', stdout=out)
+        ids = sorted(Memo.objects.for_user(self.user).filter(title__startswith='로그').values_list('pk', flat=True))
+        self.assertIn(f"{', '.join(map(str, ids))}: 로그 1", out.getvalue())
+        self.assertIn('1 group(s) of near-duplicate memos, 2 memo(s) could be removed.', out.getvalue())
@@ -0,0 +1,44 @@
+"""
+기동 시간 예산 및 실행 프로필 테스트
+"""
+
+import os
+from django.test import SimpleTestCase
+from memos.startup import measure_startup, parse_importtime, summarize_packages
+
+
+# 설정 import + django.setup()에 허용하는 시간(초). 느린 CI에서는 환경 변수로 늘린다.
+STARTUP_BUDGET_SECONDS = float(os.environ.get('STARTUP_BUDGET_SECONDS', 1.5))
+
+
+class TestStartupProfile(SimpleTestCase):
+    """기동 프로파일링 테스트"""
+
+    def test_parse_importtime(self):
+        """-X importtime 출력 파싱 테스트"""
+        output = "\n".join([
+            "import time: self [us] | cumulative | imported package",
+            "import time:       100 |        100 |   django.utils",
+            "import time:       250 |        350 | django",
+        ])
+        rows = parse_importtime(output)
+        self.assertEqual(rows, [('django.utils', 0.0001, 0.0001, 1), ('django', 0.00025, 0.00035, 0)])
+        self.assertEqual(summarize_packages(rows)[0][0], 'django')
+
+    def test_lean_profile_skips_admin_and_crispy(self):
+        """command 프로필이 admin과 crispy를 읽지 않는지 테스트"""
+        report = measure_startup('command', importtime=False)
+        self.assertNotIn('django.contrib.admin', report['installed_apps'])
+        self.assertNotIn('crispy_forms', report['installed_apps'])
+        self.assertNotIn('django.contrib.admin', report['modules'])
+        self.assertNotIn('crispy_forms', report['modules'])
+        self.assertIn('memos', report['installed_apps'])
+
+    def test_startup_within_budget(self):
+        """전체(web) 프로필의 기동 시간이 예산 안에 드는지 테스트"""
+        # 디스크 캐시 영향을 줄이기 위해 두 번 재서 빠른 쪽을 쓴다
+        elapsed = min(
+            report['settings'] + report['setup']
+            for report in (measure_startup('web', importtime=False) for _ in range(2))
+        )
+        self.assertLess(elapsed, STARTUP_BUDGET_SECONDS)
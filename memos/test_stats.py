@@ -0,0 +1,141 @@
+"""
+사용자별 메모 통계 테스트
+"""
+
+from io import StringIO
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from django.contrib.auth.models import User
+from memos import stats
+from memos.models import Folder, Memo, MemoStats, ShardAssignment
+from memos.testcases import MemoTestCase
+
+
+class TestMemoStats(MemoTestCase):
+    """메모 통계 증분 갱신 및 할당량 테스트"""
+
+    def setUp(self):
+        """테스트 데이터 초기화"""
+        self.user = User.objects.create_user('statsuser', 'stats@example.com', 'testpassword123')
+        self.other_user = User.objects.create_user('otheruser', 'other@example.com', 'otherpassword123')
+
+    def get_stats(self, user=None):
+        return MemoStats.objects.for_user(user or self.user).get()
+
+    def test_stats_follow_create_update_delete(self):
+        """생성/수정/삭제 시 통계가 갱신되는지 테스트"""
+        first = Memo.objects.create(user=self.user, title='첫 메모', content='가나다')
+        second = Memo.objects.create(user=self.user, title='둘째 메모', content='abc')
+        stats = self.get_stats()
+        self.assertEqual(stats.memo_count, 2)
+        self.assertEqual(stats.content_bytes, 9 + 3)
+        self.assertEqual(stats.last_created_at, second.created_at)
+
+        first.content = 'ab'
+        first.save()
+        stats = self.get_stats()
+        self.assertEqual(stats.content_bytes, 2 + 3)
+        self.assertEqual(stats.last_updated_at, first.updated_at)
+
+        second.delete()
+        stats = self.get_stats()
+        self.assertEqual((stats.memo_count, stats.content_bytes), (1, 2))
+        self.assertEqual(stats.last_created_at, first.created_at)
+
+    def test_owner_change_moves_stats(self):
+        """관리자가 메모 소유자를 바꾸면 두 사용자 통계가 모두 갱신되는지 테스트"""
+        # 샤딩을 켜면 소유자는 같은 샤드의 사용자로만 바꿀 수 있다 (다른 샤드는 rebalance_shards)
+        ShardAssignment.objects.create(user=self.other_user, shard=self.shard_of(self.user))
+        memo = Memo.objects.create(user=self.user, title='메모', content='abcd')
+        memo.user = self.other_user
+        memo.save()
+        self.assertEqual((self.get_stats().memo_count, self.get_stats().content_bytes), (0, 0))
+        self.assertEqual(self.get_stats(self.other_user).content_bytes, 4)
+
+    def test_user_delete_cascades_cleanly(self):
+        """사용자 삭제 시 통계 행이 다시 만들어지지 않는지 테스트"""
+        Memo.objects.create(user=self.user, title='메모', content='abcd')
+        using = self.shard_of(self.user)
+        self.user.delete()
+        self.assertFalse(MemoStats.objects.using(using).exists())
+
+    def test_views_update_stats(self):
+        """뷰를 통한 생성/삭제가 통계에 반영되는지 테스트"""
+        self.client.login(username='statsuser', password='testpassword123')
+        self.client.post(reverse('memo_create'), {'title': '뷰 메모', 'content': 'hello'})
+        self.assertEqual(self.get_stats().memo_count, 1)
+        response = self.client.get(reverse('memo_list'))
+        self.assertContains(response, 'Всего: 1')
+        memo = Memo.objects.for_user(self.user).get(title='뷰 메모')
+        self.client.post(reverse('memo_delete', args=[memo.pk]))
+        self.assertEqual(self.get_stats().memo_count, 0)
+
+    @override_settings(MEMO_QUOTA_MAX_COUNT=1)
+    def test_count_quota_enforced(self):
+        """메모 개수 할당량 초과 시 생성이 거부되는지 테스트"""
+        self.client.login(username='statsuser', password='testpassword123')
+        self.client.post(reverse('memo_create'), {'title': '첫 메모', 'content': '내용'})
+        response = self.client.post(reverse('memo_create'), {'title': '둘째 메모', 'content': '내용'})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Memo.objects.for_user(self.user).filter(title='둘째 메모').exists())
+
+    @override_settings(MEMO_QUOTA_MAX_BYTES=10)
+    def test_bytes_quota_enforced_on_update(self):
+        """용량 할당량 초과 시 수정이 거부되는지 테스트"""
+        memo = Memo.objects.create(user=self.user, title='메모', content='abc')
+        self.client.login(username='statsuser', password='testpassword123')
+        response = self.client.post(reverse('memo_update', args=[memo.pk]), {'title': '메모', 'content': 'a' * 20})
+        self.assertEqual(response.status_code, 200)
+        memo.refresh_from_db()
+        self.assertEqual(memo.content, 'abc')
+        response = self.client.post(reverse('memo_update', args=[memo.pk]), {'title': '메모', 'content': 'a' * 10})
+        self.assertEqual(response.status_code, 302)
+        # 예약한 변화량을 시그널이 다시 더하지 않는다
+        self.assertEqual(self.get_stats().content_bytes, 10)
+
+    @override_settings(MEMO_QUOTA_MAX_COUNT=1)
+    def test_quota_reserves_slot_for_new_user(self):
+        """통계 행이 없는 사용자도 검사할 때 자리를 예약해서 두 번째 검사가 거부되는지 테스트"""
+        using = self.shard_of(self.user)
+        self.assertTrue(stats.check_quota(self.user, count=1, size=3, using=using))
+        self.assertEqual((self.get_stats().memo_count, self.get_stats().content_bytes), (1, 3))
+        # 첫 요청이 아직 메모를 저장하지 않았어도 다른 요청은 한도를 넘을 수 없다
+        with self.assertRaises(ValidationError):
+            stats.check_quota(self.user, count=1, size=3, using=using)
+        self.assertEqual(self.get_stats().memo_count, 1)
+
+    @override_settings(MEMO_QUOTA_MAX_COUNT=2)
+    def test_view_create_counts_reserved_memo_once(self):
+        """할당량을 켜고 뷰로 만든 메모가 통계에 한 번만 더해지는지 테스트"""
+        self.client.login(username='statsuser', password='testpassword123')
+        self.client.post(reverse('memo_create'), {'title': '뷰 메모', 'content': 'hello'})
+        stats_row = self.get_stats()
+        self.assertEqual((stats_row.memo_count, stats_row.content_bytes), (1, 5))
+        self.assertIsNotNone(stats_row.last_created_at)
+
+    def test_drifted_stats_do_not_go_negative(self):
+        """통계가 어긋나 있어도 삭제가 실패하지 않고 0에서 멈추는지 테스트"""
+        folder = Folder.objects.create(user=self.user, name='폴더')
+        memo = Memo.objects.create(user=self.user, title='메모', content='abc', folder=folder)
+        MemoStats.objects.for_user(self.user).update(memo_count=0, content_bytes=0)
+        Folder.objects.for_user(self.user).update(memo_count=0)
+        memo.delete()
+        self.assertEqual((self.get_stats().memo_count, self.get_stats().content_bytes), (0, 0))
+        self.assertEqual(Folder.objects.for_user(self.user).get().memo_count, 0)
+
+    def test_recompute_command_repairs_drift(self):
+        """recompute_memo_stats 명령이 어긋난 통계를 복구하는지 테스트"""
+        Memo.objects.create(user=self.user, title='메모', content='abc')
+        MemoStats.objects.for_user(self.user).update(memo_count=42, content_bytes=0)
+        out = StringIO()
+        call_command('recompute_memo_stats', '--dry-run', stdout=out)
+        self.assertIn('1 drifted', out.getvalue())
+        self.assertEqual(self.get_stats().memo_count, 42)
+        call_command('recompute_memo_stats', stdout=StringIO())
+        stats = self.get_stats()
+        self.assertEqual((stats.memo_count, stats.content_bytes), (1, 3))
+        out = StringIO()
+        call_command('recompute_memo_stats', '--dry-run', stdout=out)
+        self.assertIn('0 drifted', out.getvalue())
@@ -0,0 +1,143 @@
+"""
+태그와 폴더 테스트
+"""
+
+from django.db import connections
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.contrib.auth.models import User
+from memos.forms import MemoForm
+from memos.models import Folder, Memo, MemoTag, Tag
+from memos.testcases import MemoTestCase
+
+
+class TestTagsAndFolders(MemoTestCase):
+    """태그/폴더 저장, 필터, 카운트 테스트"""
+
+    def setUp(self):
+        """테스트 데이터 초기화"""
+        self.user = User.objects.create_user('taguser', 'tag@example.com', 'testpassword123')
+        self.other_user = User.objects.create_user('otheruser', 'other@example.com', 'otherpassword123')
+        self.work = Tag.objects.create(user=self.user, name='work')
+        self.home = Tag.objects.create(user=self.user, name='home')
+        self.folder = Folder.objects.create(user=self.user, name='Проекты')
+        self.memo = Memo.objects.create(user=self.user, title='태그 메모', content='내용', folder=self.folder)
+        self.memo.tags.add(self.work)
+
+    def refresh_counts(self):
+        for obj in (self.work, self.home, self.folder):
+            obj.refresh_from_db()
+
+    def test_memotag_uses_compound_primary_key(self):
+        """메모-태그 연결 테이블이 복합 기본 키를 사용하는지 테스트"""
+        self.assertEqual([field.name for field in MemoTag._meta.pk_fields], ['memo', 'tag'])
+        link = MemoTag.objects.using(self.shard_of(self.user)).get(memo=self.memo, tag=self.work)
+        self.assertEqual(link.pk, (self.memo.pk, self.work.pk))
+
+    def test_tag_counts_follow_add_remove_and_clear(self):
+        """태그 추가/제거/초기화 시 메모 수가 증분 갱신되는지 테스트"""
+        self.refresh_counts()
+        self.assertEqual(self.work.memo_count, 1)
+        self.memo.tags.add(self.home, self.work)
+        self.refresh_counts()
+        self.assertEqual((self.work.memo_count, self.home.memo_count), (1, 1))
+        self.memo.tags.remove(self.work)
+        self.memo.tags.remove(self.work)
+        self.refresh_counts()
+        self.assertEqual((self.work.memo_count, self.home.memo_count), (0, 1))
+        self.home.memos.clear()
+        self.refresh_counts()
+        self.assertEqual(self.home.memo_count, 0)
+
+    def test_counts_follow_memo_delete_and_folder_move(self):
+        """메모 이동/삭제 시 폴더와 태그 카운트가 갱신되는지 테스트"""
+        other_folder = Folder.objects.create(user=self.user, name='Архив')
+        self.memo.folder = other_folder
+        self.memo.save()
+        self.refresh_counts()
+        other_folder.refresh_from_db()
+        self.assertEqual((self.folder.memo_count, other_folder.memo_count), (0, 1))
+        self.memo.delete()
+        self.refresh_counts()
+        other_folder.refresh_from_db()
+        self.assertEqual((self.work.memo_count, other_folder.memo_count), (0, 0))
+
+    def test_form_creates_folder_and_tags(self):
+        """폼이 폴더와 태그를 이름으로 만들고 연결하는지 테스트"""
+        form = MemoForm(data={
+            'title': '새 메모',
+            'content': '내용',
+            'folder_name': 'Входящие',
+            'tag_names': 'work, new , work,',
+        }, user=self.user)
+        self.assertTrue(form.is_valid())
+        memo = form.save(commit=False)
+        memo.user = self.user
+        memo.save()
+        form.save_m2m()
+        self.assertEqual(memo.folder.name, 'Входящие')
+        self.assertEqual(sorted(memo.tags.values_list('name', flat=True)), ['new', 'work'])
+        self.refresh_counts()
+        self.assertEqual(self.work.memo_count, 2)
+
+    def test_update_form_shows_existing_values(self):
+        """수정 폼이 기존 폴더와 태그를 보여주는지 테스트"""
+        form = MemoForm(instance=self.memo, user=self.user)
+        self.assertEqual(form.fields['folder_name'].initial, 'Проекты')
+        self.assertEqual(form.fields['tag_names'].initial, 'work')
+
+    def test_list_filters_by_tag_and_folder(self):
+        """메모 목록이 태그와 폴더로 필터링되는지 테스트"""
+        Memo.objects.create(user=self.user, title='태그 없는 메모', content='내용')
+        self.client.login(username='taguser', password='testpassword123')
+        response = self.client.get(reverse('memo_list'), {'tag': self.work.pk})
+        self.assertContains(response, '태그 메모')
+        self.assertNotContains(response, '태그 없는 메모')
+        response = self.client.get(reverse('memo_list'), {'folder': self.folder.pk})
+        self.assertContains(response, '태그 메모')
+        self.assertNotContains(response, '태그 없는 메모')
+
+    def test_list_filter_ignores_other_users_tags(self):
+        """다른 사용자의 태그로는 메모가 보이지 않는지 테스트"""
+        self.client.login(username='otheruser', password='otherpassword123')
+        response = self.client.get(reverse('memo_list'), {'tag': self.work.pk})
+        self.assertNotContains(response, '태그 메모')
+        self.assertNotContains(response, '#work')
+
+    def test_tag_filter_uses_index(self):
+        """태그 필터 쿼리가 테이블 전체를 훑지 않고 인덱스로만 조인하는지 테스트"""
+        queryset = Memo.objects.for_user(self.user).filter(tags__id=self.work.pk).order_by('-created_at')
+        with connections[queryset.db].cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + str(queryset.query))
+            plan = ' '.join(str(row[-1]) for row in cursor.fetchall())
+        self.assertNotIn('SCAN memos_', plan)
+        self.assertIn('INDEX', plan)
+
+    @override_settings(MEMO_LIST_PAGE_SIZE=5)
+    def test_filtered_list_is_paged(self):
+        """태그 필터 목록이 한 페이지 크기만큼만 읽고 커서로 다음 페이지를 이어 가는지 테스트"""
+        for index in range(12):
+            memo = Memo.objects.create(user=self.user, title=f'페이지 메모 {index}', content='내용')
+            if index % 2:
+                memo.tags.add(self.work)
+        # 같은 시각에 만든 메모도 빠지거나 겹치지 않아야 한다
+        Memo.objects.for_user(self.user).filter(title__startswith='페이지').update(created_at=timezone.now())
+        self.client.login(username='taguser', password='testpassword123')
+        seen = []
+        url = reverse('memo_list') + f'?tag={self.work.pk}'
+        with CaptureQueriesContext(connections[self.shard_of(self.user)]) as queries:
+            response = self.client.get(url)
+        page_queries = [query['sql'] for query in queries if 'ORDER BY "memos_memo"."created_at" DESC' in query['sql']]
+        self.assertEqual(len(page_queries), 1)
+        self.assertIn('LIMIT 6', page_queries[0])
+        while url:
+            response = self.client.get(url)
+            self.assertLessEqual(len(response.context['memos']), 5)
+            seen += [memo.pk for memo in response.context['memos']]
+            url = response.context['next_page_url']
+        tagged = Memo.objects.for_user(self.user).filter(tags=self.work).order_by('-created_at', '-pk')
+        self.assertEqual(seen, [memo.pk for memo in tagged])
+        self.assertEqual(len(seen), 7)
+        self.assertContains(response, '← В начало')
@@ -0,0 +1,28 @@
+"""
+memos 테스트 공통 기반 클래스
+
+MEMO_SHARDS를 켜고 실행해도 같은 테스트가 돌도록 모든 DB(샤드 포함)를 연다:
+    MEMO_SHARDS=2 python manage.py test memos
+"""
+
+from django.test import TestCase, TransactionTestCase
+from .sharding import shard_for_user
+
+
+class ShardAwareMixin:
+    databases = '__all__'
+
+    def shard_of(self, user):
+        """사용자 데이터가 있는 DB 별칭 (샤딩을 끄면 default).
+
+        for_user()가 없는 모델(조각, 서명, 태그 연결)은 .using(self.shard_of(user))로 조회한다.
+        """
+        return shard_for_user(user)
+
+
+class MemoTestCase(ShardAwareMixin, TestCase):
+    """메모 테스트 기반 클래스"""
+
+
+class MemoTransactionTestCase(ShardAwareMixin, TransactionTestCase):
+    """다른 스레드가 커밋된 데이터를 읽어야 하는 메모 테스트 기반 클래스"""
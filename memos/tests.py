@@ -1,12 +1,12 @@
-from django.test import TestCase
 from django.urls import reverse
 from django.contrib.auth.models import User
 from django.utils import timezone
 from .models import Memo
 from .forms import SignUpForm, MemoForm
+from .testcases import MemoTestCase
 
 
-class TestMemoModel(TestCase):
+class TestMemoModel(MemoTestCase):
     """메모 모델 테스트"""
     
     def setUp(self):
@@ -49,7 +49,7 @@ class TestMemoModel(TestCase):
         self.assertIn(memo, self.user.memos.all())
 
 
-class TestSignUpForm(TestCase):
+class TestSignUpForm(MemoTestCase):
     """회원가입 폼 테스트"""
     
     def test_valid_form(self):
@@ -85,7 +85,7 @@ class TestSignUpForm(TestCase):
         self.assertFalse(form.is_valid())
 
 
-class TestMemoForm(TestCase):
+class TestMemoForm(MemoTestCase):
     """메모 폼 테스트"""
     
     def test_valid_memo_form(self):
@@ -116,7 +116,7 @@ class TestMemoForm(TestCase):
         self.assertFalse(form.is_valid())
 
 
-class TestAuthViews(TestCase):
+class TestAuthViews(MemoTestCase):
     """인증 관련 뷰 테스트"""
     
     def test_signup_get(self):
@@ -168,7 +168,7 @@ class TestAuthViews(TestCase):
         self.assertNotIn('_auth_user_id', self.client.session)
 
 
-class TestMemoViews(TestCase):
+class TestMemoViews(MemoTestCase):
     """메모 관련 뷰 테스트"""
     
     def setUp(self):
@@ -246,8 +246,8 @@ class TestMemoViews(TestCase):
             'content': '새 메모 내용입니다.'
         })
         self.assertEqual(response.status_code, 302)
-        self.assertTrue(Memo.objects.filter(title='새 메모').exists())
-        new_memo = Memo.objects.get(title='새 메모')
+        self.assertTrue(Memo.objects.for_user(self.user).filter(title='새 메모').exists())
+        new_memo = Memo.objects.for_user(self.user).get(title='새 메모')
         self.assertEqual(new_memo.user, self.user)
     
     def test_memo_create_post_invalid(self):
@@ -258,7 +258,7 @@ class TestMemoViews(TestCase):
             'content': '내용만 있는 메모'
         })
         self.assertEqual(response.status_code, 200)
-        self.assertFalse(Memo.objects.filter(content='내용만 있는 메모').exists())
+        self.assertFalse(Memo.objects.for_user(self.user).filter(content='내용만 있는 메모').exists())
     
     def test_memo_update_get(self):
         """메모 수정 페이지 GET 요청 테스트"""
@@ -276,7 +276,7 @@ class TestMemoViews(TestCase):
             'content': '수정된 내용입니다.'
         })
         self.assertEqual(response.status_code, 302)
-        updated_memo = Memo.objects.get(pk=self.memo.pk)
+        updated_memo = Memo.objects.for_user(self.user).get(pk=self.memo.pk)
         self.assertEqual(updated_memo.title, '수정된 메모')
         self.assertEqual(updated_memo.content, '수정된 내용입니다.')
     
@@ -298,7 +298,7 @@ class TestMemoViews(TestCase):
         self.client.login(username='testuser', password='testpassword123')
         response = self.client.post(reverse('memo_delete', args=[self.memo.pk]))
         self.assertEqual(response.status_code, 302)
-        self.assertFalse(Memo.objects.filter(pk=self.memo.pk).exists())
+        self.assertFalse(Memo.objects.for_user(self.user).filter(pk=self.memo.pk).exists())
     
     def test_memo_delete_wrong_user(self):
         """다른 사용자의 메모 삭제 시도 테스트"""
@@ -307,7 +307,7 @@ class TestMemoViews(TestCase):
         self.assertEqual(response.status_code, 404)
 
 
-class TestUrlPatterns(TestCase):
+class TestUrlPatterns(MemoTestCase):
     """URL 라우팅 테스트"""
     
     def test_signup_url(self):
@@ -341,7 +341,7 @@ class TestUrlPatterns(TestCase):
         self.assertEqual(url, '/memo/1/delete/')
 
 
-class TestIntegrationWorkflows(TestCase):
+class TestIntegrationWorkflows(MemoTestCase):
     """통합 워크플로우 테스트"""
     
     def test_complete_memo_workflow(self):
@@ -360,7 +360,7 @@ class TestIntegrationWorkflows(TestCase):
             'content': '워크플로우 테스트 내용'
         })
         self.assertEqual(create_response.status_code, 302)
-        memo = Memo.objects.get(title='워크플로우 테스트')
+        memo = Memo.objects.for_user(user).get(title='워크플로우 테스트')
         
         # 3. 메모 목록에서 확인
         list_response = self.client.get(reverse('memo_list'))
@@ -380,13 +380,13 @@ class TestIntegrationWorkflows(TestCase):
         self.assertEqual(update_response.status_code, 302)
         
         # 6. 수정된 내용 확인
-        updated_memo = Memo.objects.get(pk=memo.pk)
+        updated_memo = Memo.objects.for_user(user).get(pk=memo.pk)
         self.assertEqual(updated_memo.title, '수정된 워크플로우 테스트')
         
         # 7. 메모 삭제
         delete_response = self.client.post(reverse('memo_delete', args=[memo.pk]))
         self.assertEqual(delete_response.status_code, 302)
-        self.assertFalse(Memo.objects.filter(pk=memo.pk).exists())
+        self.assertFalse(Memo.objects.for_user(user).filter(pk=memo.pk).exists())
     
     def test_user_isolation_workflow(self):
         """사용자 간 데이터 격리 워크플로우 테스트"""
@@ -414,6 +414,6 @@ class TestIntegrationWorkflows(TestCase):
         self.assertNotContains(response, '사용자1 메모')
         
         # 사용자1의 메모에 접근할 수 없음
-        user1_memo = Memo.objects.get(title='사용자1 메모')
+        user1_memo = Memo.objects.for_user(user1).get(title='사용자1 메모')
         response = self.client.get(reverse('memo_detail', args=[user1_memo.pk]))
         self.assertEqual(response.status_code, 404)
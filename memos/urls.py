@@ -4,8 +4,13 @@ from . import views
 urlpatterns = [
     path('signup/', views.signup, name='signup'),
     path('', views.memo_list, name='memo_list'),
+    path('events/', views.memo_events, name='memo_events'),
+    # Prometheus 기본 경로에 맞춰 끝에 /를 붙이지 않는다
+    path('metrics', views.metrics_view, name='metrics'),
     path('memo/<int:pk>/', views.memo_detail, name='memo_detail'),
+    path('memo/<int:pk>/chunks/<int:position>/', views.memo_chunk, name='memo_chunk'),
     path('memo/create/', views.memo_create, name='memo_create'),
+    path('memo/bulk/', views.memo_bulk, name='memo_bulk'),
     path('memo/<int:pk>/edit/', views.memo_update, name='memo_update'),
     path('memo/<int:pk>/delete/', views.memo_delete, name='memo_delete'),
 ]
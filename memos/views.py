@@ -1,9 +1,22 @@
-
+import asyncio
 from django.shortcuts import render, redirect, get_object_or_404
+from django.conf import settings
+from django.contrib import messages
 from django.contrib.auth import login
 from django.contrib.auth.decorators import login_required
-from .forms import SignUpForm, MemoForm
-from .models import Memo
+from django.core.exceptions import ValidationError
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.db.models import Q
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.crypto import constant_time_compare
+from django.utils.http import urlencode
+from django.views.decorators.http import require_POST
+from . import bulk, metrics, sharding, similarity, stats
+from .events import format_event, get_broker
+from .forms import MemoBulkForm, SignUpForm, MemoForm
+from .models import Folder, Memo, MemoChunk, MemoStats, Tag
 
 def signup(request):
     if request.method == "POST":
@@ -17,50 +30,222 @@ def signup(request):
     return render(request, "registration/signup.html", {"form": form})
 
 
+def filter_memos(memos, folder_id, tag_id):
+    # 폴더/태그 필터 (잘못된 값은 무시)
+    if folder_id.isdigit():
+        memos = memos.filter(folder_id=int(folder_id))
+    if tag_id.isdigit():
+        memos = memos.filter(tags__id=int(tag_id))
+    return memos
+
+
+def memo_page(memos, cursor, page_size):
+    """(-created_at, -id) 순서로 cursor(앞 페이지 마지막 메모) 다음 한 페이지를 OFFSET 없이 가져온다.
+
+    (user, -created_at) 인덱스를 커서 위치부터 읽다가 한 페이지가 차면 멈추므로,
+    태그 필터처럼 조인이 붙어도 읽는 행 수가 페이지 크기에 비례한다.
+    """
+    if cursor is not None:
+        created_at = cursor.created_at
+        memos = memos.filter(created_at__lte=created_at).filter(
+            Q(created_at__lt=created_at) | Q(pk__lt=cursor.pk)
+        )
+    page = list(memos.order_by('-created_at', '-pk')[:page_size + 1])
+    return page[:page_size], len(page) > page_size
+
+
 # 메모 목록
 @login_required
 def memo_list(request):
-    memos = Memo.objects.filter(user=request.user).order_by('-created_at')
-    return render(request, "memos/memo_list.html", {"memos": memos})
+    folder_id = request.GET.get('folder', '')
+    tag_id = request.GET.get('tag', '')
+    cursor_id = request.GET.get('cursor', '')
+    user_memos = Memo.objects.for_user(request.user).defer('content')
+    # 커서 메모가 지워졌으면 첫 페이지를 보여준다
+    cursor = user_memos.filter(pk=int(cursor_id)).only('created_at').first() if cursor_id.isdigit() else None
+    memos, has_next = memo_page(
+        filter_memos(user_memos, folder_id, tag_id), cursor, getattr(settings, 'MEMO_LIST_PAGE_SIZE', 50)
+    )
+    filters = {key: value for key, value in (('folder', folder_id), ('tag', tag_id)) if value}
+    list_url = reverse('memo_list')
+    return render(request, "memos/memo_list.html", {
+        "memos": memos,
+        "next_page_url": f"{list_url}?{urlencode({**filters, 'cursor': memos[-1].pk})}" if has_next else None,
+        "first_page_url": (f"{list_url}?{urlencode(filters)}" if filters else list_url) if cursor else None,
+        "folders": Folder.objects.for_user(request.user),
+        "tags": Tag.objects.for_user(request.user),
+        "active_folder": folder_id,
+        "active_tag": tag_id,
+        "stats": MemoStats.objects.for_user(request.user).first(),
+    })
 
 # 메모 상세
 @login_required
 def memo_detail(request, pk):
-    memo = get_object_or_404(Memo, pk=pk, user=request.user)
-    return render(request, "memos/memo_detail.html", {"memo": memo})
+    # 전체 내용 대신 첫 조각만 읽고, 나머지는 스크롤 시 memo_chunk로 가져온다
+    memo = get_object_or_404(Memo.objects.for_user(request.user).defer('content').select_related('folder'), pk=pk)
+    first_chunk = memo.chunks.filter(position=0).first()
+    next_chunk_url = None
+    if memo.chunks.filter(position=1).exists():
+        next_chunk_url = reverse('memo_chunk', args=[memo.pk, 1])
+    return render(request, "memos/memo_detail.html", {
+        "memo": memo,
+        "content": first_chunk.content if first_chunk else "",
+        "next_chunk_url": next_chunk_url,
+        "similar_memos": similarity.similar_memos(memo, using=memo._state.db),
+    })
+
+# 메모 내용 조각
+@login_required
+def memo_chunk(request, pk, position):
+    chunks = MemoChunk.objects.using(sharding.shard_for_user(request.user))
+    chunk = get_object_or_404(chunks, memo__pk=pk, memo__user=request.user, position=position)
+    next_url = None
+    if chunks.filter(memo_id=pk, position=position + 1).exists():
+        next_url = reverse('memo_chunk', args=[pk, position + 1])
+    return JsonResponse({"position": chunk.position, "content": chunk.content, "next_url": next_url})
 
 # 메모 생성
 @login_required
 def memo_create(request):
     if request.method == "POST":
-        form = MemoForm(request.POST)
+        form = MemoForm(request.POST, user=request.user)
         if form.is_valid():
-            memo = form.save(commit=False)
-            memo.user = request.user
-            memo.save()
-            return redirect('memo_detail', pk=memo.pk)
+            using = sharding.shard_for_user(request.user)
+            try:
+                with transaction.atomic(using=using):
+                    sharding.check_writable(request.user)
+                    # 할당량은 통계 행 하나로 검사하며 예약하고, 나머지 통계는 시그널이 같은 트랜잭션에서 갱신한다
+                    reserved = stats.check_quota(request.user, count=1, size=form.content_size, using=using)
+                    memo = form.save(commit=False)
+                    memo.user = request.user
+                    memo._quota_reserved = reserved
+                    memo.save()
+                    form.save_m2m()
+            except ValidationError as error:
+                form.add_error(None, error)
+            else:
+                return redirect('memo_detail', pk=memo.pk)
     else:
-        form = MemoForm()
+        form = MemoForm(user=request.user)
     return render(request, "memos/memo_form.html", {"form": form})
 
 # 메모 수정
 @login_required
 def memo_update(request, pk):
-    memo = get_object_or_404(Memo, pk=pk, user=request.user)
+    memo = get_object_or_404(Memo.objects.for_user(request.user), pk=pk)
     if request.method == "POST":
-        form = MemoForm(request.POST, instance=memo)
+        form = MemoForm(request.POST, instance=memo, user=request.user)
         if form.is_valid():
-            form.save()
-            return redirect('memo_detail', pk=memo.pk)
+            using = memo._state.db
+            try:
+                with transaction.atomic(using=using):
+                    sharding.check_writable(request.user)
+                    size = form.content_size - stats.stored_content_bytes(memo.pk, using=using)
+                    memo._quota_reserved = stats.check_quota(request.user, size=size, using=using)
+                    form.save()
+            except ValidationError as error:
+                form.add_error(None, error)
+            else:
+                return redirect('memo_detail', pk=memo.pk)
     else:
-        form = MemoForm(instance=memo)
+        form = MemoForm(instance=memo, user=request.user)
     return render(request, "memos/memo_form.html", {"form": form})
 
 # 메모 삭제
 @login_required
 def memo_delete(request, pk):
-    memo = get_object_or_404(Memo, pk=pk, user=request.user)
+    memo = get_object_or_404(Memo.objects.for_user(request.user), pk=pk)
     if request.method == "POST":
-        memo.delete()
+        try:
+            with transaction.atomic(using=memo._state.db):
+                sharding.check_writable(request.user)
+                memo.delete()
+        except ValidationError as error:
+            return render(request, "memos/memo_confirm_delete.html", {"memo": memo, "error": error.message})
         return redirect('memo_list')
     return render(request, "memos/memo_confirm_delete.html", {"memo": memo})
+
+# 메모 일괄 작업 (삭제, 폴더 이동)
+@login_required
+@require_POST
+def memo_bulk(request):
+    form = MemoBulkForm(request.POST)
+    if not form.is_valid():
+        for errors in form.errors.values():
+            messages.warning(request, " ".join(errors))
+        return redirect('memo_list')
+    data = form.cleaned_data
+    filters = {key: data[key] for key in ('folder', 'tag') if data[key].isdigit()}
+    list_url = reverse('memo_list') + (f"?{urlencode(filters)}" if filters else "")
+    using = sharding.shard_for_user(request.user)
+    if data['select_all']:
+        # 목록 필터를 그대로 DELETE/UPDATE 조건으로 쓴다 (id를 파이썬으로 읽어 오지 않는다)
+        memo_ids = None
+        selections = [filter_memos(bulk.filter_selection(request.user, using), data['folder'], data['tag'])]
+    else:
+        memo_ids = data['memo_ids']
+        # 모든 문장이 소유자 조건을 포함하므로 남의 메모 id는 그냥 무시된다
+        selections = bulk.select_memos(request.user, memo_ids, using)
+    try:
+        with transaction.atomic(using=using):
+            sharding.check_writable(request.user)
+            if data['action'] == 'delete':
+                affected = bulk.delete_memos(request.user, selections, using, memo_ids)
+                message = f"Удалено заметок: {affected}"
+            else:
+                folder = None
+                if data['folder_name']:
+                    folders = Folder.objects.using(using)
+                    folder, _ = folders.get_or_create(user=request.user, name=data['folder_name'])
+                affected = bulk.move_memos(request.user, selections, folder, using, memo_ids)
+                message = f"Перемещено заметок: {affected}"
+    except ValidationError as error:
+        messages.warning(request, error.message)
+    else:
+        requested = affected if memo_ids is None else len(memo_ids)
+        bulk.log_result(data['action'], request.user, requested, affected)
+        messages.success(request, message)
+    return redirect(list_url)
+
+# 메모 변경 이벤트 스트림 (SSE)
+@login_required
+async def memo_events(request):
+    # WSGI에서는 연결 하나가 워커 스레드를 계속 붙잡으므로 스트림을 열지 않는다 (204면 EventSource가 재연결하지 않음)
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+    user = await request.auser()
+    broker = get_broker()
+    subscription = await broker.asubscribe(user.pk)
+    heartbeat = getattr(settings, 'MEMO_EVENTS_HEARTBEAT', 15)
+
+    async def stream():
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    # 프록시가 유휴 연결을 끊지 않도록 주석 줄을 보낸다
+                    yield ": keepalive\n\n"
+                    continue
+                yield format_event(event)
+        finally:
+            broker.unsubscribe(subscription)
+
+    response = StreamingHttpResponse(stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+# 메트릭 수집 엔드포인트 (Prometheus 텍스트 형식)
+def metrics_view(request):
+    # 스태프 세션 또는 Authorization: Bearer <MEMO_METRICS_TOKEN>
+    token = settings.MEMO_METRICS_TOKEN
+    authorization = request.headers.get("Authorization", "")
+    allowed = request.user.is_staff or (
+        bool(token) and constant_time_compare(authorization, f"Bearer {token}")
+    )
+    if not allowed:
+        return HttpResponse(status=403)
+    return HttpResponse(metrics.registry.render(), content_type=metrics.CONTENT_TYPE)